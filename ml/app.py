@@ -7,9 +7,15 @@ This API provides personalized exercise and diet recommendations based on:
 - User health stats (age, gender, weight, height, etc.)
 - Trained LightGBM model predictions
 - Exercise and diet knowledge bases
+- Per-Workout_Type model shards, when trained (WORKOUT_SHARDS=1 in
+  train_model.py): each request is scored by the shard of its Workout_Type,
+  loaded on first use, or by the global model when there is none
 
-Endpoint:
-    POST /predict - Returns top exercise recommendations and diet suggestions
+Endpoints:
+    POST /predict       - Returns top exercise recommendations and diet suggestions
+    POST /predict/batch - Scores a list of profiles with a single model call
+    POST /admin/reload  - Loads retrained artifacts without a restart
+    GET  /metrics       - Per-stage latency histograms and counters (Prometheus text)
 
 Usage:
     python3 app.py
@@ -17,25 +23,122 @@ Usage:
 """
 
 # 1. Imports
-from flask import Flask, request, jsonify
-import pandas as pd
-import joblib
+import hmac
+import os
+
+from flask import Flask, Response, g, request, jsonify
+
+from artifact_reloader import ArtifactReloader
+from artifacts import files_fingerprint, load_artifacts, warm_up
+from features import build_features
+from metrics import NULL_TIMER, Metrics, server_timing
+from recommender import build_recommendation, cache_key, grid_answer, parse_model_variant, parse_num_recommendations, \
+    predict_probabilities, recommendation_count, score_profiles, shard_for
+from response_cache import ResponseCache
+from ranking import top_k_indices
 
 # 2. Initialization
 app = Flask(__name__)
 
 # Load all artifacts once at startup for maximum efficiency
+# Inference engine: 'booster' (LightGBM) or 'compiled' (NumPy tree arrays)
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'booster')
+# Artifact source: 'bundle' (memory-mapped model_bundle/), 'joblib', or 'auto'
+ARTIFACT_FORMAT = os.environ.get('ARTIFACT_FORMAT', 'auto')
+ARTIFACT_DIR = os.environ.get('ARTIFACT_DIR', '.')
+# Answer profiles inside the bundle's precomputed grid without the model ('0' always scores live)
+USE_RECOMMENDATION_GRID = os.environ.get('RECOMMENDATION_GRID', '1') == '1'
+# Model variant for requests without model_variant: 'fast' (the bundle's
+# latency-budgeted variant, or the full model if it has none) or 'full'
+MODEL_VARIANT = os.environ.get('MODEL_VARIANT', 'fast')
+# Route requests to the per-Workout_Type shards in model_shards/ ('0' always uses the global model),
+# keeping at most SHARD_CACHE_SIZE of them loaded (least recently used evicted)
+USE_MODEL_SHARDS = os.environ.get('MODEL_SHARDS', '1') == '1'
+SHARD_CACHE_SIZE = int(os.environ.get('SHARD_CACHE_SIZE', 4))
+
+# Quantization steps for the response cache key
+CACHE_STEPS = {
+    'Weight (kg)': float(os.environ.get('CACHE_WEIGHT_STEP', 0.1)),
+    'Height (m)': float(os.environ.get('CACHE_HEIGHT_STEP', 0.01)),
+    'Fat_Percentage': float(os.environ.get('CACHE_FAT_STEP', 0.1))
+}
+
+# Seconds between checks for retrained artifact files (0 disables the watcher)
+ARTIFACT_WATCH_INTERVAL = float(os.environ.get('ARTIFACT_WATCH_INTERVAL', 10))
+# Token for POST /admin/reload; the endpoint is disabled when unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Per-stage latency histograms for /metrics; SERVER_TIMING=1 also returns
+# the stage durations in a Server-Timing response header
+metrics = Metrics(enabled=os.environ.get('METRICS_ENABLED', '1') == '1')
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+
+
+def load_configured_artifacts():
+    return load_artifacts(ARTIFACT_DIR, engine=INFERENCE_ENGINE, artifact_format=ARTIFACT_FORMAT,
+                          cache_steps=CACHE_STEPS, use_grid=USE_RECOMMENDATION_GRID, model_variant=MODEL_VARIANT,
+                          use_shards=USE_MODEL_SHARDS, shard_capacity=SHARD_CACHE_SIZE)
+
+
 print("Loading model artifacts...")
-model = joblib.load('exercise_model.joblib')
-training_columns = joblib.load('training_columns.joblib')
-exercise_knowledge_base = joblib.load('knowledge_base.joblib')
-diet_knowledge_base = joblib.load('diet_knowledge_base.joblib')
-print("✓ All artifacts loaded successfully!")
-print(f"  - Model ready to predict {len(model.classes_)} exercise classes")
-print(f"  - Exercise KB: {len(exercise_knowledge_base)} combinations")
-print(f"  - Diet KB: {len(diet_knowledge_base)} combinations")
-
-# 3. API Endpoint Definition
+startup_artifacts = load_configured_artifacts()
+
+# Response cache keyed on the quantized profile; CACHE_SIZE=0 disables it
+response_cache = ResponseCache(
+    max_size=int(os.environ.get('CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('CACHE_TTL', 3600))
+)
+response_cache.set_version(startup_artifacts.version)
+
+# Every request reads reloader.current once and uses that set throughout, so
+# a reload never mixes two versions within one response
+reloader = ArtifactReloader(
+    load_configured_artifacts, lambda: files_fingerprint(ARTIFACT_DIR), startup_artifacts,
+    interval=ARTIFACT_WATCH_INTERVAL,
+    on_swap=lambda new: response_cache.set_version(new.version),
+    warm_up=warm_up
+)
+print(f"✓ All artifacts loaded successfully! ({startup_artifacts.source}, {startup_artifacts.load_seconds:.3f}s)")
+print(f"  - Model ready to predict {len(startup_artifacts.classes)} exercise classes ({INFERENCE_ENGINE} engine)")
+print(f"  - Exercise KB: {len(startup_artifacts.exercise_index)} combinations")
+print(f"  - Diet KB: {len(startup_artifacts.diet_index)} combinations")
+for name, variant in startup_artifacts.describe_variants().items():
+    print(f"  - {name.capitalize()} model: {variant['trees']} trees"
+          f"{' (default)' if variant['default'] else ''}")
+if startup_artifacts.grid is not None:
+    print(f"  - Recommendation grid: {len(startup_artifacts.grid):,} cells, "
+          f"top {startup_artifacts.grid.top_k}, {startup_artifacts.grid.nbytes / 1e6:.1f} MB")
+if startup_artifacts.shards is not None:
+    print(f"  - Model shards: {', '.join(startup_artifacts.shards.shards)} "
+          f"(loaded on first use, at most {SHARD_CACHE_SIZE} resident)")
+
+# Upper bound on profiles accepted by a single /predict/batch call
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+
+
+# 3. Helper Functions
+# Response assembly and batch scoring (build_recommendation, score_profiles
+# etc.) live in recommender.py so score_bulk.py produces exactly the same
+# results offline
+
+
+# 4. API Endpoint Definitions
+@app.before_request
+def start_request():
+    # Started on the first request so it runs in each serving worker, never
+    # in a gunicorn master that only preloads the app
+    reloader.ensure_watching()
+    g.stage_timer = metrics.start(request.endpoint or 'not_found')
+
+
+@app.after_request
+def finish_request(response):
+    stages = getattr(g, 'stage_timer', NULL_TIMER).finish(response.status_code)
+    if SERVER_TIMING and stages:
+        response.headers['Server-Timing'] = server_timing(stages)
+    return response
+
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """
@@ -52,8 +155,15 @@ def predict():
         "Workout_Frequency (days/week)": 4,
         "Workout_Type": "Strength",
         "diet_type": "Balanced",
-        "meal_type": "Lunch"
+        "meal_type": "Lunch",
+        "num_recommendations": 4,
+        "model_variant": "full"
     }
+
+    num_recommendations is optional (default 4, at most the number of
+    exercise classes; fewer if the Workout_Type shard knows fewer).
+    model_variant is optional: 'fast' or 'full' (default MODEL_VARIANT); a
+    Workout_Type shard is always scored with its full model.
     
     Returns:
     {
@@ -63,168 +173,233 @@ def predict():
         "diet_suggestion": {...}
     }
     """
+    artifacts = reloader.current
+    timer = g.stage_timer
     try:
-        # 4. Input Data Processing
-        # Get user input from request JSON
+        # Input Data Processing
         input_data = request.get_json()
-        
-        # Calculate BMI
-        weight = input_data['Weight (kg)']
-        height = input_data['Height (m)']
-        bmi = weight / (height ** 2)
-        
-        # Extract diet preferences for later use
-        diet_type = input_data.get('diet_type', 'Balanced')
-        meal_type = input_data.get('meal_type', 'Lunch')
-        
-        # Create feature DataFrame for model prediction
-        feature_data = {
-            'Age': input_data['Age'],
-            'Gender': input_data['Gender'],
-            'Weight (kg)': weight,
-            'Height (m)': height,
-            'BMI': bmi,
-            'Fat_Percentage': input_data['Fat_Percentage'],
-            'Experience_Level': input_data['Experience_Level'],
-            'Workout_Frequency (days/week)': input_data['Workout_Frequency (days/week)']
-        }
-        
-        # Create single-row DataFrame
-        input_df = pd.DataFrame([feature_data])
-        
-        # One-hot encode categorical features (Gender)
-        input_encoded = pd.get_dummies(input_df, columns=['Gender'], drop_first=True)
-        
-        # **Crucially** align columns with training data
-        input_encoded = input_encoded.reindex(columns=training_columns, fill_value=0)
-        
-        # 5. Generating Exercise Recommendations
-        # Get prediction probabilities for all exercises
-        probabilities = model.predict_proba(input_encoded)[0]
-        exercise_classes = model.classes_
-        
-        # Number of recommendations to return
-        num_recommendations = 4
-        
-        # Combine exercise names with probabilities and sort descending
-        exercise_probs = list(zip(exercise_classes, probabilities))
-        exercise_probs_sorted = sorted(exercise_probs, key=lambda x: x[1], reverse=True)
-        top_exercises = exercise_probs_sorted[:num_recommendations]
-        
-        # Build detailed recommendations list
-        exercise_recommendations = []
-        user_experience_level = input_data['Experience_Level']
-        
-        for exercise_name, confidence in top_exercises:
-            # Smart lookup in exercise knowledge base using exercise name AND experience level
-            kb_match = exercise_knowledge_base[
-                (exercise_knowledge_base['Name of Exercise'] == exercise_name) &
-                (exercise_knowledge_base['Experience_Level'] == user_experience_level)
-            ]
-            
-            # If exact match found, use it; otherwise try any experience level for this exercise
-            if kb_match.empty:
-                kb_match = exercise_knowledge_base[
-                    exercise_knowledge_base['Name of Exercise'] == exercise_name
-                ].head(1)
-            
-            if not kb_match.empty:
-                # Extract details from knowledge base
-                exercise_details = {
-                    'exercise_name': exercise_name,
-                    'confidence': float(confidence),
-                    'sets': float(kb_match.iloc[0]['Sets']),
-                    'reps': float(kb_match.iloc[0]['Reps']),
-                    'calories_per_30min': float(kb_match.iloc[0]['Burns Calories (per 30 min)']),
-                    'benefit': kb_match.iloc[0]['Benefit'],
-                    'equipment_needed': kb_match.iloc[0]['Equipment Needed'],
-                    'target_muscle_group': kb_match.iloc[0]['Target Muscle Group'],
-                    'difficulty_level': kb_match.iloc[0]['Difficulty Level']
-                }
-            else:
-                # Fallback if no knowledge base entry (shouldn't happen with proper training)
-                exercise_details = {
-                    'exercise_name': exercise_name,
-                    'confidence': float(confidence),
-                    'sets': None,
-                    'reps': None,
-                    'calories_per_30min': None,
-                    'benefit': 'N/A',
-                    'equipment_needed': 'N/A',
-                    'target_muscle_group': 'N/A',
-                    'difficulty_level': 'N/A'
-                }
-            
-            exercise_recommendations.append(exercise_details)
-        
-        # 6. Generating Diet Suggestions
-        # Lookup in diet knowledge base
-        diet_match = diet_knowledge_base[
-            (diet_knowledge_base['diet_type'] == diet_type) &
-            (diet_knowledge_base['meal_type'] == meal_type)
-        ]
-        
-        if not diet_match.empty:
-            # Extract nutritional information
-            diet_suggestion = {
-                'diet_type': diet_type,
-                'meal_type': meal_type,
-                'calories': float(diet_match.iloc[0]['Calories']),
-                'carbs': float(diet_match.iloc[0]['Carbs']),
-                'proteins': float(diet_match.iloc[0]['Proteins']),
-                'fats': float(diet_match.iloc[0]['Fats'])
-            }
+        num_recommendations = parse_num_recommendations(artifacts, input_data)
+        variant = parse_model_variant(artifacts, input_data)
+        timer.mark('parse')
+
+        # Serve repeated profiles from the cache without touching the model
+        if response_cache.enabled:
+            key, input_data = cache_key(artifacts, input_data, num_recommendations, variant)
+            cached = response_cache.get(key)
+            timer.mark('cache')
+            if cached is not None:
+                response = jsonify(cached)
+                timer.mark('serialize')
+                return response, 200
+
+        # The Workout_Type's shard (loaded on first use) or the global model
+        scorer, _ = shard_for(artifacts, input_data)
+        timer.mark('shard')
+
+        feature_data, bmi = build_features(input_data)
+        # Profiles inside the precomputed grid are answered without the model
+        answer = grid_answer(scorer, feature_data, num_recommendations, variant)
+        if answer is not None:
+            top_indices, probabilities = answer
+            timer.mark('grid')
         else:
-            # No match found - return default message
-            diet_suggestion = {
-                'diet_type': diet_type,
-                'meal_type': meal_type,
-                'message': 'No specific diet suggestion available for this combination'
-            }
-        
-        # 7. Returning the Final Response
-        response = {
-            'success': True,
-            'bmi': round(bmi, 2),
-            'exercise_recommendations': exercise_recommendations,
-            'diet_suggestion': diet_suggestion
-        }
+            input_encoded = scorer.feature_encoder.transform([feature_data])
+            timer.mark('features')
+
+            # Get prediction probabilities for all exercises and pick the best ones
+            probabilities = predict_probabilities(scorer, input_encoded, variant)[0]
+            timer.mark('predict')
+            top_indices = top_k_indices(probabilities, recommendation_count(scorer, num_recommendations))
         
-        return jsonify(response), 200
+        response = build_recommendation(scorer, input_data, feature_data, bmi, probabilities, top_indices)
+        if response_cache.enabled:
+            response_cache.put(key, response, version=artifacts.version)
+        timer.mark('lookup')
+        response = jsonify(response)
+        timer.mark('serialize')
+        return response, 200
         
     except KeyError as e:
         # Missing required field in input
+        metrics.count_error('predict', 'missing_field')
         return jsonify({
             'success': False,
             'error': f'Missing required field: {str(e)}'
         }), 400
         
+    except (TypeError, ValueError) as e:
+        # Non-numeric value in a numeric field
+        metrics.count_error('predict', 'invalid_input')
+        return jsonify({
+            'success': False,
+            'error': f'Invalid input: {str(e)}'
+        }), 400
+        
     except Exception as e:
         # General error handling
+        metrics.count_error('predict', 'internal')
         return jsonify({
             'success': False,
             'error': f'An error occurred: {str(e)}'
         }), 500
 
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Score many user profiles in one request.
+
+    Expected JSON Input:
+    {
+        "profiles": [ {<same fields as /predict>}, ... ],
+        "num_recommendations": 4,
+        "model_variant": "fast"
+    }
+
+    All valid profiles are encoded into one feature matrix and scored with a
+    single predict_proba call per model (the global model or a Workout_Type
+    shard). Results are returned in input order; a profile
+    that fails validation gets its own error entry instead of failing the batch.
+    Profiles already in the response cache are not rescored.
+
+    Returns:
+    {
+        "success": true,
+        "count": 2,
+        "results": [
+            {"success": true, "bmi": 24.49, ...},
+            {"success": false, "error": "Missing required field: 'Age'"}
+        ]
+    }
+    """
+    artifacts = reloader.current
+    timer = g.stage_timer
+    try:
+        input_data = request.get_json(silent=True) or {}
+        profiles = input_data.get('profiles') if isinstance(input_data, dict) else None
+
+        if not isinstance(profiles, list):
+            metrics.count_error('predict_batch', 'invalid_request')
+            return jsonify({
+                'success': False,
+                'error': "Request body must contain a 'profiles' list"
+            }), 400
+
+        if len(profiles) > MAX_BATCH_SIZE:
+            metrics.count_error('predict_batch', 'batch_too_large')
+            return jsonify({
+                'success': False,
+                'error': f'Batch too large: {len(profiles)} profiles (max {MAX_BATCH_SIZE})'
+            }), 400
+
+        try:
+            num_recommendations = parse_num_recommendations(artifacts, input_data)
+            variant = parse_model_variant(artifacts, input_data)
+        except ValueError as e:
+            metrics.count_error('predict_batch', 'invalid_request')
+            return jsonify({
+                'success': False,
+                'error': f'Invalid input: {str(e)}'
+            }), 400
+
+        timer.mark('parse')
+
+        # Cached and in-grid profiles are not rescored; the rest take one model call per shard
+        results = score_profiles(artifacts, profiles, num_recommendations, variant, cache=response_cache,
+                                 on_error=lambda reason: metrics.count_error('predict_batch', reason), timer=timer)
+
+        response = jsonify({
+            'success': True,
+            'count': len(results),
+            'results': results
+        })
+        timer.mark('serialize')
+        return response, 200
+
+    except Exception as e:
+        # General error handling
+        metrics.count_error('predict_batch', 'internal')
+        return jsonify({
+            'success': False,
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Load the artifacts from disk again and swap them in if they are valid.
+
+    Requires the X-Admin-Token header to match ADMIN_TOKEN. Under gunicorn
+    only the worker that receives the call reloads; the file watcher
+    (ARTIFACT_WATCH_INTERVAL) picks up new artifacts in every worker.
+    """
+    token = request.headers.get('X-Admin-Token', '')
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return jsonify({
+            'success': False,
+            'error': 'Forbidden'
+        }), 403
+
+    reloaded, error = reloader.reload()
+    if error is not None:
+        return jsonify({
+            'success': False,
+            'error': f'Reload failed, still serving {reloader.current.version}: {error}'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'reloaded': reloaded,
+        'artifacts': reloader.current.describe()
+    }), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Request metrics of this process in the Prometheus text format."""
+    artifacts = reloader.current
+    text = metrics.render(
+        cache_stats=response_cache.stats(),
+        shards=artifacts.shards,
+        info={'version': artifacts.version, 'engine': artifacts.engine, 'source': artifacts.source}
+    )
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint."""
+    artifacts = reloader.current
+    description = artifacts.describe()
     return jsonify({
         'status': 'healthy',
-        'model_loaded': model is not None,
-        'exercise_kb_size': len(exercise_knowledge_base),
-        'diet_kb_size': len(diet_knowledge_base)
+        'model_loaded': artifacts.predictor is not None,
+        'inference_engine': INFERENCE_ENGINE,
+        'artifact_format': artifacts.source,
+        'exercise_kb_size': len(artifacts.exercise_index),
+        'diet_kb_size': len(artifacts.diet_index),
+        'artifact_version': artifacts.version,
+        'artifact_loaded_at': description['loaded_at'],
+        'artifact_load_seconds': description['load_seconds'],
+        'recommendation_grid': description['grid'],
+        'default_model_variant': artifacts.default_variant,
+        'model_variants': description['model_variants'],
+        'model_shards': description['shards'],
+        'reload': reloader.status(),
+        'cache': response_cache.stats()
     }), 200
 
 
-# 8. Boilerplate to run the app
+# 5. Boilerplate to run the app
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("Starting Exercise & Diet Recommendation API")
     print("="*60)
     print("API Endpoint: POST http://localhost:5000/predict")
+    print("Batch:        POST http://localhost:5000/predict/batch")
     print("Health Check: GET  http://localhost:5000/health")
+    print("Metrics:      GET  http://localhost:5000/metrics")
     print("="*60 + "\n")
     
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+artifact_bundle.py
+Versioned, memory-mappable bundle of everything the API serves from.
+
+train_model.py writes the bundle next to the joblib artifacts. Opening it
+parses a small manifest and memory-maps the arrays, so startup time and
+resident memory do not grow with the size of the model or knowledge bases;
+pages are read from disk (and shared between processes) only when touched.
+
+Bundle directory layout:
+    manifest.json           format and content version, training columns,
+                            class names, interned string table, array names
+                            and compiled-forest settings
+    forest_<name>.npy       compiled tree arrays (see tree_engine.py)
+    exercise_<field>.npy    exercise KB rows grouped by exercise; numeric
+                            fields as float64, text fields as int32 codes into
+                            the string table (-1 for a missing value)
+    diet_<field>.npy        diet KB rows, same encoding
+    grid_<name>.npy         optional precomputed top-k grid (see
+                            recommendation_grid.py)
+    fast_forest_<name>.npy  optional fast model variant (see fast_model.py),
+                            same arrays as forest_<name>
+    booster.txt             LightGBM text model for INFERENCE_ENGINE=booster
+    fast_booster.txt        LightGBM text model of the fast variant
+
+model_bundle is a symlink to a numbered sibling directory (model_bundle.v3)
+that publish_directory() replaces atomically, so a reader never sees a
+missing or half-written bundle. ArtifactBundle resolves the link once and
+reads every file from that version. The version before the current one is
+kept for readers still opening it; older ones are deleted, which does not
+affect a process that has them memory-mapped (the mapping keeps the data
+alive until it is closed).
+
+Usage:
+    write_bundle('model_bundle', forest, training_columns, knowledge_base, diet_knowledge_base, booster, grid,
+                 fast={'forest': fast_forest, 'booster': fast_booster, 'report': report})
+    bundle = ArtifactBundle('model_bundle')
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timezone
+
+import numpy as np
+
+from knowledge_index import DIET_FIELDS, EXERCISE_FIELDS
+from recommendation_grid import RecommendationGrid
+from tree_engine import ARRAY_FIELDS, CompiledForest
+
+BUNDLE_FORMAT = 1
+MANIFEST_FILE = 'manifest.json'
+BOOSTER_FILE = 'booster.txt'
+FAST_BOOSTER_FILE = 'fast_booster.txt'
+
+
+class _StringTable:
+    """Interns strings so each distinct value is stored once."""
+
+    def __init__(self):
+        self.strings = []
+        self._codes = {}
+
+    def encode(self, values):
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if not isinstance(value, str):
+                codes[i] = -1
+                continue
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.strings)
+                self.strings.append(value)
+            codes[i] = code
+        return codes
+
+
+def write_bundle(directory, forest, training_columns, knowledge_base, diet_knowledge_base, booster=None, grid=None,
+                 fast=None):
+    """
+    Write a bundle to ``directory``, replacing any previous bundle there.
+
+    fast is an optional fast model variant: a dict with its CompiledForest
+    ('forest'), LightGBM booster ('booster', may be None) and the report
+    shown by /health ('report').
+
+    The files are written to a sibling temporary directory first and moved
+    into place at the end, so readers never see a half-written bundle.
+    Returns the bundle's content version.
+    """
+    staging = directory + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    arrays = {}
+    strings = _StringTable()
+
+    # Compiled forest (class names go in the manifest)
+    for name, array in forest.arrays().items():
+        if name != 'classes':
+            arrays[f'forest_{name}'] = array
+
+    # Exercise KB: rows grouped by exercise, original order kept within a group
+    names = knowledge_base['Name of Exercise'].tolist()
+    exercise_names = list(dict.fromkeys(names))
+    group = {name: i for i, name in enumerate(exercise_names)}
+    order = np.argsort(np.array([group[name] for name in names]), kind='stable')
+    exercise = knowledge_base.iloc[order]
+    counts = np.bincount([group[name] for name in names], minlength=len(exercise_names))
+    arrays['exercise_offsets'] = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    arrays['exercise_level'] = exercise['Experience_Level'].to_numpy(dtype=np.float64)
+    for field, column, convert in EXERCISE_FIELDS:
+        if convert is float:
+            arrays[f'exercise_{field}'] = exercise[column].to_numpy(dtype=np.float64)
+        else:
+            arrays[f'exercise_{field}'] = strings.encode(exercise[column].tolist())
+
+    # Diet KB
+    arrays['diet_diet_type'] = strings.encode(diet_knowledge_base['diet_type'].tolist())
+    arrays['diet_meal_type'] = strings.encode(diet_knowledge_base['meal_type'].tolist())
+    for field, column in DIET_FIELDS:
+        arrays[f'diet_{field}'] = diet_knowledge_base[column].to_numpy(dtype=np.float64)
+
+    if grid is not None:
+        for name, array in grid.arrays().items():
+            arrays[f'grid_{name}'] = array
+
+    if fast is not None:
+        if fast['forest'].classes_.tolist() != forest.classes_.tolist():
+            raise ValueError('The fast model variant must have the same classes as the model')
+        for name, array in fast['forest'].arrays().items():
+            if name != 'classes':
+                arrays[f'fast_forest_{name}'] = array
+
+    digest = hashlib.sha1()
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        np.save(os.path.join(staging, name + '.npy'), array)
+        digest.update(name.encode())
+        digest.update(array.tobytes())
+
+    boosters = [(BOOSTER_FILE, booster)]
+    if fast is not None:
+        boosters.append((FAST_BOOSTER_FILE, fast.get('booster')))
+    for name, model in boosters:
+        if model is not None:
+            model.save_model(os.path.join(staging, name))
+            with open(os.path.join(staging, name), 'rb') as f:
+                digest.update(f.read())
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': digest.hexdigest()[:12],
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'training_columns': list(training_columns),
+        'classes': forest.classes_.tolist(),
+        'exercise_names': exercise_names,
+        'strings': strings.strings,
+        'arrays': sorted(arrays),
+        'forest': forest.settings(),
+        'booster': BOOSTER_FILE if booster is not None else None,
+        'grid': grid.settings() if grid is not None else None
+    }
+    # Only bundles with a fast variant carry the key, so others keep their manifest
+    if fast is not None:
+        manifest['fast'] = {
+            'forest': fast['forest'].settings(),
+            'booster': FAST_BOOSTER_FILE if fast.get('booster') is not None else None,
+            'report': fast.get('report') or {}
+        }
+    with open(os.path.join(staging, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    publish_directory(staging, directory)
+    return manifest['version']
+
+
+def _published_versions(directory):
+    """(parent, name, [(number, entry), ...]) of the numbered versions behind ``directory``."""
+    parent, name = os.path.split(os.path.abspath(directory))
+    pattern = re.compile(re.escape(name) + r'\.v(\d+)$')
+    matches = (pattern.match(entry) for entry in os.listdir(parent))
+    return parent, name, sorted((int(match.group(1)), match.group(0)) for match in matches if match)
+
+
+def publish_directory(staging, directory):
+    """
+    Make the finished ``staging`` directory the one served at ``directory``.
+
+    staging becomes the next numbered version (<directory>.v<n>) and the
+    directory symlink is pointed at it with os.replace, which is atomic. The
+    version it pointed to before is kept; older ones are deleted. A plain
+    directory left by an older writer is moved to a version first, the only
+    moment the path is missing.
+    """
+    parent, name, versions = _published_versions(directory)
+    number = versions[-1][0] + 1 if versions else 1
+    previous = None
+    if os.path.islink(directory):
+        previous = os.path.basename(os.readlink(directory))
+    elif os.path.isdir(directory):
+        previous = f'{name}.v{number}'
+        os.rename(directory, os.path.join(parent, previous))
+        number += 1
+
+    current = f'{name}.v{number}'
+    os.rename(staging, os.path.join(parent, current))
+    link = os.path.join(parent, f'.{name}.link')
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(current, link)
+    os.replace(link, directory)
+
+    for _, entry in versions:
+        if entry not in (current, previous):
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def remove_published(directory):
+    """Delete ``directory`` and every version published behind it."""
+    if os.path.islink(directory):
+        os.remove(directory)
+    else:
+        shutil.rmtree(directory, ignore_errors=True)
+    parent, _, versions = _published_versions(directory)
+    for _, entry in versions:
+        shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def is_bundle(directory):
+    return os.path.isfile(os.path.join(directory, MANIFEST_FILE))
+
+
+class BundleExerciseIndex:
+    """
+    ExerciseIndex interface over the memory-mapped exercise KB.
+
+    Only the exercise-name -> group map is built up front. A lookup scans the
+    rows of one exercise for the requested level (first match, else the
+    group's first row, as ExerciseIndex does) and materializes the record on
+    first use.
+    """
+
+    def __init__(self, arrays, exercise_names, strings):
+        self._groups = {name: i for i, name in enumerate(exercise_names)}
+        self._offsets = arrays['exercise_offsets']
+        self._levels = arrays['exercise_level']
+        self._strings = strings
+        self._fields = [
+            (field, arrays[f'exercise_{field}'], convert is float)
+            for field, _, convert in EXERCISE_FIELDS
+        ]
+        self._records = {}
+
+    def __len__(self):
+        return len(self._levels)
+
+    def _record(self, row):
+        record = self._records.get(row)
+        if record is None:
+            record = {}
+            for field, values, numeric in self._fields:
+                if numeric:
+                    record[field] = float(values[row])
+                else:
+                    code = values[row]
+                    record[field] = self._strings[code] if code >= 0 else None
+            record = self._records.setdefault(row, record)
+        return record
+
+    def lookup(self, exercise_name, experience_level):
+        group = self._groups.get(exercise_name)
+        if group is None:
+            return None
+        start, end = int(self._offsets[group]), int(self._offsets[group + 1])
+        matches = np.flatnonzero(self._levels[start:end] == experience_level)
+        return self._record(start + int(matches[0]) if matches.size else start)
+
+
+class BundleDietIndex:
+    """DietIndex interface over the memory-mapped diet KB (one row per combination)."""
+
+    def __init__(self, arrays, strings):
+        self._strings = strings
+        self._fields = [(field, arrays[f'diet_{field}']) for field, _ in DIET_FIELDS]
+        self._rows = {}
+        for row, (diet_code, meal_code) in enumerate(zip(arrays['diet_diet_type'].tolist(),
+                                                         arrays['diet_meal_type'].tolist())):
+            if diet_code >= 0 and meal_code >= 0:
+                self._rows.setdefault((strings[diet_code], strings[meal_code]), row)
+        self._records = {}
+
+    def __len__(self):
+        return len(self._fields[0][1])
+
+    def lookup(self, diet_type, meal_type):
+        key = (diet_type, meal_type)
+        record = self._records.get(key)
+        if record is None:
+            row = self._rows.get(key)
+            if row is None:
+                return None
+            record = {'diet_type': diet_type, 'meal_type': meal_type}
+            record.update((field, float(values[row])) for field, values in self._fields)
+            record = self._records.setdefault(key, record)
+        return record
+
+
+class ArtifactBundle:
+    """An opened bundle: manifest data plus memory-mapped arrays."""
+
+    def __init__(self, directory):
+        # Resolved once, so a bundle published meanwhile cannot mix into this one
+        directory = os.path.realpath(directory)
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"Unsupported bundle format {manifest.get('format')} in {directory}")
+
+        # np.asarray drops the np.memmap subclass (and its per-operation
+        # overhead) while keeping the data backed by the mapped file
+        arrays = {
+            name: np.asarray(np.load(os.path.join(directory, name + '.npy'), mmap_mode='r'))
+            for name in manifest['arrays']
+        }
+
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.training_columns = manifest['training_columns']
+        self.classes = np.asarray(manifest['classes'])
+        self.forest = CompiledForest(
+            classes=self.classes,
+            **{name: arrays[f'forest_{name}'] for name in ARRAY_FIELDS if name != 'classes'},
+            **manifest['forest']
+        )
+        self.exercise_index = BundleExerciseIndex(arrays, manifest['exercise_names'], manifest['strings'])
+        self.diet_index = BundleDietIndex(arrays, manifest['strings'])
+        self.booster_file = os.path.join(directory, manifest['booster']) if manifest['booster'] else None
+        # Bundles written without a grid (or before grids existed) have none
+        grid = manifest.get('grid')
+        self.grid = RecommendationGrid(
+            top_indices=arrays['grid_top_indices'], confidences=arrays['grid_confidences'], **grid
+        ) if grid else None
+
+        # Optional fast model variant with the same classes
+        fast = manifest.get('fast')
+        self.fast_forest = CompiledForest(
+            classes=self.classes,
+            **{name: arrays[f'fast_forest_{name}'] for name in ARRAY_FIELDS if name != 'classes'},
+            **fast['forest']
+        ) if fast else None
+        self.fast_booster_file = os.path.join(directory, fast['booster']) if fast and fast['booster'] else None
+        self.fast_report = fast['report'] if fast else None
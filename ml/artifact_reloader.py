@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+artifact_reloader.py
+Hot reload of the serving artifacts without restarting the API.
+
+ArtifactReloader holds the active ArtifactSet behind a single reference.
+A reload loads a complete new set in the calling (or watcher) thread,
+validates it with a warm-up prediction and only then replaces the
+reference, so a request that already picked up the old set finishes on it
+and the next request sees the new one. A set that fails to load or warm up
+is discarded and the old one stays active.
+
+Reloads are triggered by:
+- reload()  e.g. from the admin endpoint
+- a watcher thread that polls the artifact files and reloads once their
+  fingerprint has changed and then stayed the same for one more poll (so a
+  retrain that is still writing files is not picked up half way)
+
+The watcher is started lazily by ensure_watching() in the process that
+serves requests, never in a gunicorn master that preloads the app: a reload
+runs a warm-up prediction and LightGBM's thread pool does not survive fork.
+
+Usage:
+    reloader = ArtifactReloader(load, fingerprint, artifacts, interval=10)
+    reloader.ensure_watching()
+    artifacts = reloader.current
+"""
+
+import os
+import threading
+import time
+
+
+class ArtifactReloader:
+    """Owns the active artifact set and swaps in new ones after validation."""
+
+    def __init__(self, load, fingerprint, artifacts, interval=0.0, on_swap=None, warm_up=None):
+        """
+        load         callable returning a new ArtifactSet
+        fingerprint  callable returning a string that changes with the files
+        artifacts    the ArtifactSet loaded at startup
+        interval     seconds between file polls (0 disables the watcher)
+        on_swap      called with the new set after it becomes active
+        warm_up      called with a new set before it becomes active; raises to reject it
+        """
+        self.current = artifacts
+        self.interval = interval
+        self._load = load
+        self._fingerprint = fingerprint
+        self._on_swap = on_swap
+        self._warm_up = warm_up
+        self._reload_lock = threading.Lock()
+        self._watched = fingerprint()
+        self._watcher_pid = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_checked = None
+
+    def reload(self):
+        """
+        Load, validate and activate a new artifact set.
+
+        Returns (swapped, error): swapped is False when the new set failed or
+        had the same version as the active one. Concurrent calls run one at a time.
+        """
+        with self._reload_lock:
+            fingerprint = None
+            try:
+                fingerprint = self._fingerprint()
+                artifacts = self._load()
+                if self._warm_up is not None:
+                    self._warm_up(artifacts)
+            except Exception as e:
+                # Remember the files anyway so the watcher waits for the next change
+                self._watched = fingerprint
+                self.failures += 1
+                self.last_error = f'{type(e).__name__}: {e}'
+                return False, self.last_error
+
+            self._watched = fingerprint
+            self.last_error = None
+            if artifacts.version == self.current.version:
+                return False, None
+
+            # A single reference assignment: readers see the old or the new set, never a mix
+            self.current = artifacts
+            self.reloads += 1
+            if self._on_swap is not None:
+                self._on_swap(artifacts)
+            return True, None
+
+    def check(self, previous=None):
+        """
+        Poll the files once. Reloads when they differ from the active set and
+        match the fingerprint from the previous poll; returns this poll's fingerprint.
+        """
+        self.last_checked = time.time()
+        try:
+            fingerprint = self._fingerprint()
+        except OSError:
+            # Files are being replaced; look again on the next poll
+            return None
+        if fingerprint != self._watched and fingerprint == previous:
+            self.reload()
+        return fingerprint
+
+    def _watch(self):
+        previous = None
+        while True:
+            time.sleep(self.interval)
+            previous = self.check(previous)
+
+    def ensure_watching(self):
+        """Start the file watcher in this process if it is enabled and not running."""
+        if self.interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._reload_lock:
+            if self._watcher_pid != os.getpid():
+                self._watcher_pid = os.getpid()
+                threading.Thread(target=self._watch, name='artifact-watcher', daemon=True).start()
+
+    def status(self):
+        return {
+            'watch_interval_seconds': self.interval,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_checked': (time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.last_checked))
+                             if self.last_checked is not None else None)
+        }
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+artifacts.py
+Loads one consistent set of serving artifacts for the prediction API.
+
+An ArtifactSet holds the model predictor, training column layout, feature
+encoder, knowledge base indexes and cache key builder of one trained model,
+plus its version and load timing, and the precomputed recommendation grid
+and fast model variant (see fast_model.py) when the bundle has them. It can
+be loaded from:
+- the versioned bundle directory (see artifact_bundle.py), memory-mapped
+- the four joblib pickles written by train_model.py (fallback)
+
+When model_shards/ exists (train_model.py with WORKOUT_SHARDS=1), the set
+also has a ShardRegistry (see model_shards.py) that loads the per-Workout_Type
+models on first use. Each shard is served as its own ArtifactSet sharing the
+global set's column layout and knowledge base indexes, without a grid or fast
+variant, and is warmed up when it loads.
+
+warm_up() validates a freshly loaded set end to end before it serves traffic.
+
+Usage:
+    artifacts = load_artifacts('.', engine='booster', artifact_format='auto', model_variant='fast', shard_capacity=4)
+    warm_up(artifacts)
+    probabilities = artifacts.variants[artifacts.default_variant].predict_proba(X)
+"""
+
+import os
+import time
+
+import numpy as np
+
+from artifact_bundle import MANIFEST_FILE, ArtifactBundle, is_bundle
+from features import FeatureEncoder, build_features
+from knowledge_index import DietIndex, ExerciseIndex
+from model_shards import SHARD_BOOSTER_FILE, SHARD_FOREST_FILE, SHARDS_DIR, SHARDS_INDEX, ShardRegistry, \
+    has_shards
+from ranking import top_k_indices
+from response_cache import ProfileKeyBuilder, artifact_fingerprint
+from tree_engine import CompiledForest
+
+ENGINES = ('booster', 'compiled')
+ARTIFACT_FORMATS = ('auto', 'bundle', 'joblib')
+# 'full' is the trained model; 'fast' its latency-budgeted variant, when the bundle has one
+MODEL_VARIANTS = ('full', 'fast')
+
+BUNDLE_DIR = 'model_bundle'
+MODEL_FILE = 'exercise_model.joblib'
+COMPILED_MODEL_FILE = 'exercise_model_compiled.npz'
+TRAINING_COLUMNS_FILE = 'training_columns.joblib'
+KNOWLEDGE_BASE_FILE = 'knowledge_base.joblib'
+DIET_KNOWLEDGE_BASE_FILE = 'diet_knowledge_base.joblib'
+# Written by train_model.py for retrain_incremental.py; not loaded by the API
+TRAINING_STATE_FILE = 'training_state.joblib'
+
+# Profile scored by warm_up() (the /predict example from API_USAGE.md)
+WARM_UP_PROFILE = {
+    'Age': 30,
+    'Gender': 'Male',
+    'Weight (kg)': 75,
+    'Height (m)': 1.75,
+    'Fat_Percentage': 18,
+    'Experience_Level': 2,
+    'Workout_Frequency (days/week)': 4
+}
+
+
+class BoosterPredictor:
+    """
+    predict_proba over a raw lightgbm.Booster.
+
+    Feature matrices are already in training_columns order, so they go
+    straight to the booster rather than through the sklearn wrapper's
+    feature-name checks.
+    """
+
+    def __init__(self, booster, classes):
+        self.booster = booster
+        self.classes_ = np.asarray(classes)
+
+    def predict_proba(self, X):
+        probabilities = self.booster.predict(X)
+        if probabilities.ndim == 1:
+            # Binary objective returns only the positive-class probability
+            probabilities = np.column_stack((1.0 - probabilities, probabilities))
+        return probabilities
+
+
+class ArtifactSet:
+    """Everything one trained model version needs to answer requests."""
+
+    def __init__(self, predictor, training_columns, exercise_index, diet_index,
+                 version, engine, source, cache_steps=None, grid=None,
+                 fast_predictor=None, fast_report=None, default_variant='full'):
+        # The full model; requests are scored with variants[variant]
+        self.predictor = predictor
+        self.variants = {'full': predictor}
+        if fast_predictor is not None:
+            self.variants['fast'] = fast_predictor
+        self.fast_report = fast_report
+        # Variant for requests that do not ask for one; 'fast' without a fast model serves 'full'
+        self.default_variant = default_variant if default_variant in self.variants else 'full'
+        self.training_columns = list(training_columns)
+        self.feature_encoder = FeatureEncoder(self.training_columns)
+        self.profile_keys = ProfileKeyBuilder(self.training_columns, steps=cache_steps)
+        self.exercise_index = exercise_index
+        self.diet_index = diet_index
+        # RecommendationGrid answering in-grid profiles without the model, or None
+        self.grid = grid
+        # ShardRegistry of per-Workout_Type models, or None
+        self.shards = None
+        # Class names as plain Python values, indexed by top-k selection
+        self.classes = predictor.classes_.tolist()
+        self.version = version
+        self.engine = engine
+        self.source = source
+        self.loaded_at = time.time()
+        self.load_seconds = None
+
+    def describe_variants(self):
+        """Tree count of each model variant, plus how the fast one was chosen."""
+        variants = {}
+        for name, predictor in self.variants.items():
+            trees = predictor.booster.num_trees() if isinstance(predictor, BoosterPredictor) else predictor.n_trees
+            variants[name] = {'trees': trees, 'default': name == self.default_variant}
+        if 'fast' in variants:
+            variants['fast'].update(self.fast_report or {})
+        return variants
+
+    def describe(self):
+        """Summary for /health and startup logs."""
+        return {
+            'version': self.version,
+            'engine': self.engine,
+            'source': self.source,
+            'classes': len(self.classes),
+            'model_variants': self.describe_variants(),
+            'exercise_kb_size': len(self.exercise_index),
+            'diet_kb_size': len(self.diet_index),
+            'grid': self.grid.describe() if self.grid is not None else None,
+            'shards': self.shards.describe() if self.shards is not None else None,
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.loaded_at)),
+            'load_seconds': round(self.load_seconds, 4) if self.load_seconds is not None else None
+        }
+
+
+def _load_bundle(directory, engine, cache_steps, use_grid, model_variant):
+    bundle = ArtifactBundle(os.path.join(directory, BUNDLE_DIR))
+    fast_predictor = None
+    if engine == 'compiled':
+        predictor = bundle.forest
+        fast_predictor = bundle.fast_forest
+    else:
+        import lightgbm as lgb
+        if bundle.booster_file is None:
+            raise FileNotFoundError(f'{bundle.directory} has no LightGBM model for the booster engine')
+        predictor = BoosterPredictor(lgb.Booster(model_file=bundle.booster_file), bundle.classes)
+        if bundle.fast_booster_file is not None:
+            fast_predictor = BoosterPredictor(lgb.Booster(model_file=bundle.fast_booster_file), bundle.classes)
+
+    return ArtifactSet(
+        predictor, bundle.training_columns, bundle.exercise_index, bundle.diet_index,
+        version=bundle.version, engine=engine, source='bundle', cache_steps=cache_steps,
+        grid=bundle.grid if use_grid else None,
+        fast_predictor=fast_predictor, fast_report=bundle.fast_report, default_variant=model_variant
+    )
+
+
+def _load_joblib(directory, engine, cache_steps):
+    import joblib
+
+    def path(name):
+        return os.path.join(directory, name)
+
+    compiled_file = path(COMPILED_MODEL_FILE)
+    if engine == 'compiled' and os.path.exists(compiled_file):
+        predictor = CompiledForest.load(compiled_file)
+        model_file = compiled_file
+    else:
+        model = joblib.load(path(MODEL_FILE))
+        model_file = path(MODEL_FILE)
+        if engine == 'compiled':
+            # Artifacts trained before the compiled export: flatten the booster now
+            predictor = CompiledForest.from_booster(model.booster_, model.classes_)
+        else:
+            predictor = BoosterPredictor(model.booster_, model.classes_)
+
+    files = [model_file, path(TRAINING_COLUMNS_FILE), path(KNOWLEDGE_BASE_FILE), path(DIET_KNOWLEDGE_BASE_FILE)]
+    return ArtifactSet(
+        predictor,
+        joblib.load(path(TRAINING_COLUMNS_FILE)),
+        ExerciseIndex(joblib.load(path(KNOWLEDGE_BASE_FILE))),
+        DietIndex(joblib.load(path(DIET_KNOWLEDGE_BASE_FILE))),
+        version=artifact_fingerprint(files), engine=engine, source='joblib', cache_steps=cache_steps
+    )
+
+
+def _shard_loader(artifacts, engine, cache_steps):
+    """loader(directory, info) for a ShardRegistry: one shard as an ArtifactSet sharing artifacts' indexes."""
+
+    def load(directory, info):
+        if engine == 'compiled':
+            predictor = CompiledForest.load(os.path.join(directory, SHARD_FOREST_FILE))
+        else:
+            import lightgbm as lgb
+            predictor = BoosterPredictor(lgb.Booster(model_file=os.path.join(directory, SHARD_BOOSTER_FILE)),
+                                         info['classes'])
+        shard = ArtifactSet(
+            predictor, artifacts.training_columns, artifacts.exercise_index, artifacts.diet_index,
+            version=artifacts.version, engine=engine, source='shard', cache_steps=cache_steps
+        )
+        warm_up(shard)
+        return shard
+
+    return load
+
+
+def load_artifacts(directory='.', engine='booster', artifact_format='auto', cache_steps=None, use_grid=True,
+                   model_variant='full', use_shards=True, shard_capacity=4):
+    """
+    Load an ArtifactSet from ``directory``.
+
+    artifact_format 'auto' opens the bundle when one exists and falls back to
+    the joblib pickles otherwise; 'bundle' and 'joblib' force one source.
+    Only a bundle carries a recommendation grid; use_grid=False ignores it.
+    Only a bundle carries a fast model variant either; model_variant is the
+    variant served by default, and 'fast' falls back to 'full' without one.
+    With use_shards, the per-Workout_Type shards in model_shards/ (if any)
+    are served through a registry keeping at most shard_capacity loaded; the
+    set's version then includes the shards' version.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Inference engine must be one of {ENGINES}, got '{engine}'")
+    if artifact_format not in ARTIFACT_FORMATS:
+        raise ValueError(f"Artifact format must be one of {ARTIFACT_FORMATS}, got '{artifact_format}'")
+    if model_variant not in MODEL_VARIANTS:
+        raise ValueError(f"Model variant must be one of {MODEL_VARIANTS}, got '{model_variant}'")
+
+    started = time.perf_counter()
+    use_bundle = artifact_format == 'bundle' or (
+        artifact_format == 'auto' and is_bundle(os.path.join(directory, BUNDLE_DIR))
+    )
+    if use_bundle:
+        artifacts = _load_bundle(directory, engine, cache_steps, use_grid, model_variant)
+    else:
+        artifacts = _load_joblib(directory, engine, cache_steps)
+
+    shards_dir = os.path.join(directory, SHARDS_DIR)
+    if use_shards and has_shards(shards_dir):
+        registry = ShardRegistry(shards_dir, _shard_loader(artifacts, engine, cache_steps), capacity=shard_capacity)
+        if registry.training_columns != artifacts.training_columns:
+            raise ValueError(f'{shards_dir} was trained on other columns than the model; '
+                             f'rerun train_model.py with WORKOUT_SHARDS=1')
+        artifacts.shards = registry
+        artifacts.version = f'{artifacts.version}+{registry.version}'
+    artifacts.load_seconds = time.perf_counter() - started
+    return artifacts
+
+
+def watched_files(directory='.'):
+    """The files whose replacement means a retrain has produced new artifacts."""
+    names = [
+        os.path.join(BUNDLE_DIR, MANIFEST_FILE), MODEL_FILE, COMPILED_MODEL_FILE,
+        TRAINING_COLUMNS_FILE, KNOWLEDGE_BASE_FILE, DIET_KNOWLEDGE_BASE_FILE, os.path.join(SHARDS_DIR, SHARDS_INDEX)
+    ]
+    return [os.path.join(directory, name) for name in names]
+
+
+def files_fingerprint(directory='.'):
+    """artifact_fingerprint of the watched files that currently exist."""
+    return artifact_fingerprint([path for path in watched_files(directory) if os.path.exists(path)])
+
+
+def warm_up(artifacts):
+    """
+    Score WARM_UP_PROFILE through every serving stage and check the result.
+
+    Raises ValueError if a model variant returns malformed probabilities or a
+    predicted exercise is missing from the knowledge base. Running it also
+    pulls the hot pages of a memory-mapped bundle into memory.
+    """
+    feature_data, _ = build_features(WARM_UP_PROFILE)
+    X = artifacts.feature_encoder.transform([feature_data])
+    for variant, predictor in artifacts.variants.items():
+        probabilities = predictor.predict_proba(X)
+        if probabilities.shape != (1, len(artifacts.classes)):
+            raise ValueError(f'Warm-up prediction ({variant} model) has shape {probabilities.shape}, '
+                             f'expected (1, {len(artifacts.classes)})')
+        if not np.all(np.isfinite(probabilities)) or abs(probabilities.sum() - 1.0) > 1e-6:
+            raise ValueError(f'Warm-up prediction ({variant} model) is not a probability distribution')
+
+        for class_index in top_k_indices(probabilities[0], min(4, len(artifacts.classes))):
+            exercise_name = artifacts.classes[class_index]
+            if artifacts.exercise_index.lookup(exercise_name, feature_data['Experience_Level']) is None:
+                raise ValueError(f"Predicted exercise '{exercise_name}' is missing from the knowledge base")
+    if artifacts.grid is not None and artifacts.grid.n_classes != len(artifacts.classes):
+        raise ValueError(f'Recommendation grid covers {artifacts.grid.n_classes} classes, '
+                         f'the model has {len(artifacts.classes)}')
+    artifacts.diet_index.lookup('Balanced', 'Lunch')
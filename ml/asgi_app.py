@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+asgi_app.py
+ASGI serving mode for the recommendation API with micro-batched inference.
+
+Under gunicorn's sync workers every /predict request runs its own
+single-row predict_proba, so at high concurrency most of the time goes to
+per-call overhead. Here requests are handled on one event loop: parsing,
+validation and cache lookups happen per request, then the encoded profile is
+handed to a MicroBatcher, which scores everything that arrived within
+MICROBATCH_WINDOW_MS (up to MICROBATCH_MAX_SIZE profiles) with a single
+predict_proba call per Workout_Type shard and model variant, and answers
+each caller with its own response.
+
+Artifacts, hot reloading, the response cache and metrics are shared with
+app.py, so responses are identical to the Flask app's. When more than
+MICROBATCH_MAX_PENDING profiles are waiting, /predict returns 503 instead of
+queueing without bound.
+
+Endpoints:
+    POST /predict       - Micro-batched single profile recommendations
+    POST /predict/batch - Same as app.py
+    POST /admin/reload  - Same as app.py
+    GET  /metrics       - Same as app.py
+    GET  /health        - Same as app.py plus micro-batching counters
+
+Usage:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+    MICROBATCH_WINDOW_MS=5 uvicorn asgi_app:app --port 5000
+"""
+
+import asyncio
+import json
+import os
+
+from flask import g
+
+import app as api
+from features import build_features
+from metrics import server_timing
+from micro_batcher import MicroBatcher, Overloaded
+from ranking import top_k_indices
+from recommender import build_recommendation, cache_key, grid_answer, parse_model_variant, parse_num_recommendations, \
+    predict_probabilities, recommendation_count, shard_for
+
+# Time the first request of a batch waits for others, and the batch limits
+MICROBATCH_WINDOW_MS = float(os.environ.get('MICROBATCH_WINDOW_MS', 2))
+MICROBATCH_MAX_SIZE = int(os.environ.get('MICROBATCH_MAX_SIZE', 64))
+MICROBATCH_MAX_PENDING = int(os.environ.get('MICROBATCH_MAX_PENDING', 1000))
+
+JSON_HEADERS = [(b'content-type', b'application/json')]
+METRICS_HEADERS = [(b'content-type', b'text/plain; version=0.0.4')]
+
+# Endpoint names match the Flask view names so /metrics labels agree
+ROUTES = {
+    ('POST', '/predict'): 'predict',
+    ('POST', '/predict/batch'): 'predict_batch',
+    ('POST', '/admin/reload'): 'admin_reload',
+    ('GET', '/metrics'): 'metrics_endpoint',
+    ('GET', '/health'): 'health_check'
+}
+
+
+def score_micro_batch(items):
+    """
+    Score (input_data, feature_data, bmi, num_recommendations, variant) items
+    with one predict_proba call per Workout_Type shard and model variant;
+    returns (artifact version, response) per item.
+
+    Runs on the batcher's thread, so shards are resolved (and loaded on first
+    use) here rather than on the event loop; profiles inside the grid of the
+    model that scores them are answered from it.
+    """
+    # One artifact set for the whole batch, like one per request in app.py
+    artifacts = api.reloader.current
+    results = [None] * len(items)
+    groups = {}
+    for i, (input_data, feature_data, bmi, num_recommendations, variant) in enumerate(items):
+        scorer, shard = shard_for(artifacts, input_data)
+        answer = grid_answer(scorer, feature_data, num_recommendations, variant)
+        if answer is not None:
+            top_indices, probabilities = answer
+            results[i] = (artifacts.version, build_recommendation(scorer, input_data, feature_data, bmi,
+                                                                  probabilities, top_indices))
+            continue
+        groups.setdefault((shard, variant), (scorer, []))[1].append(i)
+
+    for (_, variant), (scorer, positions) in groups.items():
+        input_encoded = scorer.feature_encoder.transform([items[i][1] for i in positions])
+        probabilities = predict_probabilities(scorer, input_encoded, variant)
+
+        for i, row in zip(positions, probabilities):
+            input_data, feature_data, bmi, num_recommendations, _ = items[i]
+            top_indices = top_k_indices(row, recommendation_count(scorer, num_recommendations))
+            response = build_recommendation(scorer, input_data, feature_data, bmi, row, top_indices)
+            results[i] = (artifacts.version, response)
+    return results
+
+
+batcher = MicroBatcher(
+    score_micro_batch,
+    max_batch_size=MICROBATCH_MAX_SIZE,
+    max_wait=MICROBATCH_WINDOW_MS / 1000,
+    max_pending=MICROBATCH_MAX_PENDING
+)
+
+
+def error(message):
+    return {'success': False, 'error': message}
+
+
+async def predict(body, timer):
+    """POST /predict: validate and check the cache here, score in a micro-batch."""
+    artifacts = api.reloader.current
+    try:
+        input_data = json.loads(body)
+        if not isinstance(input_data, dict):
+            raise TypeError('request body must be a JSON object')
+        num_recommendations = parse_num_recommendations(artifacts, input_data)
+        variant = parse_model_variant(artifacts, input_data)
+        timer.mark('parse')
+
+        key = None
+        if api.response_cache.enabled:
+            key, input_data = cache_key(artifacts, input_data, num_recommendations, variant)
+            cached = api.response_cache.get(key)
+            timer.mark('cache')
+            if cached is not None:
+                return 200, cached
+
+        feature_data, bmi = build_features(input_data)
+        timer.mark('features')
+
+        # Without shards, profiles inside the precomputed grid never need the
+        # batcher. With shards, the batch routes them: a shard's first use
+        # loads it, which must not stall the event loop.
+        answer = grid_answer(artifacts, feature_data, num_recommendations, variant) \
+            if artifacts.shards is None else None
+        if answer is not None:
+            top_indices, probabilities = answer
+            response = build_recommendation(artifacts, input_data, feature_data, bmi, probabilities, top_indices)
+            if key is not None:
+                api.response_cache.put(key, response, version=artifacts.version)
+            timer.mark('grid')
+            return 200, response
+    except KeyError as e:
+        api.metrics.count_error('predict', 'missing_field')
+        return 400, error(f'Missing required field: {str(e)}')
+    except (TypeError, ValueError) as e:
+        # Also covers a body that is not valid JSON
+        api.metrics.count_error('predict', 'invalid_input')
+        return 400, error(f'Invalid input: {str(e)}')
+    except Exception as e:
+        api.metrics.count_error('predict', 'internal')
+        return 500, error(f'An error occurred: {str(e)}')
+
+    try:
+        version, response = await batcher.submit((input_data, feature_data, bmi, num_recommendations, variant))
+    except Overloaded as e:
+        api.metrics.count_error('predict', 'overloaded')
+        return 503, error(f'Server overloaded: {str(e)}')
+    except Exception as e:
+        api.metrics.count_error('predict', 'internal')
+        return 500, error(f'An error occurred: {str(e)}')
+    timer.mark('batch')
+
+    if key is not None:
+        api.response_cache.put(key, response, version=version)
+    return 200, response
+
+
+def health():
+    """GET /health: the Flask app's health body plus the batcher counters."""
+    with api.app.app_context():
+        body = api.health_check()[0].get_json()
+    body['server'] = 'asgi'
+    body['micro_batching'] = batcher.stats()
+    return body
+
+
+async def flask_view(view, body, timer, headers=()):
+    """Run a synchronous Flask view off the event loop and return (status, body bytes)."""
+    headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in headers}
+    headers['Content-Type'] = 'application/json'
+
+    def call():
+        with api.app.test_request_context(method='POST', data=body, headers=headers):
+            g.stage_timer = timer
+            response, status = view()
+            return status, response.get_data()
+    return await asyncio.get_running_loop().run_in_executor(None, call)
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_response(send, status, body, headers=JSON_HEADERS, extra_headers=()):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': headers + [(b'content-length', str(len(body)).encode())] + list(extra_headers)})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Started inside the serving process, as in app.py's before_request
+            api.reloader.ensure_watching()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    api.reloader.ensure_watching()
+    endpoint = ROUTES.get((scope['method'], scope['path']))
+    timer = api.metrics.start(endpoint or 'not_found')
+    body = await read_body(receive)
+    headers = JSON_HEADERS
+
+    if endpoint == 'predict':
+        status, response = await predict(body, timer)
+        payload = json.dumps(response).encode()
+        timer.mark('serialize')
+    elif endpoint == 'predict_batch':
+        # Already one predict_proba call per request; run it like app.py does
+        status, payload = await flask_view(api.predict_batch, body, timer)
+    elif endpoint == 'admin_reload':
+        status, payload = await flask_view(api.admin_reload, body, timer, scope['headers'])
+    elif endpoint == 'metrics_endpoint':
+        status = 200
+        payload = api.metrics_endpoint().get_data()
+        headers = METRICS_HEADERS
+    elif endpoint == 'health_check':
+        status, payload = 200, json.dumps(health()).encode()
+    else:
+        status, payload = 404, json.dumps(error('Not found')).encode()
+
+    stages = timer.finish(status)
+    extra_headers = []
+    if api.SERVER_TIMING and stages:
+        extra_headers.append((b'server-timing', server_timing(stages).encode()))
+    await send_response(send, status, payload, headers, extra_headers)
@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+benchmark.py
+Microbenchmarks for the prediction hot path.
+
+Each benchmark runs in-process against the artifacts in this directory and
+prints per-call timings. Benchmarks that compare two implementations check
+that they agree before timing them.
+
+Usage:
+    python3 benchmark.py encoding [--repeat 2000]
+    python3 benchmark.py inference [--repeat 200]
+    python3 benchmark.py topk [--repeat 200]
+    python3 benchmark.py memory [--workers 4]
+    python3 benchmark.py startup [--runs 5]
+    python3 benchmark.py metrics [--repeat 2000]
+    python3 benchmark.py grid [--repeat 2000]
+    python3 benchmark.py variants [--repeat 2000]
+    python3 benchmark.py dataset [--scale 10]
+    python3 benchmark.py knowledge [--scale 10]
+    python3 benchmark.py eda [--scale 10] [--partitions 4]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+import urllib.request
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from artifact_bundle import is_bundle
+from artifacts import load_artifacts
+
+from features import FeatureEncoder, build_features, encode_features_pandas
+from load_test import free_port, random_profiles, start_gunicorn, worker_pids
+from metrics import Metrics
+from ranking import top_k_indices
+from recommendation_grid import grid_agreement
+from tree_engine import CompiledForest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Import-time budgets (ms, best of --runs) checked by the startup benchmark.
+# Raise them deliberately in the commit that needs more, not silently.
+STARTUP_BUDGETS_MS = {
+    ('app', 'compiled', 'bundle'): 300,
+    ('app', 'booster', 'bundle'): 2000,
+    ('eda', None, None): 600,
+}
+
+# Heavy modules that stay out of a process unless its path needs them
+DEFERRED_MODULES = ['pandas', 'joblib', 'sklearn', 'lightgbm', 'matplotlib', 'seaborn']
+
+# What each startup case is not allowed to import
+STARTUP_FORBIDDEN = {
+    ('app', 'compiled', 'bundle'): ['pandas', 'joblib', 'sklearn', 'lightgbm', 'matplotlib', 'seaborn'],
+    ('eda', None, None): ['matplotlib', 'seaborn'],
+}
+
+
+def time_per_call(func, repeat):
+    """Best-of-5 wall time per call in microseconds."""
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=5, number=repeat)) / repeat * 1e6
+
+
+def print_header(title):
+    print("\n" + "=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def bench_encoding(args):
+    """Single-row feature encoding: pandas reference path vs FeatureEncoder."""
+    training_columns = joblib.load(os.path.join(HERE, 'training_columns.joblib'))
+    encoder = FeatureEncoder(training_columns)
+    rows = [build_features(profile)[0] for profile in random_profiles(100)]
+
+    for feature_data in rows:
+        expected = encode_features_pandas([feature_data], training_columns).to_numpy(dtype=np.float64)
+        if not np.array_equal(encoder.transform([feature_data]), expected):
+            print("❌ FeatureEncoder output differs from the pandas path")
+            sys.exit(1)
+
+    feature_data = rows[0]
+    pandas_us = time_per_call(lambda: encode_features_pandas([feature_data], training_columns), args.repeat)
+    numpy_us = time_per_call(lambda: encoder.transform([feature_data]), args.repeat)
+
+    print_header("Single-row feature encoding")
+    print(f"  pandas (get_dummies + reindex): {pandas_us:10.2f} µs/row")
+    print(f"  FeatureEncoder (NumPy):         {numpy_us:10.2f} µs/row")
+    print(f"  Speedup:                        {pandas_us / numpy_us:10.1f}x")
+
+
+def bench_inference(args):
+    """Class probabilities: sklearn wrapper vs raw booster vs compiled tree arrays."""
+    model = joblib.load(os.path.join(HERE, 'exercise_model.joblib'))
+    training_columns = joblib.load(os.path.join(HERE, 'training_columns.joblib'))
+    encoder = FeatureEncoder(training_columns)
+    forest = CompiledForest.from_booster(model.booster_, model.classes_)
+
+    X = encoder.transform([build_features(profile)[0] for profile in random_profiles(256)])
+    max_diff = np.abs(forest.predict_proba(X) - model.booster_.predict(X)).max()
+    if max_diff > 1e-9:
+        print(f"❌ Compiled engine differs from LightGBM (max difference {max_diff:.2e})")
+        sys.exit(1)
+
+    print_header(f"Inference ({forest.n_trees} trees, max depth {forest.max_depth})")
+    for rows in (1, 16, 256):
+        batch = X[:rows]
+        frame = pd.DataFrame(batch, columns=training_columns)
+        repeat = max(1, args.repeat // rows)
+        wrapper_us = time_per_call(lambda: model.predict_proba(frame), repeat) / rows
+        booster_us = time_per_call(lambda: model.booster_.predict(batch), repeat) / rows
+        compiled_us = time_per_call(lambda: forest.predict_proba(batch), repeat) / rows
+        print(f"  batch={rows:<4} sklearn wrapper {wrapper_us:9.1f} µs/row | "
+              f"booster {booster_us:9.1f} µs/row | compiled {compiled_us:9.1f} µs/row")
+
+
+def sorted_top_k(probabilities, k):
+    """The full Python sort /predict used before top_k_indices, one row at a time."""
+    return [
+        [index for index, _ in sorted(enumerate(row), key=lambda x: x[1], reverse=True)[:k]]
+        for row in probabilities
+    ]
+
+
+def bench_topk(args):
+    """Top-k selection: full Python sort per row vs argpartition over the batch."""
+    rng = np.random.default_rng(0)
+    k = 4
+
+    print_header(f"Top-{k} selection (µs per row)")
+    print(f"  {'classes':>8} {'batch':>6} {'python sort':>12} {'argpartition':>13} {'speedup':>8}")
+    for n_classes in (10, 55, 500, 5000):
+        for rows in (1, 64, 1024):
+            probabilities = rng.dirichlet(np.ones(n_classes), size=rows)
+            if top_k_indices(probabilities, k).tolist() != sorted_top_k(probabilities, k):
+                print(f"❌ top_k_indices differs from the sorted selection ({n_classes} classes)")
+                sys.exit(1)
+
+            repeat = max(1, args.repeat // rows)
+            python_us = time_per_call(lambda: sorted_top_k(probabilities, k), repeat) / rows
+            # /predict selects from a single 1-D row, /predict/batch from the 2-D matrix
+            selected = probabilities[0] if rows == 1 else probabilities
+            numpy_us = time_per_call(lambda: top_k_indices(selected, k), repeat) / rows
+            print(f"  {n_classes:>8} {rows:>6} {python_us:>12.2f} {numpy_us:>13.2f} {python_us / numpy_us:>7.1f}x")
+
+
+def memory_kb(pid):
+    """RSS, PSS (shared pages split between sharers) and USS (private pages) in kB."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return fields['Rss'], fields['Pss'], private
+
+
+def bench_memory(args):
+    """Per-worker memory of gunicorn with and without preloaded, shared artifacts."""
+    modes = [
+        ('per-worker load (GUNICORN_PRELOAD=0)', {'GUNICORN_PRELOAD': '0'}),
+        ('preload + fork (GUNICORN_PRELOAD=1)', {'GUNICORN_PRELOAD': '1'})
+    ]
+    payload = json.dumps({'profiles': random_profiles(50)}).encode()
+
+    print_header(f"gunicorn memory per worker ({args.workers} workers, MB)")
+    print(f"  {'mode':<38} {'RSS':>8} {'PSS':>8} {'USS':>8} {'total PSS':>10}")
+    for label, env_overrides in modes:
+        port = free_port()
+        server = start_gunicorn(args.workers, port, dict(env_overrides, CACHE_SIZE='0'))
+        try:
+            # Let every worker score some traffic so steady-state pages are touched
+            for _ in range(args.workers * 10):
+                request = urllib.request.Request(
+                    f'http://127.0.0.1:{port}/predict/batch', data=payload,
+                    headers={'Content-Type': 'application/json'}
+                )
+                urllib.request.urlopen(request, timeout=30).read()
+
+            pids = [server.pid] + worker_pids(server.pid)
+            usage = [memory_kb(pid) for pid in pids]
+            workers = usage[1:]
+            rss, pss, uss = (sum(column) / len(workers) / 1024 for column in zip(*workers))
+            total_pss = sum(pss for _, pss, _ in usage) / 1024
+            print(f"  {label:<38} {rss:8.1f} {pss:8.1f} {uss:8.1f} {total_pss:10.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+    print("\n  RSS counts shared pages in every worker; USS is what each extra worker really costs.")
+    print("  total PSS covers the master and all workers.")
+
+
+def import_profile(module, env_overrides):
+    """
+    Import module in a fresh interpreter under -X importtime.
+
+    Returns (milliseconds to import module, set of every module imported).
+    """
+    env = dict(os.environ, **env_overrides)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, total, name = line.split('|')
+        if total.strip().isdigit():
+            cumulative.setdefault(name.strip(), int(total) / 1000)
+    return cumulative[module], set(cumulative)
+
+
+def bench_startup(args):
+    """Cold import time of the API and EDA script, checked against STARTUP_BUDGETS_MS."""
+    cases = [('app', engine, artifact_format)
+             for engine in ('compiled', 'booster') for artifact_format in ('bundle', 'joblib')]
+    cases.append(('eda', None, None))
+    if not is_bundle(os.path.join(HERE, 'model_bundle')):
+        print("  (no model_bundle/ here; bundle cases skipped — run train_model.py to create it)")
+        cases = [case for case in cases if case[2] != 'bundle']
+
+    failures = []
+    print_header(f"Startup import time (best of {args.runs} runs, ms)")
+    print(f"  {'case':<24} {'import':>8} {'budget':>8}  deferred modules loaded")
+    for module, engine, artifact_format in cases:
+        env = {'INFERENCE_ENGINE': engine, 'ARTIFACT_FORMAT': artifact_format} if engine else {}
+        profiles = [import_profile(module, env) for _ in range(args.runs)]
+        milliseconds = min(ms for ms, _ in profiles)
+        modules = profiles[0][1]
+
+        case = (module, engine, artifact_format)
+        label = module if engine is None else f'{module} {engine}/{artifact_format}'
+        budget = STARTUP_BUDGETS_MS.get(case)
+        loaded = [name for name in DEFERRED_MODULES if name in modules]
+        forbidden = [name for name in STARTUP_FORBIDDEN.get(case, []) if name in modules]
+        if budget is not None and milliseconds > budget:
+            failures.append(f'{label} took {milliseconds:.0f} ms (budget {budget} ms)')
+        if forbidden:
+            failures.append(f"{label} imported {', '.join(forbidden)}")
+
+        budget_text = f'{budget:>8}' if budget is not None else f"{'-':>8}"
+        print(f"  {label:<24} {milliseconds:>8.0f} {budget_text}  {', '.join(loaded) or '-'}")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("\n✓ Startup within budget")
+
+
+def bench_metrics(args):
+    """Cost of the per-stage request instrumentation, alone and on /predict."""
+    # Score every request so the comparison includes the full pipeline
+    os.environ['CACHE_SIZE'] = '0'
+    os.environ.setdefault('ARTIFACT_WATCH_INTERVAL', '0')
+    sys.path.insert(0, HERE)
+    os.chdir(HERE)
+    import app as api
+
+    registry = Metrics()
+
+    def instrument():
+        timer = registry.start('predict')
+        for stage in ('parse', 'features', 'predict', 'lookup', 'serialize'):
+            timer.mark(stage)
+        timer.finish(200)
+
+    timer_us = time_per_call(instrument, args.repeat)
+
+    client = api.app.test_client()
+    profile = random_profiles(1)[0]
+    repeat = max(1, args.repeat // 20)
+
+    def predict():
+        client.post('/predict', json=profile)
+
+    modes = [
+        ('metrics off', False, False),
+        ('metrics on', True, False),
+        ('metrics on + Server-Timing', True, True)
+    ]
+    timings = {label: [] for label, _, _ in modes}
+    # Many short interleaved rounds so drift in machine load affects every mode equally
+    for _ in range(15):
+        for label, enabled, header in modes:
+            api.metrics.enabled = enabled
+            api.SERVER_TIMING = header
+            timings[label].append(timeit.timeit(predict, number=repeat) / repeat * 1e6)
+
+    print_header("Request instrumentation overhead")
+    print(f"  StageTimer (5 marks + finish): {timer_us:8.2f} µs/request")
+    baseline = min(timings['metrics off'])
+    for label, _, _ in modes:
+        best = min(timings[label])
+        print(f"  /predict {label:<28} {best:9.1f} µs/request ({(best - baseline) / baseline * 100:+.1f}%)")
+    print(f"\n  The timer itself is {timer_us / baseline * 100:.2f}% of a /predict request; end-to-end")
+    print("  differences of a few percent either way are run-to-run noise.")
+
+
+def grid_profiles(axes, count, seed=0):
+    """Profiles drawn uniformly from inside the grid's ranges (integer levels and frequencies)."""
+    rng = random.Random(seed)
+    profiles = []
+    for _ in range(count):
+        profile = {field: rng.uniform(start, stop) for field, (start, stop, _) in axes.items()}
+        profile['Experience_Level'] = rng.randint(1, 3)
+        profile['Workout_Frequency (days/week)'] = rng.randint(1, 7)
+        profile['Gender'] = rng.choice(['Male', 'Female'])
+        profiles.append(profile)
+    return profiles
+
+
+def bench_grid(args):
+    """Precomputed recommendation grid: size, lookup vs live scoring, agreement."""
+    if not is_bundle(os.path.join(HERE, 'model_bundle')):
+        print("❌ No model_bundle/ here; run train_model.py first")
+        sys.exit(1)
+    artifacts = load_artifacts(HERE, engine='booster', artifact_format='bundle')
+    grid = artifacts.grid
+    if grid is None:
+        print("❌ model_bundle/ has no recommendation grid; retrain with PRECOMPUTE_GRID=1")
+        sys.exit(1)
+
+    rows = [build_features(profile)[0] for profile in grid_profiles(grid.axes, 2000)]
+    report = grid_agreement(grid, artifacts.predictor, artifacts.training_columns, rows)
+
+    feature_data = rows[0]
+    k = grid.top_k
+    grid_us = time_per_call(lambda: grid.lookup(feature_data, k), args.repeat)
+    live_us = time_per_call(lambda: top_k_indices(artifacts.predictor.predict_proba(
+        artifacts.feature_encoder.transform([feature_data]))[0], k), max(1, args.repeat // 20))
+
+    print_header(f"Recommendation grid ({len(grid):,} cells, top {k})")
+    print(f"  Shape:                 {grid.shape}")
+    print(f"  Memory:                {grid.nbytes / 1e6:10.2f} MB")
+    print(f"  Grid lookup:           {grid_us:10.2f} µs/profile")
+    print(f"  Live encode + predict: {live_us:10.2f} µs/profile ({live_us / grid_us:.0f}x)")
+    print(f"\n  Agreement with live inference on {report['rows']} profiles inside the grid's ranges:")
+    print(f"  Top-1 {report['top1_agreement']:.1%} | top-{k} overlap {report['topk_overlap']:.1%} | "
+          f"identical lists {report['topk_exact']:.1%} | confidence MAE {report['confidence_mae']:.4f}")
+
+
+def bench_variants(args):
+    """Full vs fast model variant: single-profile latency per engine and top-4 agreement."""
+    from fast_model import TOP_K, agreement
+    from recommendation_grid import DEFAULT_AXES
+
+    if not is_bundle(os.path.join(HERE, 'model_bundle')):
+        print("❌ No model_bundle/ here; run train_model.py first")
+        sys.exit(1)
+    rows = [build_features(profile)[0] for profile in grid_profiles(DEFAULT_AXES, 2000)]
+    for engine in ('booster', 'compiled'):
+        artifacts = load_artifacts(HERE, engine=engine, artifact_format='bundle', model_variant='fast')
+        if 'fast' not in artifacts.variants:
+            print("❌ model_bundle/ has no fast model variant; retrain with FAST_MODEL=1")
+            sys.exit(1)
+        X = artifacts.feature_encoder.transform(rows)
+        single = X[:1]
+
+        print_header(f"Model variants ({engine} engine)")
+        timings = {}
+        for name, predictor in artifacts.variants.items():
+            timings[name] = time_per_call(lambda: predictor.predict_proba(single), max(1, args.repeat // 20))
+            print(f"  {name:<5} {artifacts.describe_variants()[name]['trees']:>6} trees "
+                  f"{timings[name]:10.1f} µs/profile")
+        print(f"  fast is {timings['full'] / timings['fast']:.1f}x faster")
+        report = agreement(artifacts.variants['full'].predict_proba(X), artifacts.variants['fast'].predict_proba(X))
+        print(f"  Agreement with the full model on {len(rows)} random profiles: top-1 "
+              f"{report['top1_agreement']:.1%} | top-{TOP_K} overlap {report['topk_overlap']:.1%} | "
+              f"identical lists {report['topk_exact']:.1%}")
+
+
+# Training-data loaders compared by the dataset benchmark; each runs in a fresh
+# interpreter and prints [seconds, rows, frame bytes]
+DATASET_LOADERS = {
+    'baseline (interpreter + pandas only)': (
+        "df = pandas.DataFrame()\n"
+    ),
+    'read_csv (all columns, default dtypes)': (
+        "import pandas as pd\n"
+        "df = pd.read_csv(PATH)\n"
+    ),
+    'load_training_data (chunked, compact)': (
+        "from dataset import load_training_data\n"
+        "df, _ = load_training_data(PATH)\n"
+    ),
+    'load_training_data (columnar cache)': (
+        "from dataset import load_training_data\n"
+        "df, source = load_training_data(PATH, cache_dir=CACHE)\n"
+        "assert source == 'cache'\n"
+    ),
+}
+
+
+def dataset_run(loader, path, cache_dir):
+    """Run one loader in a fresh interpreter; returns (seconds, rows, frame MB, peak RSS MB)."""
+    script = (
+        "import json, time\n"
+        "import pandas\n"
+        f"PATH, CACHE = {path!r}, {cache_dir!r}\n"
+        "started = time.perf_counter()\n"
+        + loader +
+        "seconds = time.perf_counter() - started\n"
+        "peak = [int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmHWM:')][0]\n"
+        "print(json.dumps([seconds, len(df), int(df.memory_usage(deep=True).sum()), peak]))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=HERE, capture_output=True, text=True, check=True)
+    seconds, rows, frame_bytes, peak_kb = json.loads(result.stdout)
+    return seconds, rows, frame_bytes / 1e6, peak_kb / 1024
+
+
+def scaled_csv(workdir, scale):
+    """Final_data.csv with its data rows repeated scale times, written to workdir."""
+    source = os.path.join(HERE, 'Final_data.csv')
+    if not os.path.exists(source):
+        print("❌ Final_data.csv not found next to benchmark.py")
+        sys.exit(1)
+    path = os.path.join(workdir, 'Final_data.csv')
+    with open(source, encoding='utf-8') as f:
+        header, *lines = f.read().splitlines(keepends=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(header)
+        for _ in range(scale):
+            f.writelines(lines)
+    return path
+
+
+def bench_dataset(args):
+    """Training data load time and peak memory: plain read_csv vs the compact loader and its cache."""
+    from dataset import load_training_data
+
+    workdir = tempfile.mkdtemp(prefix='dataset-bench-')
+    try:
+        path = scaled_csv(workdir, args.scale)
+        cache_dir = os.path.join(workdir, 'cache')
+        load_training_data(path, cache_dir=cache_dir)
+
+        print_header(f"Training data loading ({os.path.getsize(path) / 1e6:.1f} MB CSV, best of {args.runs} runs)")
+        print(f"  {'loader':<40} {'rows':>9} {'load s':>8} {'frame MB':>9} {'peak MB':>8}")
+        for label, loader in DATASET_LOADERS.items():
+            runs = [dataset_run(loader, path, cache_dir) for _ in range(args.runs)]
+            seconds = min(run[0] for run in runs)
+            _, rows, frame_mb, peak_mb = runs[0]
+            print(f"  {label:<40} {rows:>9,} {seconds:>8.3f} {frame_mb:>9.1f} {peak_mb:>8.1f}")
+        print("\n  peak MB is the process's peak RSS (VmHWM); compare it with the baseline row.")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# Knowledge base builds compared by the knowledge benchmark (df is the exercise KB)
+KNOWLEDGE_BUILDERS = {
+    'baseline (interpreter + pandas only)': (
+        "df = pandas.DataFrame()\n"
+    ),
+    'read_csv + two groupby passes': (
+        "import pandas as pd\n"
+        "from knowledge_aggregates import knowledge_bases\n"
+        "df, diet = knowledge_bases(pd.read_csv(PATH))\n"
+    ),
+    'build_knowledge_aggregates (streaming)': (
+        "from knowledge_aggregates import build_knowledge_aggregates\n"
+        "aggregates = build_knowledge_aggregates(PATH)\n"
+        "df, diet = aggregates.exercise_kb(), aggregates.diet_kb()\n"
+    ),
+}
+
+
+def bench_knowledge(args):
+    """Knowledge base build time and peak memory: in-memory groupby vs the streaming single pass."""
+    import pandas as pd
+    from knowledge_aggregates import build_knowledge_aggregates, knowledge_bases
+
+    workdir = tempfile.mkdtemp(prefix='knowledge-bench-')
+    try:
+        path = scaled_csv(workdir, args.scale)
+        aggregates = build_knowledge_aggregates(path)
+        expected_kb, expected_diet_kb = knowledge_bases(pd.read_csv(path))
+        if not (aggregates.exercise_kb().equals(expected_kb) and aggregates.diet_kb().equals(expected_diet_kb)):
+            print("❌ Streaming knowledge bases differ from the groupby build")
+            sys.exit(1)
+        print("✓ Streaming knowledge bases identical to the groupby build")
+
+        print_header(f"Knowledge base build ({os.path.getsize(path) / 1e6:.1f} MB CSV, best of {args.runs} runs)")
+        print(f"  {'builder':<40} {'seconds':>8} {'peak MB':>8}")
+        for label, builder in KNOWLEDGE_BUILDERS.items():
+            runs = [dataset_run(builder, path, None) for _ in range(args.runs)]
+            print(f"  {label:<40} {min(run[0] for run in runs):>8.3f} {runs[0][3]:>8.1f}")
+        print("\n  peak MB is the process's peak RSS (VmHWM); compare it with the baseline row.")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def eda_run(path, extra):
+    """Run eda.py on path (report to /dev/null) in a fresh interpreter; returns (seconds, peak RSS MB)."""
+    script = (
+        "import contextlib, json, os, sys, time\n"
+        "import eda\n"
+        f"sys.argv = ['eda.py', {path!r}, '--no-heatmap', *{list(extra)!r}]\n"
+        "started = time.perf_counter()\n"
+        "with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):\n"
+        "    eda.main()\n"
+        "seconds = time.perf_counter() - started\n"
+        "peak = [int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmHWM:')][0]\n"
+        "print(json.dumps([seconds, peak]))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=HERE, capture_output=True, text=True, check=True)
+    seconds, peak_kb = json.loads(result.stdout)
+    return seconds, peak_kb / 1024
+
+
+# EDA report modes compared by the eda benchmark (extra eda.py arguments)
+EDA_MODES = {
+    'in-memory (read_csv)': [],
+    'streaming (--stream)': ['--stream'],
+    'stored profile (--cache), file unchanged': ['--cache'],
+}
+
+
+def split_csv(path, directory, parts):
+    """Split a CSV into parts files of consecutive rows (each with the header) in directory."""
+    os.makedirs(directory)
+    with open(path, encoding='utf-8') as f:
+        header, *lines = f.read().splitlines(keepends=True)
+    size = -(-len(lines) // parts)
+    for part in range(parts):
+        with open(os.path.join(directory, f'part-{part}.csv'), 'w', encoding='utf-8') as f:
+            f.write(header)
+            f.writelines(lines[part * size:(part + 1) * size])
+    return directory
+
+
+def bench_eda(args):
+    """EDA report time and peak memory: whole DataFrame, streaming, stored profiles, partitions in parallel."""
+    workdir = tempfile.mkdtemp(prefix='eda-bench-')
+    try:
+        path = scaled_csv(workdir, args.scale)
+        partitions = split_csv(path, os.path.join(workdir, 'partitions'), args.partitions)
+        cores = os.cpu_count() or 1
+        cases = [(label, path, extra) for label, extra in EDA_MODES.items()]
+        cases.append((f'{args.partitions} partitions, --workers 1', partitions, ['--workers', '1']))
+        if cores > 1:
+            cases.append((f'{args.partitions} partitions, --workers {cores}', partitions, ['--workers', str(cores)]))
+        print_header(f"EDA report ({os.path.getsize(path) / 1e6:.1f} MB CSV, best of {args.runs} runs)")
+        print(f"  {'mode':<40} {'seconds':>8} {'peak MB':>8}")
+        for label, target, extra in cases:
+            if '--cache' in extra:
+                eda_run(target, extra)  # writes the stored profile
+            runs = [eda_run(target, extra) for _ in range(args.runs)]
+            print(f"  {label:<40} {min(run[0] for run in runs):>8.3f} {max(run[1] for run in runs):>8.1f}")
+        with open(os.path.join(HERE, 'Final_data.csv'), encoding='utf-8') as source, \
+                open(path, 'a', encoding='utf-8') as f:
+            appended = source.readlines()[1:]
+            f.writelines(appended)
+        seconds, peak = eda_run(path, ['--cache'])
+        print(f"  {f'stored profile + {len(appended)} appended rows':<40} {seconds:>8.3f} {peak:>8.1f}")
+        print("\n  Peak MB is the main process only; each partition worker holds one chunk at a time.")
+        if cores == 1:
+            print("  Only one core available: the parallel partition case is skipped.")
+        print("  test_eda_stream.py checks the streaming and partitioned reports against the in-memory one.")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    'encoding': bench_encoding,
+    'inference': bench_inference,
+    'topk': bench_topk,
+    'memory': bench_memory,
+    'startup': bench_startup,
+    'metrics': bench_metrics,
+    'grid': bench_grid,
+    'variants': bench_variants,
+    'dataset': bench_dataset,
+    'knowledge': bench_knowledge,
+    'eda': bench_eda,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks for the prediction hot path')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS), help='Benchmark to run')
+    parser.add_argument('--repeat', type=int, default=2000, help='Calls per timing sample (default: 2000)')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers for the memory benchmark (default: 4)')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Fresh interpreters per startup, dataset, knowledge or eda case (default: 5)')
+    parser.add_argument('--scale', type=int, default=1,
+                        help='Copies of Final_data.csv rows for the dataset, knowledge and eda benchmarks (default: 1)')
+    parser.add_argument('--partitions', type=int, default=4,
+                        help='Files the eda benchmark splits the scaled CSV into (default: 4)')
+    args = parser.parse_args()
+
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == '__main__':
+    main()
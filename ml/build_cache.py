@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+build_cache.py
+Fingerprint-based stage cache for train_model.py.
+
+Each artifact stage (model, training columns, knowledge bases, ...) is
+described by a fingerprint of everything its output depends on: a content
+hash of the training data it reads, the columns it uses, its parameters,
+the versions of the libraries that compute it and the source of the
+modules it runs. build_manifest.json records, per stage, the fingerprint it
+was last built with, the size and mtime of its output files and how long
+the build took. A stage whose fingerprint matches and whose outputs are
+still the files it wrote (not replaced, e.g. by retrain_incremental.py) is
+skipped; --force rebuilds everything.
+
+Usage:
+    cache = BuildCache('build_manifest.json', force=False)
+    fingerprint = stage_fingerprint({'data': file_digest('Final_data.csv'), 'params': params})
+    if cache.fresh('model', fingerprint, ['exercise_model.joblib']):
+        cache.skipped('model')
+    else:
+        ...
+        cache.built('model', fingerprint, ['exercise_model.joblib'], seconds)
+    print('\n'.join(cache.summary()))
+"""
+
+import hashlib
+import json
+import os
+import platform
+from importlib.metadata import PackageNotFoundError, version
+
+from response_cache import artifact_fingerprint
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BUILD_MANIFEST = 'build_manifest.json'
+# Bumped when the manifest layout changes (older manifests rebuild everything)
+BUILD_FORMAT = 1
+
+
+def file_digest(path, end=None):
+    """SHA-256 of the first end bytes of a file (the whole file by default)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        left = os.path.getsize(path) if end is None else end
+        while left > 0:
+            block = f.read(min(left, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            left -= len(block)
+    return digest.hexdigest()
+
+
+def source_digest(modules):
+    """SHA-256 of the source files of modules next to this one (e.g. ['dataset.py'])."""
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(module.encode())
+        digest.update(bytes.fromhex(file_digest(os.path.join(HERE, module))))
+    return digest.hexdigest()
+
+
+def library_versions(packages):
+    """Installed version of each package (None if missing), plus the Python version."""
+    versions = {'python': platform.python_version()}
+    for package in packages:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def environment(names):
+    """The settings read from these environment variables (None when unset)."""
+    return {name: os.environ.get(name) for name in names}
+
+
+def stage_fingerprint(inputs):
+    """Hash of a JSON-serializable description of a stage's inputs."""
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class BuildCache:
+    """The stages recorded in a build manifest, and what this run did with each."""
+
+    def __init__(self, path=BUILD_MANIFEST, force=False):
+        self.path = path
+        self.force = force
+        self.stages = {}
+        self.runs = []
+        try:
+            with open(path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('format') == BUILD_FORMAT:
+                self.stages = manifest['stages']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def fresh(self, stage, fingerprint, outputs):
+        """True if stage was built with fingerprint and its outputs are unchanged since."""
+        entry = self.stages.get(stage)
+        if self.force or entry is None or entry['fingerprint'] != fingerprint:
+            return False
+        if not all(os.path.exists(path) for path in outputs):
+            return False
+        return entry['outputs'] == artifact_fingerprint(outputs)
+
+    def skipped(self, stage):
+        """Record that stage was skipped; it saved about as long as its last build took."""
+        self.runs.append((stage, 'skipped', 0.0, self.stages[stage]['seconds']))
+
+    def built(self, stage, fingerprint, outputs, seconds):
+        """Record a build of stage (after its outputs are written) and save the manifest."""
+        self.stages[stage] = {'fingerprint': fingerprint, 'outputs': artifact_fingerprint(outputs),
+                              'files': list(outputs), 'seconds': round(seconds, 3)}
+        self.runs.append((stage, 'forced' if self.force else 'built', seconds, 0.0))
+        staging = self.path + '.tmp'
+        with open(staging, 'w', encoding='utf-8') as f:
+            json.dump({'format': BUILD_FORMAT, 'stages': self.stages}, f, indent=2)
+        os.replace(staging, self.path)
+
+    def summary(self):
+        """Per-stage status, time spent and time saved, as printable lines."""
+        lines = [f"  {'stage':<18} {'status':<8} {'seconds':>8} {'saved':>8}"]
+        for stage, status, seconds, saved in self.runs:
+            lines.append(f"  {stage:<18} {status:<8} {seconds:>8.2f} {saved:>8.2f}")
+        lines.append(f"  {'total':<18} {'':<8} {sum(run[2] for run in self.runs):>8.2f} "
+                     f"{sum(run[3] for run in self.runs):>8.2f}")
+        return lines
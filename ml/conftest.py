@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+conftest.py
+Shared pytest fixtures: small synthetic LightGBM models and an artifact
+directory holding one of them bundled with the shipped knowledge bases.
+TRAINING_COLUMNS is the encoded column layout those models are fitted on.
+
+Usage:
+    from conftest import TRAINING_COLUMNS
+
+    def test_something(artifact_dir, fit_classifier, fit_model): ...
+"""
+
+import os
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+from artifact_bundle import write_bundle
+from tree_engine import CompiledForest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TRAINING_COLUMNS = ['Age', 'Weight (kg)', 'Height (m)', 'BMI', 'Fat_Percentage',
+                    'Experience_Level', 'Workout_Frequency (days/week)', 'Gender_Male']
+
+
+def _fit_model(X, y, n_estimators=10, **params):
+    """An LGBMClassifier with n_estimators rounds (and any other params) fitted on X, y."""
+    return lgb.LGBMClassifier(random_state=42, n_estimators=n_estimators, verbose=-1, **params).fit(X, y)
+
+
+def _fit_classifier(names, seed=0, n_estimators=10):
+    """A classifier over TRAINING_COLUMNS predicting names from 300 rows of random features."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(300, len(TRAINING_COLUMNS)))
+    return _fit_model(X, np.asarray(names)[rng.integers(0, len(names), 300)], n_estimators)
+
+
+@pytest.fixture(scope='session')
+def fit_model():
+    return _fit_model
+
+
+@pytest.fixture(scope='session')
+def fit_classifier():
+    return _fit_classifier
+
+
+@pytest.fixture(scope='session')
+def exercise_names():
+    """The first six exercises of the shipped knowledge base."""
+    exercise_kb = joblib.load(os.path.join(HERE, 'knowledge_base.joblib'))
+    return exercise_kb['Name of Exercise'].unique()[:6]
+
+
+@pytest.fixture(scope='module')
+def artifact_dir(tmp_path_factory, exercise_names):
+    """A directory with model_bundle/ for a synthetic model over exercise_names."""
+    exercise_kb = joblib.load(os.path.join(HERE, 'knowledge_base.joblib'))
+    diet_kb = joblib.load(os.path.join(HERE, 'diet_knowledge_base.joblib'))
+    model = _fit_classifier(exercise_names)
+
+    directory = tmp_path_factory.mktemp('artifacts')
+    forest = CompiledForest.from_booster(model.booster_, model.classes_)
+    write_bundle(str(directory / 'model_bundle'), forest, TRAINING_COLUMNS, exercise_kb, diet_kb, model.booster_)
+    return str(directory)
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+dataset.py
+Compact, chunked loading of the training dataset.
+
+train_model.py only needs the model features, the target and the knowledge
+base fields, so only those columns are parsed. The CSV is read in chunks:
+- low-cardinality text columns (gender, exercise names, diet and meal
+  types, ...) become categoricals with sorted categories, so groupby output
+  keeps the same order as with plain strings
+- integer columns are downcast to the smallest integer type, and float
+  columns to float32 only where that keeps every value exact, so the model
+  and the knowledge base averages do not change
+Peak memory is the compact frame plus one raw chunk instead of the whole
+CSV as Python strings and 64-bit numbers.
+
+data_checkpoint() records how far into the CSV a training run read (only
+whole lines; open_prefix() lets every reader stop at the same byte), and
+read_appended_rows() later returns only the rows appended after that point
+(for retrain_incremental.py).
+
+With a cache directory, the loaded columns are also saved as .npy files
+(categoricals as integer codes plus their categories). Later runs load those
+directly and skip CSV parsing until the CSV's size or mtime changes.
+
+Usage:
+    df, source = load_training_data('Final_data.csv')
+    df, source = load_training_data('Final_data.csv', cache_dir='dataset_cache')
+    knowledge_base = plain_columns(knowledge_base)
+    new_rows, checkpoint = read_appended_rows('Final_data.csv', checkpoint)
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from response_cache import artifact_fingerprint
+
+# Model inputs (before one-hot encoding) and target
+FEATURE_COLUMNS = [
+    'Age', 'Gender', 'Weight (kg)', 'Height (m)', 'BMI', 'Fat_Percentage',
+    'Experience_Level', 'Workout_Frequency (days/week)'
+]
+TARGET_COLUMN = 'Name of Exercise'
+
+# Columns the model is trained on
+MODEL_COLUMNS = FEATURE_COLUMNS + [TARGET_COLUMN]
+
+# Model columns plus the knowledge base fields
+DATASET_COLUMNS = [
+    'Age', 'Gender', 'Weight (kg)', 'Height (m)', 'BMI', 'Fat_Percentage',
+    'Experience_Level', 'Workout_Frequency (days/week)',
+    'Name of Exercise',
+    'Sets', 'Reps', 'Burns Calories (per 30 min)', 'Benefit', 'Equipment Needed',
+    'Target Muscle Group', 'Difficulty Level',
+    'diet_type', 'meal_type', 'Calories', 'Carbs', 'Proteins', 'Fats'
+]
+
+# Low-cardinality text columns stored as categoricals
+CATEGORICAL_COLUMNS = [
+    'Gender', 'Name of Exercise', 'Benefit', 'Equipment Needed',
+    'Target Muscle Group', 'Difficulty Level', 'diet_type', 'meal_type'
+]
+
+CHUNK_SIZE = 100000
+CACHE_FORMAT = 1
+CACHE_MANIFEST = 'manifest.json'
+
+# Bytes before a checkpoint's offset hashed to detect a rewritten (not appended) CSV
+CHECKPOINT_TAIL_BYTES = 65536
+
+
+def downcast(series):
+    """Smallest dtype that holds every value of a numeric column exactly."""
+    kind = series.dtype.kind
+    if kind in 'iu':
+        return pd.to_numeric(series, downcast='integer' if kind == 'i' else 'unsigned')
+    if kind == 'f':
+        values = series.to_numpy()
+        narrow = values.astype(np.float32)
+        if np.array_equal(narrow.astype(values.dtype), values, equal_nan=True):
+            return pd.Series(narrow, index=series.index, name=series.name)
+    return series
+
+
+def read_csv_compact(path, columns=DATASET_COLUMNS, categorical=CATEGORICAL_COLUMNS, chunk_size=CHUNK_SIZE):
+    """Read ``columns`` of a CSV chunk by chunk into a compact DataFrame."""
+    categorical = [column for column in columns if column in categorical]
+    dtypes = {column: 'category' for column in categorical}
+
+    chunks = []
+    with pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            for column in chunk.columns:
+                if column not in dtypes:
+                    chunk[column] = downcast(chunk[column])
+            chunks.append(chunk)
+
+    if not chunks:
+        return pd.read_csv(path, usecols=columns, dtype=dtypes)[columns]
+
+    # Chunks see different category sets; merge them into one sorted set per column
+    merged = {
+        column: union_categoricals([chunk[column] for chunk in chunks], sort_categories=True)
+        for column in categorical
+    }
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for column, values in merged.items():
+        df[column] = values
+    return df[columns]
+
+
+def _save_cache(df, cache_dir, fingerprint):
+    """Write one .npy per column plus a manifest, replacing any previous cache."""
+    staging = cache_dir + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    entries = []
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        entry = {'name': column, 'file': f'column_{i}.npy'}
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            entry['categories'] = values.cat.categories.tolist()
+            data = values.cat.codes.to_numpy()
+        else:
+            data = values.to_numpy()
+        np.save(os.path.join(staging, entry['file']), data)
+        entries.append(entry)
+
+    with open(os.path.join(staging, CACHE_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({'format': CACHE_FORMAT, 'source': fingerprint, 'rows': len(df), 'columns': entries}, f, indent=2)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.rename(staging, cache_dir)
+
+
+def _load_cache(cache_dir, fingerprint, columns):
+    """The cached frame, or None if there is no cache for this CSV and column set."""
+    try:
+        with open(os.path.join(cache_dir, CACHE_MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    entries = {entry['name']: entry for entry in manifest['columns']}
+    if manifest.get('format') != CACHE_FORMAT or manifest.get('source') != fingerprint \
+            or not set(columns) <= set(entries):
+        return None
+
+    data = {}
+    for column in columns:
+        entry = entries[column]
+        values = np.load(os.path.join(cache_dir, entry['file']))
+        if 'categories' in entry:
+            values = pd.Categorical.from_codes(values, categories=entry['categories'])
+        data[column] = values
+    # copy=False keeps the loaded arrays as the frame's columns instead of
+    # consolidating them into new blocks (which doubles peak memory)
+    return pd.DataFrame(data, copy=False)
+
+
+def combined_dtype(current, new):
+    """The dtype read_csv gives a column whose chunks were read as current and new (current may be None)."""
+    if current is None or current == new:
+        return new
+    if pd.api.types.is_numeric_dtype(current) and pd.api.types.is_numeric_dtype(new):
+        return np.result_type(current, new)
+    return np.dtype(object)
+
+
+def plain_columns(df):
+    """
+    Copy of df with the dtypes read_csv gives: categoricals back to text and
+    downcast numbers back to 64 bits (both exact).
+    """
+    df = df.copy()
+    for column in df.columns:
+        dtype = df[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(dtype.categories.dtype)
+        elif dtype.kind in 'iu' and dtype != np.int64:
+            df[column] = df[column].astype(np.int64)
+        elif dtype.kind == 'f' and dtype != np.float64:
+            df[column] = df[column].astype(np.float64)
+    return df
+
+
+def load_training_data(path, columns=DATASET_COLUMNS, categorical=CATEGORICAL_COLUMNS,
+                       chunk_size=CHUNK_SIZE, cache_dir=None, end=None):
+    """
+    Load ``columns`` of the training CSV as a compact DataFrame.
+
+    With cache_dir, a columnar copy is reused while the CSV is unchanged
+    and written after parsing otherwise. With end (a data_checkpoint
+    offset), only the rows before that byte offset are read; the cache is
+    bypassed when that is not the whole file. Returns (df, source) where
+    source is 'csv' or 'cache'.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File not found: {path}")
+    if end is not None and end < os.path.getsize(path):
+        with open_prefix(path, end) as f:
+            return read_csv_compact(f, columns, categorical, chunk_size), 'csv'
+
+    fingerprint = artifact_fingerprint([path])
+    if cache_dir:
+        df = _load_cache(cache_dir, fingerprint, columns)
+        if df is not None:
+            return df, 'cache'
+
+    df = read_csv_compact(path, columns, categorical, chunk_size)
+    if cache_dir:
+        _save_cache(df, cache_dir, fingerprint)
+    return df, 'csv'
+
+
+def _tail_digest(f, offset):
+    f.seek(max(0, offset - CHECKPOINT_TAIL_BYTES))
+    return hashlib.sha256(f.read(offset - max(0, offset - CHECKPOINT_TAIL_BYTES))).hexdigest()
+
+
+def data_checkpoint(path, rows=None):
+    """
+    Where a read of the CSV's complete lines ends: the offset after its last
+    newline, the number of data rows read (filled in by the caller) and a
+    digest of the bytes just before the offset.
+    """
+    with open(path, 'rb') as f:
+        offset = f.seek(0, os.SEEK_END)
+        while offset > 0:
+            start = max(0, offset - CHECKPOINT_TAIL_BYTES)
+            f.seek(start)
+            newline = f.read(offset - start).rfind(b'\n')
+            if newline >= 0:
+                offset = start + newline + 1
+                break
+            offset = start
+        return {'offset': offset, 'rows': rows, 'tail_sha256': _tail_digest(f, offset)}
+
+
+class _Prefix(io.RawIOBase):
+    """The first ``end`` bytes of a file as a read-only stream."""
+
+    def __init__(self, path, end):
+        self._file = open(path, 'rb')
+        self._left = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self._file.readinto(memoryview(buffer)[:min(len(buffer), self._left)])
+        self._left -= count
+        return count
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def open_prefix(path, end):
+    """
+    A binary file object that reads only the first end bytes of path, so
+    several readers see the same rows while the CSV is being appended to.
+    """
+    return io.BufferedReader(_Prefix(path, end))
+
+
+def read_appended_rows(path, checkpoint, columns=DATASET_COLUMNS, categorical=CATEGORICAL_COLUMNS):
+    """
+    Rows appended to the CSV since checkpoint, as a compact DataFrame (None
+    if there are none), and the checkpoint after them. A trailing line
+    without a newline is left for the next read.
+
+    Raises ValueError if the CSV was rewritten rather than appended to.
+    """
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        offset = checkpoint['offset']
+        if size < offset or _tail_digest(f, offset) != checkpoint['tail_sha256']:
+            raise ValueError(f"{path} changed before the checkpoint (not just appended to); retrain from scratch")
+        f.seek(max(0, offset - 1))
+        if offset and f.read(1) != b'\n':
+            raise ValueError(f"{path} did not end with a newline at the checkpoint; retrain from scratch")
+
+        appended = f.read(size - offset)
+        appended = appended[:appended.rfind(b'\n') + 1]
+        if not appended.strip():
+            return None, checkpoint
+        f.seek(0)
+        header = f.readline()
+
+    df = read_csv_compact(io.BytesIO(header + appended), columns, categorical)
+    end = offset + len(appended)
+    with open(path, 'rb') as f:
+        tail = _tail_digest(f, end)
+    return df, {'offset': end, 'rows': checkpoint['rows'] + len(df), 'tail_sha256': tail}
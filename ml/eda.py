@@ -4,13 +4,30 @@ eda.py
 Comprehensive exploratory data analysis script using pandas.
 Usage:
     python3 eda.py [path/to/Final_data.csv]
+    python3 eda.py --stream [--chunk-size 100000] path/to/large.csv
+    python3 eda.py [--workers 4] [--by-partition] path/to/partitions/       (or 'data/part-*.csv')
+    python3 eda.py --cache [--out-md report.md] path/to/large.csv
 If no path is provided, it will attempt to load 'Final_data.csv' from the script directory.
 
-Outputs printed to stdout. Saves a correlation heatmap to `correlation_heatmap.png` if numeric columns exist.
+--stream builds the same report from the CSV chunk by chunk (see eda_stream.py) instead of loading it
+into memory: counts, dtypes and value counts are exact, moments and correlations equal up to rounding,
+and percentiles within 1%.
+
+A directory (every *.csv in it) or a glob profiles each file as a partition in a process pool (--workers,
+default one per core) with the same accumulators, and merges the partial profiles into one report;
+--by-partition adds a per-partition breakdown. Partitions may order their columns differently.
+
+--cache (streaming) keeps each file's profile next to it as <csv>.profile.pkl, keyed by the file's size,
+mtime and content hash: an unchanged file is not read again, a file that has only had rows appended has just
+the new lines read, and the report, --out-md and the heatmap are all drawn from the stored profile.
+
+Outputs printed to stdout. Saves a correlation heatmap to `correlation_heatmap.png` if numeric columns exist
+(matplotlib and seaborn are only imported when the heatmap is drawn; --no-heatmap skips it).
 """
 
 import sys
 import os
+import glob
 from textwrap import shorten
 import argparse
 from datetime import datetime
@@ -19,12 +36,6 @@ import io
 import pandas as pd
 import numpy as np
 
-# plotting (use Agg backend for headless environments)
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
-
 # 1. Pandas display options
 pd.set_option('display.max_columns', None)
 pd.set_option('display.width', 1000)
@@ -33,6 +44,9 @@ pd.set_option('display.max_colwidth', 200)
 # If --out-md is used we will collect printed lines here and write at the end
 md_lines = None
 
+# Percentiles of the numerical columns summary
+PERCENTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
 
 def _log(msg):
     """Prints to stdout and appends to md_lines if enabled.
@@ -88,33 +102,46 @@ def basic_info(df: pd.DataFrame):
 
 
 def missing_values_summary(df: pd.DataFrame):
+    _log_missing_values(df.isnull().sum(), len(df))
+
+
+def _log_missing_values(missing: pd.Series, rows: int):
     print_header('2. Missing Values Summary')
-    missing = df.isnull().sum()
     missing = missing[missing > 0].sort_values(ascending=False)
     if missing.empty:
         _log('No missing values found.')
     else:
-        pct = (missing / len(df) * 100).round(2)
+        pct = (missing / rows * 100).round(2)
         summary = pd.DataFrame({'missing_count': missing, 'missing_pct': pct})
         _log(summary.to_string())
 
 
 def duplicate_summary(df: pd.DataFrame):
+    _log_duplicates(df.duplicated().sum())
+
+
+def _log_duplicates(dup_count: int):
     print_header('3. Duplicate Rows')
-    dup_count = df.duplicated().sum()
     _log(f'Duplicate rows (exact duplicates): {dup_count}')
 
 
 def numeric_summary(df: pd.DataFrame):
-    print_header('4. Numerical Columns Summary')
     num = df.select_dtypes(include=[np.number])
     if num.shape[1] == 0:
-        _log('No numeric columns found.')
+        _log_numeric_summary(None)
         return
-    desc = num.describe(percentiles=[0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]).T
+    desc = num.describe(percentiles=PERCENTILES).T
     desc['skew'] = num.skew()
     desc['kurtosis'] = num.kurtosis()
     desc['missing_pct'] = (num.isnull().sum() / len(df) * 100).round(3)
+    _log_numeric_summary(desc)
+
+
+def _log_numeric_summary(desc):
+    print_header('4. Numerical Columns Summary')
+    if desc is None:
+        _log('No numeric columns found.')
+        return
     _log(desc.to_string())
 
     # show top 10 most skewed numeric columns
@@ -130,33 +157,53 @@ def categorical_summary(df: pd.DataFrame):
         _log('No categorical columns found.')
         return
     for col in cat.columns:
-        _log(f'--- Column: {col} ---')
-        nunique = cat[col].nunique(dropna=False)
-        cnt = cat[col].value_counts(dropna=False)
+        _log_categorical_column(col, cat[col].nunique(dropna=False), cat[col].value_counts(dropna=False),
+                                cat[col].unique().tolist())
+
+
+def _log_categorical_column(col, nunique, cnt, unique_values, count_error=0):
+    _log(f'--- Column: {col} ---')
+    if count_error:
+        # Streaming heavy-hitter counts of a column with many distinct values
+        _log(f'Unique values (incl. NaN): more than {nunique}')
+        _log(f'Top value counts (each low by at most {count_error}):')
+    else:
         _log(f'Unique values (incl. NaN): {nunique}')
         _log('Top value counts:')
-        _log(cnt.head(10).to_string())
-        if nunique <= 25:
-            _log('All unique values:')
-            _log(str(cat[col].unique().tolist()))
-        else:
-            sample_vals = pd.Series(cat[col].unique()).dropna().astype(str).tolist()[:10]
-            _log('Sample unique values:')
-            _log(str(sample_vals))
-        _log('-' * 40)
+    _log(cnt.head(10).to_string())
+    if nunique <= 25 and not count_error:
+        _log('All unique values:')
+        _log(str(unique_values))
+    else:
+        sample_vals = pd.Series(unique_values).dropna().astype(str).tolist()[:10]
+        _log('Sample unique values:')
+        _log(str(sample_vals))
+    _log('-' * 40)
 
 
-def correlation_and_heatmap(df: pd.DataFrame, outpath='correlation_heatmap.png'):
+def correlation_and_heatmap(df: pd.DataFrame, outpath='correlation_heatmap.png', heatmap=True):
     print_header('6. Correlation Matrix (Pearson)')
     num = df.select_dtypes(include=[np.number])
     if num.shape[1] < 2:
         _log('Not enough numeric columns to compute correlations.')
         return
-    corr = num.corr()
+    _log_correlation(num.corr(), outpath, heatmap)
+
+
+def _log_correlation(corr, outpath, heatmap):
     _log(corr.to_string())
+    if not heatmap:
+        return
+
+    # Plotting libraries take longer to import than the rest of the report
+    # needs, so they are only loaded here (Agg backend for headless environments)
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
     # Save heatmap
-    plt.figure(figsize=(min(12, 0.5 * num.shape[1]), min(10, 0.4 * num.shape[1])))
+    plt.figure(figsize=(min(12, 0.5 * corr.shape[1]), min(10, 0.4 * corr.shape[1])))
     sns.heatmap(corr, annot=False, cmap='coolwarm', center=0)
     plt.title('Correlation heatmap')
     plt.tight_layout()
@@ -177,49 +224,168 @@ def target_analysis(df: pd.DataFrame):
             if df[col].nunique() <= 10 and df[col].dtype != 'float64':
                 candidates.append(col)
     if not candidates:
-        print_header('7. Target column not detected automatically')
-        _log('No obvious `target`/`label` column found.')
+        _log_target(None, None, None, None)
         return
 
     col = candidates[0]
+    stats = df[col].describe() if pd.api.types.is_numeric_dtype(df[col]) else None
+    _log_target(col, df[col].dtype, df[col].value_counts(dropna=False), stats)
+
+
+def _log_target(col, dtype, counts, stats):
+    if col is None:
+        print_header('7. Target column not detected automatically')
+        _log('No obvious `target`/`label` column found.')
+        return
     print_header(f'7. Target/Label Analysis ({col})')
-    _log(f'Dtype: {df[col].dtype}')
+    _log(f'Dtype: {dtype}')
     _log('Unique values and counts:')
-    _log(df[col].value_counts(dropna=False).to_string())
-    if pd.api.types.is_numeric_dtype(df[col]):
+    _log(counts.to_string() if counts is not None else 'Too many distinct values to count while streaming.')
+    if stats is not None:
         _log('\nNumeric target stats:')
-        _log(df[col].describe().to_string())
+        _log(stats.to_string())
 
 
 def quick_recommendations(df: pd.DataFrame):
-    print_header('8. Quick Modeling Recommendations')
-    recs = []
     num = df.select_dtypes(include=[np.number])
     cat = df.select_dtypes(include=['object', 'category'])
-    if num.shape[1] == 0:
+    _log_recommendations(num.shape[1], cat.shape[1], df.isnull().any().any(), df.duplicated().sum())
+
+
+def _log_recommendations(numeric_count, categorical_count, has_missing, dup_count):
+    print_header('8. Quick Modeling Recommendations')
+    recs = []
+    if numeric_count == 0:
         recs.append('- No numeric features detected; consider encoding/polynomial features or feature extraction from text.')
     else:
-        recs.append(f'- {num.shape[1]} numeric features detected; consider scaling (Standard/MinMax) and handle skewed features.')
-    if cat.shape[1] > 0:
-        recs.append(f'- {cat.shape[1]} categorical features detected; consider one-hot or ordinal encoding (based on cardinality).')
-    if df.isnull().any().any():
+        recs.append(f'- {numeric_count} numeric features detected; consider scaling (Standard/MinMax) and handle skewed features.')
+    if categorical_count > 0:
+        recs.append(f'- {categorical_count} categorical features detected; consider one-hot or ordinal encoding (based on cardinality).')
+    if has_missing:
         recs.append('- Missing values detected; choose strategy: drop, impute (mean/median/mode), or model-specific handling.')
-    if df.duplicated().sum() > 0:
+    if dup_count > 0:
         recs.append('- Duplicates present; consider dropping exact duplicates.')
     _log('\n'.join(recs))
 
 
+def stream_report(profile, outpath='correlation_heatmap.png', heatmap=True):
+    """Sections 1-8 from a DatasetProfile (eda_stream.py) built chunk by chunk instead of a DataFrame."""
+    print_header('1. Basic DataFrame Info')
+    _log(f'Shape: {(profile.rows, len(profile.columns))} (rows, columns)')
+    _log('\nDtypes and non-null counts:')
+    _log(profile.info().to_string())
+    _log('\nMemory usage (if loaded into a DataFrame):')
+    _log(profile.memory_usage().sort_values(ascending=False).head(20))
+
+    missing = profile.missing()
+    _log_missing_values(missing, profile.rows)
+    dup_count = profile.duplicates()
+    _log_duplicates(dup_count)
+
+    numeric = profile.numeric_columns()
+    desc = None
+    if numeric:
+        desc = profile.describe(PERCENTILES)
+        desc['missing_pct'] = (missing[numeric] / profile.rows * 100).round(3)
+    _log_numeric_summary(desc)
+
+    print_header('5. Categorical Columns Summary')
+    text = profile.text_columns()
+    if not text:
+        _log('No categorical columns found.')
+    for col in text:
+        counts = profile.values[col]
+        nunique = profile.nunique(col, dropna=False)
+        _log_categorical_column(col, counts.capacity if nunique is None else nunique,
+                                profile.value_counts(col), profile.unique_values(col), counts.error)
+
+    print_header('6. Correlation Matrix (Pearson)')
+    if len(numeric) < 2:
+        _log('Not enough numeric columns to compute correlations.')
+    else:
+        _log_correlation(profile.corr(), outpath, heatmap)
+
+    candidates = [c for c in profile.columns if c.lower() in ('target', 'label', 'y')]
+    if not candidates:
+        candidates = [c for c in profile.columns
+                      if profile.nunique(c) is not None and profile.nunique(c) <= 10 and profile.dtype(c) != 'float64']
+    if not candidates:
+        _log_target(None, None, None, None)
+    else:
+        col = candidates[0]
+        counts = profile.value_counts(col) if profile.nunique(col) is not None else None
+        stats = None
+        if col in numeric:
+            stats = profile.describe().loc[col, ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']]
+        _log_target(col, profile.dtype(col), counts, stats)
+
+    _log_recommendations(len(numeric), len(text), missing.any(), dup_count)
+
+
+def resolve_paths(spec):
+    """CSV files named by spec: every *.csv in a directory, the matches of a glob, or the file itself."""
+    if os.path.isdir(spec):
+        return sorted(glob.glob(os.path.join(spec, '*.csv')))
+    if glob.has_magic(spec):
+        return sorted(glob.glob(spec))
+    return [spec]
+
+
+def partition_report(paths, profiles):
+    """Section 9: rows, missing cells, duplicates and numeric means of each partition."""
+    from eda_stream import partition_summary
+    print_header('9. Per-Partition Breakdown')
+    summary, means = partition_summary([os.path.basename(path) for path in paths], profiles)
+    _log(summary.to_string())
+    if not means.empty:
+        _log('\nMeans of numeric columns:')
+        _log(means.round(3).to_string())
+
+
 def main():
     parser = argparse.ArgumentParser(description='Exploratory Data Analysis for a CSV dataset')
-    parser.add_argument('csv', nargs='?', default='Final_data.csv', help='Path to CSV file (default: Final_data.csv)')
+    parser.add_argument('csv', nargs='?', default='Final_data.csv', help='Path to a CSV file, a directory of CSV partitions or a glob '
+                             '(default: Final_data.csv)')
     parser.add_argument('--heatmap-out', default='correlation_heatmap.png', help='Output path for correlation heatmap PNG')
+    parser.add_argument('--no-heatmap', action='store_true', help='Skip drawing the correlation heatmap')
     parser.add_argument('--out-md', default=None, help='If set, save the full EDA report to this markdown file')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read the CSV in chunks into streaming accumulators instead of loading it')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows per chunk with --stream (default: 100000)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes profiling partitions in parallel (default: one per core)')
+    parser.add_argument('--by-partition', action='store_true',
+                        help='Add a per-partition breakdown (implies the streaming profile)')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse and update each CSV\'s stored profile (<csv>.profile.pkl; implies the streaming profile)')
     args = parser.parse_args()
 
     path = args.csv
-    _log(f'[{datetime.now().isoformat()}] Loading: {path}')
+    paths = resolve_paths(path)
+    stream = args.stream or args.by_partition or args.cache or len(paths) != 1 or paths[0] != path
+    if len(paths) > 1:
+        workers = max(1, min(args.workers or os.cpu_count() or 1, len(paths)))
+        mode = f' ({len(paths)} partitions, {workers} workers)'
+    else:
+        mode = (' (cached profile)' if args.cache else ' (streaming)') if stream else ''
+    _log(f'[{datetime.now().isoformat()}] Loading: {path}' + mode)
     try:
-        df = load_data(path)
+        if stream:
+            if not paths or not all(os.path.exists(p) for p in paths):
+                raise FileNotFoundError(path)
+            from eda_stream import cached_profile, merge_profiles, profile_partitions
+            if args.cache and len(paths) == 1:
+                partial, source = cached_profile(paths[0], chunk_size=args.chunk_size)
+                _log({'cache': 'Profile unchanged: loaded from cache',
+                      'appended': 'Appended rows added to the cached profile',
+                      'csv': 'Profiled the whole file (no matching cache)'}[source])
+                partials = [partial]
+            else:
+                partials = profile_partitions(paths, chunk_size=args.chunk_size, workers=args.workers,
+                                              cache=args.cache)
+            profile = merge_profiles(partials)
+        else:
+            df = load_data(path)
     except FileNotFoundError:
         _log(f"Error: '{path}' not found. Please make sure the file exists or supply a path.")
         sys.exit(2)
@@ -236,14 +402,19 @@ def main():
         md_lines.append(f'_Generated: {datetime.now().isoformat()}_')
         md_lines.append('')
 
-    basic_info(df)
-    missing_values_summary(df)
-    duplicate_summary(df)
-    numeric_summary(df)
-    categorical_summary(df)
-    correlation_and_heatmap(df, outpath=args.heatmap_out)
-    target_analysis(df)
-    quick_recommendations(df)
+    if stream:
+        stream_report(profile, outpath=args.heatmap_out, heatmap=not args.no_heatmap)
+        if args.by_partition:
+            partition_report(paths, partials)
+    else:
+        basic_info(df)
+        missing_values_summary(df)
+        duplicate_summary(df)
+        numeric_summary(df)
+        categorical_summary(df)
+        correlation_and_heatmap(df, outpath=args.heatmap_out, heatmap=not args.no_heatmap)
+        target_analysis(df)
+        quick_recommendations(df)
 
     _log('\n--- End of EDA Report ---\n')
 
@@ -252,7 +423,7 @@ def main():
         try:
             # Add link to heatmap if it exists
             heatmap_file = args.heatmap_out
-            if os.path.exists(heatmap_file):
+            if not args.no_heatmap and os.path.exists(heatmap_file):
                 md_lines.append('')
                 md_lines.append('## Correlation heatmap')
                 md_lines.append(f'![correlation heatmap]({os.path.basename(heatmap_file)})')
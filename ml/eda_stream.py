@@ -0,0 +1,762 @@
+#!/usr/bin/env python3
+"""
+eda_stream.py
+Streaming, mergeable dataset profile behind `eda.py --stream`.
+
+eda.py normally loads the whole CSV into one DataFrame. With --stream it
+reads the CSV in chunks into a DatasetProfile instead, which keeps small
+per-column accumulators, so memory does not grow with the number of rows
+(except for 8 bytes per distinct row for duplicate detection):
+- rows, non-null counts, dtypes and the memory the columns would take
+- count, mean, central moments up to the fourth (std, skew, kurtosis),
+  min and max of every numeric column
+- a relative-error quantile sketch per numeric column (percentiles)
+- value counts: exact for up to HEAVY_HITTERS distinct values per text
+  column, a Misra-Gries heavy-hitter summary beyond that
+- one 64-bit hash per distinct row (duplicate rows)
+- pairwise-complete co-moments of every pair of numeric columns
+  (correlations)
+
+Profiles merge (DatasetProfile.merge): the merge of the profiles of two
+chunks or files is the profile of their rows one after the other. They are
+plain picklable objects, so profile_partitions() profiles partition files
+(e.g. monthly exports) in a process pool, one file per task, and
+merge_profiles() combines them in path order: the result is the profile of
+the files concatenated. Files may list their columns in different orders; a
+column missing from a file counts as missing values in its rows (duplicate
+rows are only matched across files with the same columns).
+
+cached_profile() stores a file's profile next to it (<csv>.profile.pkl)
+with the file's size, mtime and the SHA-256 of the bytes profiled. A file
+with the same size and mtime (or, after a touch, the same bytes) loads the
+stored profile without reading the CSV; a file that has only grown (the
+stored bytes are unchanged) has just its new complete lines read into the
+stored profile; anything else is profiled from scratch. A trailing line
+without a newline is left for the next run.
+
+Compared with the in-memory report:
+- exact: shape, dtypes, missing counts, min, max, value counts and unique
+  counts of columns with at most HEAVY_HITTERS distinct values
+- equal up to floating-point rounding (relative 1e-9): mean, std, skew,
+  kurtosis, correlations
+- memory usage: the sum over chunks, exact except where a chunk of a text
+  column has no values (read as float64 there)
+- percentiles: exact for numeric columns with at most NUMERIC_VALUES
+  distinct values, otherwise within QUANTILE_ACCURACY relative error
+  (values within QUANTILE_MIN_VALUE of zero count as zero)
+- duplicate rows: exact unless two different rows share a 64-bit hash
+  (probability below rows^2 / 2^65)
+- text columns with more distinct values: value counts are low by at most
+  the reported error and the unique count is a lower bound
+
+Usage:
+    profile = profile_csv('Final_data.csv')
+    profile = merge_profiles(profile_partitions(['2024-01.csv', '2024-02.csv'], workers=4))
+    profile, source = cached_profile('Final_data.csv')   # source: 'cache', 'appended' or 'csv'
+    profile = DatasetProfile().update(chunk).merge(other_profile)
+    profile.describe(), profile.corr(), profile.value_counts('Gender')
+"""
+
+import hashlib
+import io
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dataset import CHUNK_SIZE, combined_dtype, data_checkpoint
+
+# Relative error of the percentile sketches, and the magnitude below which
+# values are counted as zero
+QUANTILE_ACCURACY = 0.01
+QUANTILE_MIN_VALUE = 1e-9
+
+# Distinct values counted per text column before falling back to heavy
+# hitters, and per numeric column (low-cardinality numeric columns get exact
+# percentiles and value counts; others stop being counted)
+HEAVY_HITTERS = 1000
+NUMERIC_VALUES = 256
+
+# Hash of a missing value in any column, and the row hash combining step
+NULL_HASH = np.uint64(0x9E3779B97F4A7C15)
+HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+# Stored profiles: file name suffix, and a version bumped whenever the
+# DatasetProfile layout changes (older files are ignored)
+PROFILE_CACHE_SUFFIX = '.profile.pkl'
+PROFILE_CACHE_FORMAT = 1
+
+
+class Moments:
+    """Count, mean, central moment sums (M2-M4), min and max of each column."""
+
+    def __init__(self, size=0):
+        self.n = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.m3 = np.zeros(size)
+        self.m4 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    @classmethod
+    def of(cls, X):
+        """Moments of the columns of X (NaN is missing), two-pass within X."""
+        moments = cls(X.shape[1])
+        present = ~np.isnan(X)
+        n = present.sum(axis=0)
+        mean = np.where(present, X, 0.0).sum(axis=0) / np.maximum(n, 1)
+        deviation = np.where(present, X - mean, 0.0)
+        squared = deviation * deviation
+        moments.n = n.astype(np.float64)
+        moments.mean = mean
+        moments.m2 = squared.sum(axis=0)
+        moments.m3 = (squared * deviation).sum(axis=0)
+        moments.m4 = (squared * squared).sum(axis=0)
+        moments.min = np.where(present, X, np.inf).min(axis=0)
+        moments.max = np.where(present, X, -np.inf).max(axis=0)
+        return moments
+
+    def merge(self, other):
+        """Combine with the moments of other rows (same columns), in place."""
+        na, nb = self.n, other.n
+        n = na + nb
+        safe = np.maximum(n, 1)
+        delta = other.mean - self.mean
+        m2 = self.m2 + other.m2 + delta ** 2 * na * nb / safe
+        m3 = (self.m3 + other.m3 + delta ** 3 * na * nb * (na - nb) / safe ** 2
+              + 3 * delta * (na * other.m2 - nb * self.m2) / safe)
+        m4 = (self.m4 + other.m4 + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / safe ** 3
+              + 6 * delta ** 2 * (na * na * other.m2 + nb * nb * self.m2) / safe ** 2
+              + 4 * delta * (na * other.m3 - nb * self.m3) / safe)
+        self.mean = self.mean + delta * nb / safe
+        self.n, self.m2, self.m3, self.m4 = n, m2, m3, m4
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def expand(self, positions, size):
+        """The same moments at positions of size columns (the others empty)."""
+        expanded = Moments(size)
+        for name in ('n', 'mean', 'm2', 'm3', 'm4', 'min', 'max'):
+            getattr(expanded, name)[positions] = getattr(self, name)
+        return expanded
+
+    def statistics(self):
+        """count, mean, std, skew and kurtosis as pandas computes them."""
+        n = self.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, self.mean, np.nan)
+            std = np.where(n > 1, np.sqrt(self.m2 / (n - 1)), np.nan)
+            # pandas treats central moment sums below 1e-14 as zero
+            m2 = np.where(np.abs(self.m2) < 1e-14, 0.0, self.m2)
+            m3 = np.where(np.abs(self.m3) < 1e-14, 0.0, self.m3)
+            m4 = np.where(np.abs(self.m4) < 1e-14, 0.0, self.m4)
+            skew = np.where(m2 == 0, 0.0, n * np.sqrt(n - 1) / (n - 2) * m3 / m2 ** 1.5)
+            skew = np.where(n < 3, np.nan, skew)
+            denominator = (n - 2) * (n - 3) * m2 ** 2
+            kurtosis = np.where(denominator == 0, 0.0,
+                                n * (n + 1) * (n - 1) * m4 / denominator
+                                - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+            kurtosis = np.where(n < 4, np.nan, kurtosis)
+        return {'count': n, 'mean': mean, 'std': std, 'skew': skew, 'kurtosis': kurtosis}
+
+
+class Comoments:
+    """
+    Pairwise-complete statistics of every pair of columns i, j over the rows
+    where both are present: the count, the mean and squared deviations of
+    column i, and the co-moment of i and j.
+    """
+
+    def __init__(self, size=0):
+        self.n = np.zeros((size, size))
+        self.mean = np.zeros((size, size))
+        self.m2 = np.zeros((size, size))
+        self.c = np.zeros((size, size))
+
+    @classmethod
+    def of(cls, X):
+        comoments = cls(X.shape[1])
+        present = ~np.isnan(X)
+        weights = present.astype(np.float64)
+        # Centered on the column means first, so the sums below lose little precision
+        center = np.where(present, X, 0.0).sum(axis=0) / np.maximum(present.sum(axis=0), 1)
+        D = np.where(present, X - center, 0.0)
+        n = weights.T @ weights
+        sums = D.T @ weights
+        safe = np.maximum(n, 1)
+        comoments.n = n
+        comoments.mean = sums / safe + center[:, np.newaxis]
+        comoments.m2 = np.maximum((D * D).T @ weights - sums * sums / safe, 0.0)
+        comoments.c = D.T @ D - sums * sums.T / safe
+        return comoments
+
+    def merge(self, other):
+        na, nb = self.n, other.n
+        n = na + nb
+        safe = np.maximum(n, 1)
+        delta = other.mean - self.mean
+        self.m2 = self.m2 + other.m2 + delta ** 2 * na * nb / safe
+        self.c = self.c + other.c + delta * delta.T * na * nb / safe
+        self.mean = self.mean + delta * nb / safe
+        self.n = n
+        return self
+
+    def expand(self, positions, size):
+        expanded = Comoments(size)
+        index = np.ix_(positions, positions)
+        for name in ('n', 'mean', 'm2', 'c'):
+            getattr(expanded, name)[index] = getattr(self, name)
+        return expanded
+
+    def corr(self):
+        """Pearson correlations as DataFrame.corr() computes them (NaN without variance)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            divisor = np.sqrt(self.m2 * self.m2.T)
+            return np.where((self.n > 0) & (divisor != 0), self.c / divisor, np.nan)
+
+
+def _merge_buckets(a, a_offset, b, b_offset):
+    """Add two bucket count arrays that start at different bucket indexes."""
+    if not len(b):
+        return a, a_offset
+    if not len(a):
+        return b, b_offset
+    low = min(a_offset, b_offset)
+    merged = np.zeros(max(a_offset + len(a), b_offset + len(b)) - low, dtype=np.int64)
+    merged[a_offset - low:a_offset - low + len(a)] += a
+    merged[b_offset - low:b_offset - low + len(b)] += b
+    return merged, low
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch (DDSketch): counts of values per
+    logarithmic bucket (gamma^(k-1), gamma^k], each read back as the value
+    within QUANTILE_ACCURACY of every value in the bucket.
+    """
+
+    def __init__(self, accuracy=QUANTILE_ACCURACY):
+        self.accuracy = accuracy
+        self.log_gamma = np.log((1 + accuracy) / (1 - accuracy))
+        self.positive, self.positive_offset = np.zeros(0, dtype=np.int64), 0
+        self.negative, self.negative_offset = np.zeros(0, dtype=np.int64), 0
+        self.zeros = 0
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _buckets(self, magnitudes):
+        if not len(magnitudes):
+            return np.zeros(0, dtype=np.int64), 0
+        keys = np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+        low = keys.min()
+        return np.bincount(keys - low), low
+
+    def update(self, values):
+        """Add the non-missing values of a float array."""
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        small = np.abs(values) < QUANTILE_MIN_VALUE
+        self.zeros += int(small.sum())
+        self.positive, self.positive_offset = _merge_buckets(
+            self.positive, self.positive_offset, *self._buckets(values[~small & (values > 0)]))
+        self.negative, self.negative_offset = _merge_buckets(
+            self.negative, self.negative_offset, *self._buckets(-values[~small & (values < 0)]))
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        return self
+
+    def merge(self, other):
+        self.positive, self.positive_offset = _merge_buckets(self.positive, self.positive_offset,
+                                                             other.positive, other.positive_offset)
+        self.negative, self.negative_offset = _merge_buckets(self.negative, self.negative_offset,
+                                                             other.negative, other.negative_offset)
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantiles(self, qs):
+        """Quantiles with pandas' linear interpolation between the nearest ranks."""
+        if not self.count:
+            return np.full(len(qs), np.nan)
+        gamma = np.exp(self.log_gamma)
+        # Buckets in ascending value order: negatives (largest magnitude first), zero, positives
+        negative_keys = self.negative_offset + np.arange(len(self.negative))[::-1]
+        positive_keys = self.positive_offset + np.arange(len(self.positive))
+        values = np.concatenate([-2 * gamma ** negative_keys / (gamma + 1), [0.0],
+                                 2 * gamma ** positive_keys / (gamma + 1)])
+        counts = np.concatenate([self.negative[::-1], [self.zeros], self.positive])
+        ends = np.cumsum(counts)
+
+        def at_rank(rank):
+            if rank == 0:
+                return self.min
+            if rank == self.count - 1:
+                return self.max
+            value = values[np.searchsorted(ends, rank, side='right')]
+            return min(max(value, self.min), self.max)
+
+        return _interpolated(at_rank, self.count, qs)
+
+
+def _interpolated(value_at, count, qs):
+    """Quantiles with pandas' linear interpolation between the nearest ranks."""
+    result = []
+    for q in qs:
+        h = (count - 1) * q
+        low, high = int(np.floor(h)), int(np.ceil(h))
+        below = value_at(low)
+        result.append(below + (h - low) * (value_at(high) - below))
+    return np.array(result)
+
+
+def _key(value):
+    """Missing values (NaN, None) all become None as dict keys."""
+    return None if pd.isna(value) else value
+
+
+class ValueCounts:
+    """
+    Counts per distinct value (None for missing), in first-seen order. Exact
+    up to capacity distinct values; beyond that a mergeable Misra-Gries
+    summary: every count is low by at most error, and every value seen more
+    than rows / (capacity + 1) times is kept.
+    """
+
+    def __init__(self, capacity=HEAVY_HITTERS):
+        self.capacity = capacity
+        self.counts = {}
+        self.error = 0
+
+    @property
+    def exact(self):
+        return self.error == 0
+
+    def update(self, series):
+        counts = series.value_counts(dropna=False, sort=False)
+        return self._add(((_key(value), count) for value, count in zip(counts.index, counts.tolist())), 0)
+
+    def merge(self, other):
+        return self._add(other.counts.items(), other.error)
+
+    def _add(self, items, error):
+        counts = self.counts
+        for value, count in items:
+            counts[value] = counts.get(value, 0) + count
+        self.error += error
+        if len(counts) > self.capacity:
+            # Subtract the (capacity + 1)-th largest count and keep what stays positive
+            cut = int(np.partition(np.fromiter(counts.values(), np.int64, len(counts)),
+                                   -(self.capacity + 1))[-(self.capacity + 1)])
+            self.counts = {value: count - cut for value, count in counts.items() if count > cut}
+            self.error += cut
+        return self
+
+    def quantiles(self, qs):
+        """Exact quantiles of numeric values from exact counts."""
+        present = sorted(value for value in self.counts if value is not None)
+        if not present:
+            return np.full(len(qs), np.nan)
+        values = np.array(present, dtype=np.float64)
+        ends = np.cumsum([self.counts[value] for value in present])
+        return _interpolated(lambda rank: values[np.searchsorted(ends, rank, side='right')], ends[-1], qs)
+
+    def series(self, name):
+        """Counts sorted like value_counts(dropna=False): descending, ties in first-seen order."""
+        values = list(self.counts)
+        counts = np.fromiter(self.counts.values(), np.int64, len(values))
+        order = np.argsort(-counts, kind='stable')
+        index = pd.Index([np.nan if values[i] is None else values[i] for i in order], name=name)
+        return pd.Series(counts[order], index=index, name='count')
+
+
+class RowHashes:
+    """Distinct 64-bit row hashes, in a few sorted arrays merged as they grow."""
+
+    def __init__(self):
+        self.levels = []
+        self.rows = 0
+
+    def update(self, hashes):
+        self.rows += len(hashes)
+        self._push(np.unique(hashes))
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        for level in other.levels:
+            self._push(level)
+        return self
+
+    def _push(self, level):
+        # Like a binary counter: each array is at least twice the size of the next
+        self.levels.append(level)
+        while len(self.levels) > 1 and len(self.levels[-2]) <= 2 * len(self.levels[-1]):
+            last = self.levels.pop()
+            self.levels[-1] = np.union1d(self.levels[-1], last)
+
+    def duplicates(self):
+        distinct = np.unique(np.concatenate(self.levels)) if self.levels else []
+        return self.rows - len(distinct)
+
+
+def row_hashes(frame, numeric):
+    """
+    A 64-bit hash of each row: numbers hash as float64 (so 3 and 3.0 match
+    across chunks), missing values alike in every column, and columns in
+    name order (so files listing them in another order match).
+    """
+    combined = np.zeros(len(frame), dtype=np.uint64)
+    for column in sorted(frame.columns, key=str):
+        series = frame[column]
+        if column in numeric:
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            values = series.to_numpy(dtype=object)
+        hashed = pd.util.hash_array(values)
+        hashed[series.isna().to_numpy()] = NULL_HASH
+        combined = combined * HASH_MULTIPLIER ^ hashed
+    return combined
+
+
+def _kind(series):
+    """'numeric', 'text' or 'other' as eda.py's select_dtypes sees the column; None if all missing."""
+    if not series.notna().any():
+        return None
+    if pd.api.types.is_bool_dtype(series):
+        return 'other'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'numeric'
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series) or \
+            isinstance(series.dtype, pd.CategoricalDtype):
+        return 'text'
+    return 'other'
+
+
+class DatasetProfile:
+    """Mergeable accumulators for the EDA report of one or more CSV chunks."""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = []
+        self.kinds = {}
+        self.dtypes = {}
+        self.non_null = {}
+        self.memory = {}
+        # Numeric columns in the order of the moment and co-moment arrays
+        self.numeric = []
+        self.moments = Moments()
+        self.comoments = Comoments()
+        self.sketches = {}
+        self.values = {}
+        self.hashes = RowHashes()
+
+    def _add_columns(self, columns):
+        for column in columns:
+            if column not in self.non_null:
+                self.columns.append(column)
+                self.non_null[column] = 0
+                self.memory[column] = 0
+
+    def _set_kind(self, column, kind, missing_before):
+        """Record a column's kind once it has values; missing_before earlier rows had none."""
+        current = self.kinds.get(column)
+        if kind is None or current == kind:
+            return
+        if current is not None:
+            raise ValueError(f"Column '{column}' is {current} in some rows and {kind} in others; "
+                             "the streaming report needs one type per column")
+        self.kinds[column] = kind
+        if kind == 'numeric':
+            self.numeric.append(column)
+            self.sketches[column] = QuantileSketch()
+            self.values[column] = ValueCounts(NUMERIC_VALUES)
+        elif kind == 'text':
+            self.values[column] = ValueCounts(HEAVY_HITTERS)
+        if column in self.values and missing_before:
+            self.values[column].counts[None] = missing_before
+
+    def _expand_numeric(self, size):
+        positions = np.arange(len(self.moments.n))
+        self.moments = self.moments.expand(positions, size)
+        self.comoments = self.comoments.expand(positions, size)
+
+    def update(self, chunk):
+        """Add a chunk of rows (a DataFrame as read_csv returns it)."""
+        self._add_columns(chunk.columns)
+        chunk = chunk.reindex(columns=self.columns)
+
+        for column in self.columns:
+            kind = _kind(chunk[column])
+            if kind == 'numeric' and self.kinds.get(column) == 'text':
+                # Only numbers in this chunk of a text column: they are still text
+                chunk[column] = chunk[column].map(str, na_action='ignore').astype(object)
+            elif kind is not None:
+                self._set_kind(column, kind, self.rows)
+                self.dtypes[column] = combined_dtype(self.dtypes.get(column), chunk[column].dtype)
+
+        for column, count in chunk.notna().sum().items():
+            self.non_null[column] += int(count)
+        for column, size in chunk.memory_usage(deep=True, index=False).items():
+            self.memory[column] += int(size)
+
+        if len(self.numeric) > len(self.moments.n):
+            self._expand_numeric(len(self.numeric))
+        X = chunk[self.numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+        if len(chunk):
+            self.moments.merge(Moments.of(X))
+            self.comoments.merge(Comoments.of(X))
+        for i, column in enumerate(self.numeric):
+            self.sketches[column].update(X[:, i])
+        for column, counts in self.values.items():
+            # Numeric columns are only counted while they have few distinct values
+            if self.kinds[column] == 'text' or counts.exact:
+                counts.update(chunk[column])
+
+        self.hashes.update(row_hashes(chunk, set(self.numeric)))
+        self.rows += len(chunk)
+        return self
+
+    def merge(self, other):
+        """Add the rows profiled by other (after this profile's rows)."""
+        self._add_columns(other.columns)
+        for column, counts in self.values.items():
+            if column not in other.values:
+                # No values in the other rows (or no such column there)
+                counts.merge(ValueCounts(counts.capacity)._add([(None, other.rows)], 0))
+        for column in other.columns:
+            self._set_kind(column, other.kinds.get(column), self.rows)
+            if column in other.dtypes:
+                self.dtypes[column] = combined_dtype(self.dtypes.get(column), other.dtypes[column])
+            self.non_null[column] += other.non_null[column]
+            self.memory[column] += other.memory[column]
+
+        size = len(self.numeric)
+        self._expand_numeric(size)
+        positions = np.array([self.numeric.index(column) for column in other.numeric], dtype=np.intp)
+        self.moments.merge(other.moments.expand(positions, size))
+        self.comoments.merge(other.comoments.expand(positions, size))
+        for column in other.numeric:
+            self.sketches[column].merge(other.sketches[column])
+        for column, counts in other.values.items():
+            self.values[column].merge(counts)
+        self.hashes.merge(other.hashes)
+        self.rows += other.rows
+        return self
+
+    # Report tables, as eda.py computes them from a DataFrame
+
+    def dtype(self, column):
+        """The dtype read_csv gives the whole column."""
+        dtype = self.dtypes.get(column)
+        # Missing values make integer columns float64; columns without any value are float64
+        if dtype is None or (pd.api.types.is_integer_dtype(dtype) and self.non_null[column] < self.rows):
+            return np.dtype(np.float64)
+        return dtype
+
+    def numeric_columns(self):
+        """Numeric columns in file order, including columns without any value."""
+        return [c for c in self.columns if self.kinds.get(c, 'numeric') == 'numeric']
+
+    def text_columns(self):
+        return [c for c in self.columns if self.kinds.get(c) == 'text']
+
+    def info(self):
+        return pd.DataFrame({
+            'Non-Null Count': [self.non_null[c] for c in self.columns],
+            'Dtype': [str(self.dtype(c)) for c in self.columns]
+        }, index=self.columns)
+
+    def memory_usage(self):
+        """Bytes per column of the whole dataset in memory (memory_usage(deep=True))."""
+        return pd.Series({'Index': pd.RangeIndex(self.rows).memory_usage(deep=True), **self.memory})
+
+    def missing(self):
+        return pd.Series({c: self.rows - self.non_null[c] for c in self.columns}, dtype=np.int64)
+
+    def duplicates(self):
+        return self.hashes.duplicates()
+
+    def describe(self, percentiles=(0.25, 0.5, 0.75)):
+        """describe().T of the numeric columns, with skew and kurtosis."""
+        columns = self.numeric_columns()
+        positions = [self.numeric.index(c) if c in self.numeric else None for c in columns]
+        statistics = self.moments.statistics()
+        rows = []
+        for column, position in zip(columns, positions):
+            if position is None:
+                rows.append({'count': 0.0})
+                continue
+            row = {name: values[position] for name, values in statistics.items()}
+            row['min'] = self.moments.min[position] if row['count'] else np.nan
+            row['max'] = self.moments.max[position] if row['count'] else np.nan
+            counts = self.values[column]
+            quantiles = counts.quantiles if counts.exact else self.sketches[column].quantiles
+            row.update(zip(percentiles, quantiles(percentiles)))
+            rows.append(row)
+        labels = [f'{p * 100:g}%' for p in percentiles]
+        table = pd.DataFrame(rows, index=columns).rename(columns=dict(zip(percentiles, labels)))
+        return table.reindex(columns=['count', 'mean', 'std', 'min', *labels, 'max', 'skew', 'kurtosis'])
+
+    def corr(self):
+        columns = self.numeric_columns()
+        corr = pd.DataFrame(self.comoments.corr(), index=self.numeric, columns=self.numeric)
+        return corr.reindex(index=columns, columns=columns)
+
+    def value_counts(self, column):
+        """value_counts(dropna=False) of a column, for columns with counts."""
+        return self.values[column].series(column)
+
+    def unique_values(self, column):
+        """Distinct values in first-seen order (NaN for missing), like Series.unique()."""
+        return [np.nan if value is None else value for value in self.values[column].counts]
+
+    def nunique(self, column, dropna=True):
+        """Distinct values; None when the column has too many to count exactly."""
+        counts = self.values.get(column)
+        if counts is None or not counts.exact:
+            return None
+        return sum(1 for value in counts.counts if not (dropna and value is None))
+
+
+def profile_csv(path, chunk_size=CHUNK_SIZE):
+    """DatasetProfile of a CSV, read chunk_size rows at a time."""
+    profile = DatasetProfile()
+    with pd.read_csv(path, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            profile.update(chunk)
+    return profile
+
+
+class _Lines(io.RawIOBase):
+    """A CSV's header line followed by its bytes from start to end, as a read-only stream."""
+
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._header = self._file.readline()
+        self._file.seek(max(start, len(self._header)))
+        self._left = max(0, end - self._file.tell())
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        view = memoryview(buffer)
+        if self._header:
+            count = min(len(view), len(self._header))
+            view[:count] = self._header[:count]
+            self._header = self._header[count:]
+            return count
+        count = self._file.readinto(view[:min(len(view), self._left)])
+        self._left -= count
+        return count
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _hash_bytes(digest, path, start, end):
+    """Feed bytes start to end of path into digest."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        left = end - start
+        while left > 0:
+            block = f.read(min(left, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            left -= len(block)
+
+
+def _load_stored(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            stored = pickle.load(f)
+    except (OSError, EOFError, pickle.PickleError, AttributeError):
+        return None
+    return stored if isinstance(stored, dict) and stored.get('format') == PROFILE_CACHE_FORMAT else None
+
+
+def cached_profile(path, chunk_size=CHUNK_SIZE, cache_path=None):
+    """
+    DatasetProfile of a CSV through the profile stored at cache_path
+    (default: path + PROFILE_CACHE_SUFFIX), which is written back whenever it
+    changes. Returns (profile, source): 'cache' if the CSV was not read,
+    'appended' if only its new lines were, 'csv' if it was profiled again.
+    """
+    cache_path = cache_path or path + PROFILE_CACHE_SUFFIX
+    stat = os.stat(path)
+    stored = _load_stored(cache_path)
+    if stored and (stored['size'], stored['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+        return stored['profile'], 'cache'
+
+    end = data_checkpoint(path)['offset']
+    digest = hashlib.sha256()
+    if stored and stored['offset'] <= end:
+        _hash_bytes(digest, path, 0, stored['offset'])
+    if stored and stored['offset'] <= end and digest.hexdigest() == stored['sha256']:
+        profile, start = stored['profile'], stored['offset']
+        source = 'cache' if start == end else 'appended'
+    else:
+        digest = hashlib.sha256()
+        profile, start, source = DatasetProfile(), 0, 'csv'
+
+    if start < end:
+        with io.BufferedReader(_Lines(path, start, end)) as f, pd.read_csv(f, chunksize=chunk_size) as reader:
+            for chunk in reader:
+                profile.update(chunk)
+        _hash_bytes(digest, path, start, end)
+
+    staging = cache_path + '.tmp'
+    with open(staging, 'wb') as f:
+        pickle.dump({'format': PROFILE_CACHE_FORMAT, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                     'offset': end, 'sha256': digest.hexdigest(), 'profile': profile}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(staging, cache_path)
+    return profile, source
+
+
+def _cached_profile(path, chunk_size):
+    return cached_profile(path, chunk_size)[0]
+
+
+def profile_partitions(paths, chunk_size=CHUNK_SIZE, workers=None, cache=False):
+    """
+    DatasetProfile of each CSV in paths, in path order. Files are profiled
+    in parallel by up to workers processes (default: one per core); with
+    cache, through each file's stored profile (cached_profile()).
+    """
+    profile = _cached_profile if cache else profile_csv
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    if workers == 1:
+        return [profile(path, chunk_size) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(profile, paths, [chunk_size] * len(paths)))
+
+
+def merge_profiles(profiles):
+    """One profile of all the rows of profiles, in order (the partials are not changed)."""
+    merged = DatasetProfile()
+    for profile in profiles:
+        merged.merge(profile)
+    return merged
+
+
+def partition_summary(names, profiles):
+    """Per-partition rows, missing cells and duplicate rows, and the means of the numeric columns."""
+    summary = pd.DataFrame({
+        'rows': [profile.rows for profile in profiles],
+        'missing_cells': [int(profile.missing().sum()) for profile in profiles],
+        'duplicate_rows': [profile.duplicates() for profile in profiles]
+    }, index=names)
+    means = pd.DataFrame([profile.describe(())['mean'] for profile in profiles], index=names)
+    return summary, means
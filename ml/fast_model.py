@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+fast_model.py
+Latency-budgeted fast variant of the exercise classifier.
+
+Single-row /predict latency grows with the number of trees walked and their
+depth. The fast variant is a smaller model chosen to fit a per-row latency
+budget while recommending what the full model recommends. Candidates are:
+- truncated: the first n boosting iterations of the full model (fewer trees)
+- distilled: a student with fewer leaves per tree, trained on the full
+  model's class probabilities (soft labels) and cut after n iterations
+
+Every candidate has the full model's classes in the same order, so the API
+can serve either variant from the same knowledge bases and grid. Candidates
+are compared on rows held out from distillation: how often their top-1 and
+top-4 recommendations agree with the full model's, next to their single-row
+predict_proba time with both inference engines. select_fast() keeps the
+candidate with the best top-4 agreement within the budget, among those
+whose top-1 agreement reaches min_agreement: the fast variant is served by
+default, so one that changes the first recommendation too often is not kept.
+
+Usage:
+    results = fast_candidates(model.booster_, model.classes_, X, leaves=[7, 15], iterations=[10, 20, 40])
+    fast = select_fast(results, budget_us=200, engine='booster', min_agreement=0.95)
+"""
+
+import lightgbm as lgb
+import numpy as np
+
+from artifacts import BoosterPredictor
+from model_search import booster_latency
+from ranking import top_k_indices
+
+# Student sizes (leaves per tree) and iteration counts tried by default
+FAST_LEAVES = [7, 15]
+FAST_ITERATIONS = [5, 10, 20, 40]
+
+# Rows held out from distillation to measure agreement on
+AGREEMENT_ROWS = 2000
+
+# Recommendations compared with the full model (the /predict default)
+TOP_K = 4
+
+# Least top-1 agreement with the full model a fast variant must reach (as GRID_MIN_AGREEMENT)
+MIN_AGREEMENT = 0.95
+
+
+def truncate(booster, iterations):
+    """A copy of booster keeping only its first iterations boosting rounds."""
+    return lgb.Booster(model_str=booster.model_to_string(num_iteration=iterations))
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+def distill(booster, X, num_leaves, rounds, seed=42, threads=None):
+    """
+    A multiclass booster with at most num_leaves leaves per tree, trained for
+    rounds iterations to reproduce booster's probabilities on X.
+
+    The loss is the cross-entropy against the full model's probabilities,
+    with the gradients and hessians of LightGBM's own multiclass objective.
+    Training starts from the log of the mean target probabilities, which is
+    then added to the first iteration's leaves, and the model is saved with
+    the multiclass objective, so it predicts probabilities and compiles like
+    any trained classifier.
+    """
+    num_class = booster.num_model_per_iteration()
+    if num_class < 3:
+        raise ValueError('Distillation needs a multiclass model')
+    X = np.asarray(X, dtype=np.float64)
+    targets = BoosterPredictor(booster, range(num_class)).predict_proba(X)
+    factor = num_class / (num_class - 1)
+
+    def soft_cross_entropy(scores, _):
+        probabilities = _softmax(scores)
+        return probabilities - targets, factor * probabilities * (1.0 - probabilities)
+
+    start = np.log(np.clip(targets.mean(axis=0), 1e-15, None))
+    params = {'objective': soft_cross_entropy, 'num_class': num_class, 'num_leaves': num_leaves,
+              'learning_rate': booster.params.get('learning_rate', 0.1), 'seed': seed, 'verbose': -1}
+    if threads:
+        params['num_threads'] = threads
+    train_set = lgb.Dataset(X, init_score=np.tile(start, (len(X), 1)), feature_name=booster.feature_name())
+    student = lgb.train(params, train_set, num_boost_round=rounds)
+
+    # The starting scores are not part of a custom-objective model; fold them in
+    for tree in student.dump_model(num_iteration=1)['tree_info']:
+        index = tree['tree_index']
+        for leaf in range(tree['num_leaves']):
+            student.set_leaf_output(index, leaf, student.get_leaf_output(index, leaf) + start[index])
+
+    lines = student.model_to_string().splitlines(keepends=True)
+    header_end = next(i for i, line in enumerate(lines) if line.startswith('max_feature_idx=')) + 1
+    lines.insert(header_end, f'objective=multiclass num_class:{num_class}\n')
+    return lgb.Booster(model_str=''.join(lines))
+
+
+def agreement(reference, probabilities, k=TOP_K):
+    """How often the top-1 classes match, the mean top-k overlap and how often top-k lists are identical."""
+    k = min(k, reference.shape[1])
+    reference_top = top_k_indices(reference, k)
+    top = top_k_indices(probabilities, k)
+    return {
+        'top1_agreement': float(np.mean(reference_top[:, 0] == top[:, 0])),
+        'topk_overlap': float(np.mean([len(set(a) & set(b)) / k for a, b in zip(reference_top, top)])),
+        'topk_exact': float(np.mean(np.all(reference_top == top, axis=1)))
+    }
+
+
+def fast_candidates(booster, classes, X, leaves=FAST_LEAVES, iterations=FAST_ITERATIONS,
+                    eval_rows=AGREEMENT_ROWS, k=TOP_K, seed=42):
+    """
+    Build and measure every candidate; returns one result dict per candidate
+    (its booster under 'booster'). Truncations are skipped for iteration
+    counts the full model does not exceed.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    order = np.random.default_rng(seed).permutation(len(X))
+    held_out_rows = min(eval_rows, max(1, len(X) // 5))
+    held_out, fit = X[order[:held_out_rows]], X[order[held_out_rows:]]
+    reference = BoosterPredictor(booster, classes).predict_proba(held_out)
+
+    sources = [('truncated', booster.params.get('num_leaves', 31), booster, n)
+               for n in iterations if n < booster.current_iteration()]
+    for num_leaves in leaves:
+        # One student per size, cut at every iteration count
+        student = distill(booster, fit, num_leaves, max(iterations), seed=seed)
+        sources += [('distilled', num_leaves, student, n) for n in iterations]
+
+    results = []
+    for method, num_leaves, source, n in sources:
+        fast = truncate(source, n)
+        tree_info = fast.dump_model()['tree_info']
+        results.append({
+            'method': method,
+            'num_leaves': num_leaves,
+            'iterations': n,
+            'trees': len(tree_info),
+            'leaves': sum(tree['num_leaves'] for tree in tree_info),
+            **agreement(reference, BoosterPredictor(fast, classes).predict_proba(held_out), k),
+            **booster_latency(fast, classes, held_out),
+            'rows': held_out_rows,
+            'booster': fast
+        })
+    return results
+
+
+def select_fast(results, budget_us, engine='booster', min_agreement=0.0):
+    """
+    The candidate with the best top-k agreement (then top-1 agreement, then
+    speed) whose single-row time with engine is within budget_us and whose
+    top-1 agreement is at least min_agreement, or None.
+    """
+    latency = f'{engine}_us'
+    eligible = [r for r in results if r[latency] <= budget_us and r['top1_agreement'] >= min_agreement]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda r: (r['topk_overlap'], r['top1_agreement'], -r[latency]))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+features.py
+Feature construction and encoding for the exercise recommendation model.
+
+The model is trained on a one-hot encoded frame whose column order is saved in
+training_columns.joblib. This module turns API profiles into rows in exactly
+that layout:
+- build_features()          validates a profile and derives BMI
+- encode_features_pandas()  reference encoder (get_dummies + reindex)
+- FeatureEncoder            NumPy encoder compiled once from training_columns
+
+Usage:
+    encoder = FeatureEncoder(training_columns)
+    feature_data, bmi = build_features(input_data)
+    X = encoder.transform([feature_data])
+"""
+
+import numpy as np
+
+# Numeric fields every profile must provide (BMI is derived from weight/height)
+NUMERIC_FIELDS = [
+    'Age',
+    'Weight (kg)',
+    'Height (m)',
+    'Fat_Percentage',
+    'Experience_Level',
+    'Workout_Frequency (days/week)'
+]
+
+# Categorical fields that are one-hot encoded as '<field>_<value>' columns
+CATEGORICAL_FIELDS = ['Gender']
+
+
+def build_features(input_data):
+    """
+    Validate a user profile and build the raw feature row for the model.
+
+    Raises KeyError for a missing field and ValueError/TypeError for a
+    non-numeric value. Returns the feature dict and the computed BMI.
+    """
+    values = {field: float(input_data[field]) for field in NUMERIC_FIELDS}
+    gender = input_data['Gender']
+
+    # Calculate BMI
+    bmi = values['Weight (kg)'] / (values['Height (m)'] ** 2)
+
+    feature_data = {
+        'Age': values['Age'],
+        'Gender': gender,
+        'Weight (kg)': values['Weight (kg)'],
+        'Height (m)': values['Height (m)'],
+        'BMI': bmi,
+        'Fat_Percentage': values['Fat_Percentage'],
+        'Experience_Level': values['Experience_Level'],
+        'Workout_Frequency (days/week)': values['Workout_Frequency (days/week)']
+    }
+    return feature_data, bmi
+
+
+def encode_features_pandas(feature_rows, training_columns):
+    """
+    One-hot encode a list of feature rows into the training column layout.
+
+    All categorical dummies are kept and then aligned with training_columns,
+    so a row is encoded the same way whether it is scored alone or in a batch
+    (drop_first would drop the only category present in a one-row frame).
+    """
+    # Reference path only (tests and benchmarks); the API never imports pandas
+    import pandas as pd
+
+    input_df = pd.DataFrame(feature_rows)
+    input_encoded = pd.get_dummies(input_df, columns=CATEGORICAL_FIELDS)
+
+    # **Crucially** align columns with training data
+    return input_encoded.reindex(columns=training_columns, fill_value=0)
+
+
+class FeatureEncoder:
+    """
+    Encodes feature rows straight into a float64 matrix in training order.
+
+    The column plan is resolved once from training_columns: each numeric
+    feature maps to its column index and each '<field>_<value>' dummy maps
+    from its category value to an index. Columns the profile cannot produce
+    stay 0, matching reindex(fill_value=0) in the pandas path.
+    """
+
+    def __init__(self, training_columns):
+        self.columns = list(training_columns)
+        self.n_features = len(self.columns)
+
+        numeric = set(NUMERIC_FIELDS) | {'BMI'}
+        self._numeric_plan = [
+            (index, column) for index, column in enumerate(self.columns)
+            if column in numeric
+        ]
+
+        self._dummy_plan = {field: {} for field in CATEGORICAL_FIELDS}
+        for index, column in enumerate(self.columns):
+            for field in CATEGORICAL_FIELDS:
+                prefix = field + '_'
+                if column.startswith(prefix):
+                    self._dummy_plan[field][column[len(prefix):]] = index
+
+    def encode_row(self, feature_data, out):
+        """Write one feature row into ``out``, a zeroed 1-D array of n_features."""
+        for index, column in self._numeric_plan:
+            out[index] = feature_data[column]
+
+        for field, indexes in self._dummy_plan.items():
+            value = feature_data[field]
+            if value is None:
+                continue
+            index = indexes.get(str(value))
+            if index is not None:
+                out[index] = 1.0
+        return out
+
+    def transform(self, feature_rows):
+        """Encode a list of feature rows into a preallocated (n, n_features) matrix."""
+        X = np.zeros((len(feature_rows), self.n_features), dtype=np.float64)
+        for row, feature_data in zip(X, feature_rows):
+            self.encode_row(feature_data, row)
+        return X
@@ -0,0 +1,36 @@
+"""
+gunicorn.conf.py
+Gunicorn settings for the ML API.
+
+With preload_app the master imports app.py, so the model and knowledge bases
+are loaded once and the workers fork from it, sharing those pages
+copy-on-write instead of each loading its own copy. gc.freeze() moves every
+object that exists at fork time into a permanent generation so the garbage
+collector in a worker never writes to (and so never copies) those pages.
+
+LightGBM runs predictions on an OpenMP thread pool, which does not survive a
+fork. The master must therefore never score a request before the workers are
+forked; app.py only loads artifacts at import time.
+
+Environment:
+    GUNICORN_WORKERS  number of worker processes (default: 2)
+    GUNICORN_PRELOAD  1 to load artifacts once in the master (default), 0 to
+                      load them separately in every worker
+
+Usage:
+    gunicorn --config gunicorn.conf.py app:app
+"""
+
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before workers fork."""
+    if preload_app:
+        gc.freeze()
+        server.log.info(f'Froze {gc.get_freeze_count()} preloaded objects for copy-on-write sharing')
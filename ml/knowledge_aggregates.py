@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+knowledge_aggregates.py
+Running per-key aggregates behind the exercise and diet knowledge bases.
+
+The knowledge bases are groupby means (plus first non-null text values) over
+every training row. Instead of recomputing them from the full dataset, a
+KnowledgeAggregates keeps for every key the running sum and non-null count
+of each averaged column and its first non-null text values, and is updated
+with new rows as they arrive. The knowledge bases are then read off the
+aggregates.
+
+Sums use the same compensated (Kahan) summation as pandas' groupby mean, in
+row order, so updating with rows A and then rows B gives bit-identical
+means to a groupby over A followed by B. Within a batch of rows the update
+is vectorized across keys: the n-th row of every key is added in the same
+NumPy step.
+
+build_knowledge_aggregates() streams a CSV through one KnowledgeAggregates,
+so both knowledge bases are built in a single chunked pass whatever the size
+of the dataset. knowledge_bases() is the in-memory pandas groupby build they
+are checked against.
+
+Usage:
+    aggregates = build_knowledge_aggregates('Final_data.csv')
+    aggregates = KnowledgeAggregates()
+    aggregates.update(df)                    # any number of times, in row order
+    knowledge_base = aggregates.exercise_kb()
+    diet_knowledge_base = aggregates.diet_kb()
+"""
+
+import numpy as np
+import pandas as pd
+
+from dataset import CHUNK_SIZE, combined_dtype, open_prefix, plain_columns
+
+# Exercise knowledge base: personalized prescriptions per exercise and level
+EXERCISE_KEYS = ['Name of Exercise', 'Experience_Level']
+EXERCISE_MEANS = ['Sets', 'Reps', 'Burns Calories (per 30 min)']
+EXERCISE_FIRSTS = ['Benefit', 'Equipment Needed', 'Target Muscle Group', 'Difficulty Level']
+
+# Diet knowledge base: nutritional averages per diet and meal type
+DIET_KEYS = ['diet_type', 'meal_type']
+DIET_MEANS = ['Calories', 'Carbs', 'Proteins', 'Fats']
+
+KNOWLEDGE_COLUMNS = EXERCISE_KEYS + EXERCISE_MEANS + EXERCISE_FIRSTS + DIET_KEYS + DIET_MEANS
+
+
+class RunningGroups:
+    """Compensated sums, non-null counts and first non-null values per key."""
+
+    def __init__(self, keys, means, firsts=()):
+        self.keys = list(keys)
+        self.means = list(means)
+        self.firsts = list(firsts)
+        self.slots = {}
+        self.key_values = []
+        self.sums = np.zeros((0, len(self.means)))
+        self.compensation = np.zeros((0, len(self.means)))
+        self.counts = np.zeros((0, len(self.means)), dtype=np.int64)
+        self.first_values = np.empty((0, len(self.firsts)), dtype=object)
+        # Column dtypes as read from the CSV, restored on output
+        self.dtypes = {}
+
+    def __len__(self):
+        return len(self.key_values)
+
+    def _add_slots(self, keys):
+        new = [key for key in keys if key not in self.slots]
+        for key in new:
+            self.slots[key] = len(self.key_values)
+            self.key_values.append(key)
+        if new:
+            grow = ((0, len(new)), (0, 0))
+            self.sums = np.pad(self.sums, grow)
+            self.compensation = np.pad(self.compensation, grow)
+            self.counts = np.pad(self.counts, grow)
+            self.first_values = np.pad(self.first_values, grow, constant_values=None)
+        return np.array([self.slots[key] for key in keys], dtype=np.intp)
+
+    def update(self, df):
+        """Add the rows of df (which has the key, mean and first columns), in order."""
+        df = plain_columns(df[self.keys + self.means + self.firsts])
+        # A later chunk can widen a column (whole numbers first, fractions later)
+        for column in df.columns:
+            self.dtypes[column] = combined_dtype(self.dtypes.get(column), df[column].dtype)
+
+        # Rows with a missing key are dropped, as groupby does by default
+        codes = df.groupby(self.keys, sort=False).ngroup()
+        keep = codes.notna().to_numpy()
+        if not keep.any():
+            return self
+        codes = codes.to_numpy()[keep].astype(np.intp)
+        positions = np.flatnonzero(keep)
+
+        # Key of each group code (codes are 0..n-1), from its first row
+        _, first_rows = np.unique(codes, return_index=True)
+        keys = list(df[self.keys].iloc[positions[first_rows]].itertuples(index=False, name=None))
+        slots = self._add_slots(keys)
+
+        values = df[self.means].to_numpy(dtype=np.float64)[positions]
+        self._add_values(slots[codes], values)
+
+        if self.firsts:
+            firsts = df[self.firsts].iloc[positions].groupby(codes).first().reindex(range(len(keys)))
+            current = self.first_values[slots]
+            incoming = firsts.to_numpy(dtype=object)
+            self.first_values[slots] = np.where(pd.isna(current), incoming, current)
+        return self
+
+    def _add_values(self, labels, values):
+        """Kahan-add each row to its key, rows of the same key in order."""
+        # Keys ordered by how many rows they have here, largest first: the
+        # keys with an n-th row are then always a prefix of that order
+        keys, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+        by_size = np.argsort(-sizes, kind='stable')
+        position = np.empty_like(by_size)
+        position[by_size] = np.arange(len(by_size))
+        row_position = position[inverse]
+
+        # Rank of every row within its key, then rows grouped into waves:
+        # wave n holds the n-th row of every key, in key-position order
+        order = np.lexsort((np.arange(len(labels)), row_position))
+        starts = np.r_[0, np.cumsum(sizes[by_size])[:-1]]
+        rank = np.empty(len(labels), dtype=np.intp)
+        rank[order] = np.arange(len(labels)) - np.repeat(starts, sizes[by_size])
+        wave_order = np.lexsort((row_position, rank))
+        wave_values = values[wave_order]
+        wave_sizes = np.bincount(rank)
+
+        slots = keys[by_size]
+        total = self.sums[slots]
+        compensation = self.compensation[slots]
+        finite = np.isfinite(wave_values).all()
+        if finite:
+            _kahan_waves(total, compensation, wave_values, wave_sizes)
+            counts_added = sizes[by_size][:, np.newaxis]
+        if not finite or not np.isfinite(total).all():
+            # Missing values (or an overflow): the general, slower steps
+            total = self.sums[slots]
+            compensation = self.compensation[slots]
+            counts_added = _kahan_waves_with_missing(total, compensation, wave_values, wave_sizes)
+
+        self.sums[slots] = total
+        self.compensation[slots] = compensation
+        self.counts[slots] += counts_added
+
+    def frame(self):
+        """One row per key, sorted by key like groupby: keys, means, then first values."""
+        data = {}
+        for i, column in enumerate(self.keys):
+            data[column] = pd.Series([key[i] for key in self.key_values], dtype=self.dtypes.get(column))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(self.counts > 0, self.sums / np.maximum(self.counts, 1), np.nan)
+        for i, column in enumerate(self.means):
+            data[column] = means[:, i]
+        for i, column in enumerate(self.firsts):
+            values = pd.Series(self.first_values[:, i], dtype=object)
+            data[column] = values.astype(self.dtypes[column]) if column in self.dtypes else values
+        frame = pd.DataFrame(data, columns=self.keys + self.means + self.firsts)
+        return frame.sort_values(self.keys, kind='stable').reset_index(drop=True)
+
+
+def _kahan_waves(total, compensation, values, wave_sizes):
+    """Kahan steps over finite values: wave n updates the first wave_sizes[n] keys in place."""
+    start = 0
+    for size in wave_sizes:
+        value = values[start:start + size]
+        start += size
+        s = total[:size]
+        c = compensation[:size]
+        y = value - c
+        t = s + y
+        np.subtract(t, s, out=c)
+        c -= y
+        s[...] = t
+
+
+def _kahan_waves_with_missing(total, compensation, values, wave_sizes):
+    """Kahan steps that skip missing values, as pandas does; returns non-null counts per key."""
+    counts = np.zeros(total.shape, dtype=np.int64)
+    start = 0
+    for size in wave_sizes:
+        value = values[start:start + size]
+        start += size
+        s = total[:size]
+        c = compensation[:size]
+
+        present = ~np.isnan(value)
+        y = value - c
+        t = s + y
+        new_compensation = (t - s) - y
+        new_compensation[new_compensation != new_compensation] = 0.0
+
+        np.copyto(c, new_compensation, where=present)
+        np.copyto(s, t, where=present)
+        counts[:size] += present
+    return counts
+
+
+class KnowledgeAggregates:
+    """Running aggregates for both knowledge bases."""
+
+    def __init__(self):
+        self.exercise = RunningGroups(EXERCISE_KEYS, EXERCISE_MEANS, EXERCISE_FIRSTS)
+        self.diet = RunningGroups(DIET_KEYS, DIET_MEANS)
+        self.rows = 0
+
+    def update(self, df):
+        self.exercise.update(df)
+        self.diet.update(df)
+        self.rows += len(df)
+        return self
+
+    def exercise_kb(self):
+        return self.exercise.frame()
+
+    def diet_kb(self):
+        return self.diet.frame()
+
+
+def build_knowledge_aggregates(path, chunk_size=CHUNK_SIZE, end=None):
+    """
+    KnowledgeAggregates of a CSV in one streaming pass: only the knowledge
+    base columns are parsed, chunk_size rows at a time, and each chunk
+    updates both knowledge bases. Memory holds one chunk plus one entry per
+    key. With end (a data_checkpoint offset), rows after that byte are not
+    read.
+    """
+    aggregates = KnowledgeAggregates()
+    source = open_prefix(path, end) if end is not None else open(path, 'rb')
+    with source, pd.read_csv(source, usecols=KNOWLEDGE_COLUMNS, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            aggregates.update(chunk)
+    return aggregates
+
+
+def knowledge_bases(df):
+    """Exercise and diet knowledge bases of df with pandas groupby (the reference build)."""
+    exercise = df.groupby(EXERCISE_KEYS, observed=True).agg(
+        {**{column: 'mean' for column in EXERCISE_MEANS}, **{column: 'first' for column in EXERCISE_FIRSTS}}
+    ).reset_index()
+    diet = df.groupby(DIET_KEYS, observed=True).agg({column: 'mean' for column in DIET_MEANS}).reset_index()
+    # Saved knowledge bases keep plain text columns, as the API and older artifacts expect
+    return plain_columns(exercise), plain_columns(diet)
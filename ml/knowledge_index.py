@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+knowledge_index.py
+Hash indexes over the exercise and diet knowledge bases.
+
+The knowledge bases are saved by train_model.py as pandas DataFrames. At load
+time they are compiled into read-only dicts of ready-to-serialize records, so
+each request does O(1) lookups instead of boolean-mask scans:
+- ExerciseIndex  keyed by (exercise, experience level), with a per-exercise
+                 fallback to the first level listed for that exercise
+- DietIndex      keyed by (diet_type, meal_type)
+
+Records are shared between requests and must not be mutated.
+
+Usage:
+    exercise_index = ExerciseIndex(joblib.load('knowledge_base.joblib'))
+    record = exercise_index.lookup('Squats', 2.0)
+"""
+
+from types import MappingProxyType
+
+# (response field, knowledge base column, converter)
+EXERCISE_FIELDS = [
+    ('sets', 'Sets', float),
+    ('reps', 'Reps', float),
+    ('calories_per_30min', 'Burns Calories (per 30 min)', float),
+    ('benefit', 'Benefit', None),
+    ('equipment_needed', 'Equipment Needed', None),
+    ('target_muscle_group', 'Target Muscle Group', None),
+    ('difficulty_level', 'Difficulty Level', None)
+]
+
+DIET_FIELDS = [
+    ('calories', 'Calories'),
+    ('carbs', 'Carbs'),
+    ('proteins', 'Proteins'),
+    ('fats', 'Fats')
+]
+
+
+def _exercise_record(row):
+    return {
+        field: (convert(row[column]) if convert else row[column])
+        for field, column, convert in EXERCISE_FIELDS
+    }
+
+
+class ExerciseIndex:
+    """Exercise details keyed by (name, experience level) with a per-name fallback."""
+
+    def __init__(self, knowledge_base):
+        by_level = {}
+        by_exercise = {}
+        for row in knowledge_base.to_dict('records'):
+            name = row['Name of Exercise']
+            record = _exercise_record(row)
+            # Keep the first row per key, as iloc[0] on the filtered frame did
+            by_level.setdefault((name, row['Experience_Level']), record)
+            by_exercise.setdefault(name, record)
+
+        self.by_level = MappingProxyType(by_level)
+        self.by_exercise = MappingProxyType(by_exercise)
+
+    def __len__(self):
+        return len(self.by_level)
+
+    def lookup(self, exercise_name, experience_level):
+        """Details for the exact level, else any level of the exercise, else None."""
+        record = self.by_level.get((exercise_name, experience_level))
+        if record is None:
+            record = self.by_exercise.get(exercise_name)
+        return record
+
+
+class DietIndex:
+    """Complete diet suggestions keyed by (diet_type, meal_type)."""
+
+    def __init__(self, diet_knowledge_base):
+        by_meal = {}
+        for row in diet_knowledge_base.to_dict('records'):
+            key = (row['diet_type'], row['meal_type'])
+            suggestion = {'diet_type': key[0], 'meal_type': key[1]}
+            suggestion.update((field, float(row[column])) for field, column in DIET_FIELDS)
+            by_meal.setdefault(key, suggestion)
+
+        self.by_meal = MappingProxyType(by_meal)
+
+    def __len__(self):
+        return len(self.by_meal)
+
+    def lookup(self, diet_type, meal_type):
+        """The serialized suggestion for a combination, or None."""
+        return self.by_meal.get((diet_type, meal_type))
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+load_test.py
+Latency and throughput benchmark for the recommendation API.
+
+Drives app.py through the Flask test client (in-process, no network) and
+through a local gunicorn started with gunicorn.conf.py, with randomized
+profiles drawn from realistic distributions inside the field ranges
+documented in API_USAGE.md. Every response is checked (HTTP 200, success,
+the requested number of recommendations). The scenarios are:
+- single   POST /predict, a new profile per request (response cache misses)
+- batch    POST /predict/batch with --batch-size new profiles per request
+- cached   POST /predict cycling through a few profiles already in the cache
+
+Each scenario reports p50/p95/p99/max latency per request and requests and
+profiles per second. Requests are sent one at a time to the test client and
+from --concurrency client threads to gunicorn. Results, with the commit,
+artifact version and settings, are written to --output as JSON;
+--compare checks them against an earlier file and exits with status 1 when
+a latency percentile or throughput regressed by more than --tolerance.
+
+Usage:
+    python3 load_test.py
+    python3 load_test.py --target gunicorn --workers 2 --concurrency 8
+    python3 load_test.py --output load_test.json --compare baseline.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TARGETS = ('flask', 'gunicorn')
+SCENARIOS = ('single', 'batch', 'cached')
+
+# Documented values (API_USAGE.md)
+GENDERS = ['Male', 'Female', 'Other']
+WORKOUT_TYPES = ['Strength', 'Cardio', 'Flexibility', 'Mixed']
+DIET_TYPES = ['Standard', 'Vegetarian', 'Vegan', 'Keto', 'Paleo', 'Mediterranean']
+MEAL_TYPES = ['Breakfast', 'Lunch', 'Dinner', 'Snack']
+# The diet types the diet knowledge base has: only Keto, Paleo, Vegan and
+# Vegetarian are also documented, so random_profiles() draws from these to
+# make every diet lookup in benchmark.py a hit
+KNOWLEDGE_BASE_DIET_TYPES = ['Balanced', 'Keto', 'Low-Carb', 'Paleo', 'Vegan', 'Vegetarian']
+
+# Profiles the cached scenario cycles through
+CACHED_PROFILES = 20
+
+# Metrics compared by --compare and whether lower is better
+COMPARED_METRICS = {'p50_ms': True, 'p95_ms': True, 'p99_ms': True, 'requests_per_s': False}
+
+
+def random_profiles(count, seed=0):
+    """
+    Profiles drawn uniformly from the full field ranges documented in
+    API_USAGE.md, with diet types the diet knowledge base has.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            'Age': rng.randint(13, 120),
+            'Gender': rng.choice(GENDERS),
+            'Weight (kg)': round(rng.uniform(30, 300), 1),
+            'Height (m)': round(rng.uniform(0.5, 3.0), 2),
+            'Fat_Percentage': round(rng.uniform(3, 60), 1),
+            'Experience_Level': rng.randint(1, 3),
+            'Workout_Frequency (days/week)': rng.randint(1, 7),
+            'Workout_Type': rng.choice(WORKOUT_TYPES),
+            'diet_type': rng.choice(KNOWLEDGE_BASE_DIET_TYPES),
+            'meal_type': rng.choice(MEAL_TYPES)
+        }
+        for _ in range(count)
+    ]
+
+
+def realistic_profiles(count, seed=0):
+    """
+    Profiles like real gym members': heights, BMI and body fat around adult
+    averages (by gender), more beginners than experts, 2-5 workout days,
+    every value clipped to its documented range.
+    """
+    rng = random.Random(seed)
+
+    def clipped(value, low, high):
+        return min(max(value, low), high)
+
+    profiles = []
+    for _ in range(count):
+        gender = rng.choices(GENDERS, weights=[48, 48, 4])[0]
+        male = gender == 'Male'
+        height = clipped(rng.gauss(1.76 if male else 1.64, 0.07), 0.5, 3.0)
+        bmi = clipped(rng.gauss(25.5, 4.0), 16.0, 45.0)
+        profiles.append({
+            'Age': int(clipped(round(rng.gauss(38, 12)), 13, 120)),
+            'Gender': gender,
+            'Weight (kg)': round(clipped(bmi * height ** 2, 30, 300), 1),
+            'Height (m)': round(height, 2),
+            'Fat_Percentage': round(clipped(rng.gauss(20 if male else 28, 6), 3, 60), 1),
+            'Experience_Level': rng.choices([1, 2, 3], weights=[45, 35, 20])[0],
+            'Workout_Frequency (days/week)': rng.choices(range(1, 8), weights=[5, 15, 30, 25, 15, 7, 3])[0],
+            'Workout_Type': rng.choice(WORKOUT_TYPES),
+            'diet_type': rng.choice(DIET_TYPES),
+            'meal_type': rng.choice(MEAL_TYPES)
+        })
+    return profiles
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workers, port, env_overrides):
+    """Start gunicorn with gunicorn.conf.py and wait until every worker answers /health."""
+    env = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f'127.0.0.1:{port}', **env_overrides)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app:app'],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1)
+            if len(worker_pids(server.pid)) == workers:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('gunicorn did not become ready within 120s')
+
+
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+class FlaskClient:
+    """Sends requests to app.py through the Flask test client."""
+
+    concurrency = 1
+
+    def __init__(self):
+        import app
+        self.client = app.app.test_client()
+
+    def post(self, path, body):
+        response = self.client.post(path, data=body, content_type='application/json')
+        return response.status_code, response.get_data()
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.get_data()
+
+
+class HTTPClient:
+    """Sends requests to a server on 127.0.0.1:port, one connection per request (sync workers close it)."""
+
+    def __init__(self, port, concurrency):
+        self.port = port
+        self.concurrency = concurrency
+
+    def _request(self, method, path, body=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def post(self, path, body):
+        return self._request('POST', path, body)
+
+    def get(self, path):
+        return self._request('GET', path)
+
+
+def check_response(status, payload, profiles, num_recommendations):
+    """An error message for a failed or malformed response, else None.
+
+    A profile routed to a model shard may get fewer than num_recommendations
+    exercises (as many as the shard knows), but never none.
+    """
+    if status != 200:
+        return f'HTTP {status}: {payload[:200]!r}'
+    body = json.loads(payload)
+    results = body.get('results', [body])
+    if len(results) != profiles:
+        return f'{len(results)} results for {profiles} profiles'
+    for result in results:
+        if not result.get('success'):
+            return f"Unsuccessful result: {result.get('error')}"
+        if not 1 <= len(result['exercise_recommendations']) <= num_recommendations:
+            return f"{len(result['exercise_recommendations'])} recommendations, expected 1-{num_recommendations}"
+    return None
+
+
+def summarize(latencies, elapsed, profiles_per_request, errors):
+    """Latency percentiles (ms) and throughput of one scenario."""
+    latencies = np.asarray(latencies) * 1000
+    requests = len(latencies)
+    return {
+        'requests': requests,
+        'profiles': requests * profiles_per_request,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'mean_ms': round(float(latencies.mean()), 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'max_ms': round(float(latencies.max()), 3),
+        'requests_per_s': round(requests / elapsed, 1),
+        'profiles_per_s': round(requests * profiles_per_request / elapsed, 1)
+    }
+
+
+def run_scenario(client, path, bodies, profiles_per_request, num_recommendations):
+    """Send every body once (from client.concurrency threads) and summarize."""
+    latencies = [None] * len(bodies)
+    errors = []
+    lock = threading.Lock()
+
+    def send(index):
+        started = time.perf_counter()
+        status, payload = client.post(path, bodies[index])
+        latencies[index] = time.perf_counter() - started
+        error = check_response(status, payload, profiles_per_request, num_recommendations)
+        if error is not None:
+            with lock:
+                errors.append(error)
+
+    started = time.perf_counter()
+    if client.concurrency == 1:
+        for index in range(len(bodies)):
+            send(index)
+    else:
+        with ThreadPoolExecutor(max_workers=client.concurrency) as pool:
+            list(pool.map(send, range(len(bodies))))
+    return summarize(latencies, time.perf_counter() - started, profiles_per_request, errors)
+
+
+def scenario_bodies(scenario, requests, batch_size, num_recommendations, seed):
+    """(path, JSON bodies, profiles per request) for a scenario."""
+    extra = {'num_recommendations': num_recommendations}
+    if scenario == 'single':
+        profiles = realistic_profiles(requests, seed)
+        return '/predict', [json.dumps({**profile, **extra}) for profile in profiles], 1
+    if scenario == 'batch':
+        profiles = realistic_profiles(requests * batch_size, seed + 1)
+        bodies = [json.dumps({'profiles': profiles[i:i + batch_size], **extra})
+                  for i in range(0, len(profiles), batch_size)]
+        return '/predict/batch', bodies, batch_size
+    pool = [json.dumps({**profile, **extra}) for profile in realistic_profiles(CACHED_PROFILES, seed + 2)]
+    return '/predict', [pool[i % len(pool)] for i in range(requests)], 1
+
+
+def run_target(client, args):
+    """Warm up, then run every requested scenario against one client."""
+    results = {}
+    for scenario in args.scenarios:
+        path, bodies, per_request = scenario_bodies(scenario, args.requests, args.batch_size,
+                                                    args.num_recommendations, args.seed)
+        if scenario == 'cached':
+            # Fill the cache of every worker that may answer before measuring
+            warm_up = bodies[:CACHED_PROFILES] * max(1, 2 * args.workers)
+        else:
+            # Different profiles than the measured ones, so the cache stays cold for them
+            warm_up = scenario_bodies(scenario, args.warmup, args.batch_size,
+                                      args.num_recommendations, args.seed + 100)[1]
+        run_scenario(client, path, warm_up, per_request, args.num_recommendations)
+        results[scenario] = run_scenario(client, path, bodies, per_request, args.num_recommendations)
+    status, payload = client.get('/health')
+    health = json.loads(payload) if status == 200 else {}
+    return results, health
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current, tolerance):
+    """
+    (target, scenario, metric, before, after, change) for every compared
+    metric present in both result files, and the subset that regressed by
+    more than tolerance (a fraction).
+    """
+    rows, regressions = [], []
+    for target, scenarios in current['targets'].items():
+        for scenario, result in scenarios.items():
+            before = previous.get('targets', {}).get(target, {}).get(scenario)
+            if before is None:
+                continue
+            for metric, lower_is_better in COMPARED_METRICS.items():
+                if not before.get(metric):
+                    continue
+                change = result[metric] / before[metric] - 1
+                row = (target, scenario, metric, before[metric], result[metric], change)
+                rows.append(row)
+                if (change > tolerance) if lower_is_better else (change < -tolerance):
+                    regressions.append(row)
+    return rows, regressions
+
+
+def print_results(target, results):
+    print(f"\n  {target:<9} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'req/s':>8} {'profiles/s':>10} {'errors':>6}")
+    for scenario, result in results.items():
+        print(f"  {scenario:<9} {result['requests']:>8} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['max_ms']:>8.2f} {result['requests_per_s']:>8.1f} "
+              f"{result['profiles_per_s']:>10.1f} {result['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency and throughput benchmark for the recommendation API')
+    parser.add_argument('--target', choices=TARGETS + ('all',), default='flask',
+                        help='Flask test client, local gunicorn, or both (default: flask)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f'Comma-separated scenarios (default: {",".join(SCENARIOS)})')
+    parser.add_argument('--requests', type=int, default=300, help='Measured requests per scenario (default: 300)')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests first (default: 20)')
+    parser.add_argument('--batch-size', type=int, default=50, help='Profiles per /predict/batch (default: 50)')
+    parser.add_argument('--num-recommendations', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (default: 2)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Client threads for gunicorn (default: 4)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--artifact-dir', default=os.environ.get('ARTIFACT_DIR', '.'))
+    parser.add_argument('--output', default='load_test.json', help='Results file (default: load_test.json)')
+    parser.add_argument('--compare', help='Earlier results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed relative regression for --compare (default: 0.15)')
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+    if args.requests < 1 or args.batch_size < 1:
+        parser.error('--requests and --batch-size must be at least 1')
+    targets = TARGETS if args.target == 'all' else (args.target,)
+    # app.py and gunicorn read the artifact directory from the environment
+    os.environ['ARTIFACT_DIR'] = os.path.abspath(args.artifact_dir)
+
+    print("=" * 60)
+    print(f"API load test: {', '.join(targets)} | {', '.join(args.scenarios)} | {args.requests} requests each")
+    print("=" * 60)
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'settings': {name: getattr(args, name) for name in
+                     ('scenarios', 'requests', 'warmup', 'batch_size', 'num_recommendations',
+                      'workers', 'concurrency', 'seed')},
+        'targets': {},
+        'servers': {}
+    }
+    for target in targets:
+        if target == 'flask':
+            results, health = run_target(FlaskClient(), args)
+        else:
+            port = free_port()
+            server = start_gunicorn(args.workers, port, {})
+            try:
+                results, health = run_target(HTTPClient(port, args.concurrency), args)
+            finally:
+                server.terminate()
+                server.wait()
+        report['targets'][target] = results
+        report['servers'][target] = {name: health.get(name) for name in
+                                     ('artifact_version', 'inference_engine', 'artifact_format',
+                                      'default_model_variant')}
+        print_results(target, results)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Saved: {args.output}")
+
+    failed = False
+    errors = sum(result['errors'] for results in report['targets'].values() for result in results.values())
+    if errors:
+        print(f"❌ {errors} requests failed validation")
+        failed = True
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        rows, regressions = compare(previous, report, args.tolerance)
+        print(f"\nCompared with {args.compare} (commit {previous.get('commit')}):")
+        for target, scenario, metric, before, after, change in rows:
+            marker = '❌' if (target, scenario, metric, before, after, change) in regressions else '  '
+            print(f"  {marker} {target:<9} {scenario:<7} {metric:<15} {before:>10.2f} -> {after:>10.2f} "
+                  f"({change:+.1%})")
+        if regressions:
+            print(f"❌ {len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+            failed = True
+        else:
+            print(f"✓ No regression beyond {args.tolerance:.0%}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
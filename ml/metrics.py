@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+metrics.py
+Low-overhead request instrumentation for the ML API.
+
+A StageTimer is started per request and marked at the end of every stage
+(JSON parsing, feature encoding, predict_proba, KB lookups, jsonify); each
+mark costs one perf_counter() call. When the request finishes the stage
+durations are added to fixed-bucket histograms. Request and error counts
+are kept as counters. Metrics.render() writes everything in the Prometheus
+text exposition format for GET /metrics.
+
+Metrics live in the process that records them; under gunicorn every worker
+reports its own, so scrape them per worker or sum them in the query.
+
+Usage:
+    metrics = Metrics()
+    timer = metrics.start('predict')
+    timer.mark('parse')
+    ...
+    durations = timer.finish(200)
+    text = metrics.render()
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf overflow bucket (not cumulative)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        prefix = labels + ',' if labels else ''
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            yield f'{name}_bucket{{{prefix}le="{le}"}} {cumulative}'
+        suffix = f'{{{labels}}}' if labels else ''
+        yield f'{name}_sum{suffix} {_number(self.sum)}'
+        yield f'{name}_count{suffix} {self.count}'
+
+
+class StageTimer:
+    """Collects the duration of each stage of one request."""
+
+    __slots__ = ('_metrics', '_endpoint', '_started', '_last', 'stages')
+
+    def __init__(self, metrics, endpoint):
+        self._metrics = metrics
+        self._endpoint = endpoint
+        self._started = self._last = time.perf_counter()
+        self.stages = []
+
+    def mark(self, stage):
+        """End the current stage: everything since the previous mark is charged to it."""
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def finish(self, status):
+        """Record the request; returns [(stage, seconds), ...] for Server-Timing."""
+        total = time.perf_counter() - self._started
+        self._metrics.record(self._endpoint, status, self.stages, total)
+        return self.stages + [('total', total)]
+
+
+class _NullTimer:
+    """Stand-in when metrics are disabled: every call is a no-op."""
+
+    stages = ()
+
+    def mark(self, stage):
+        pass
+
+    def finish(self, status):
+        return None
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Process-wide registry of request histograms and counters."""
+
+    def __init__(self, enabled=True, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stage_seconds = {}
+        self._request_seconds = {}
+        self._requests = {}
+        self._errors = {}
+        self._started = time.time()
+
+    def start(self, endpoint):
+        return StageTimer(self, endpoint) if self.enabled else NULL_TIMER
+
+    def record(self, endpoint, status, stages, total):
+        with self._lock:
+            for stage, seconds in stages:
+                histogram = self._stage_seconds.get((endpoint, stage))
+                if histogram is None:
+                    histogram = self._stage_seconds[(endpoint, stage)] = Histogram(self.buckets)
+                histogram.observe(seconds)
+            histogram = self._request_seconds.get(endpoint)
+            if histogram is None:
+                histogram = self._request_seconds[endpoint] = Histogram(self.buckets)
+            histogram.observe(total)
+            key = (endpoint, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def count_error(self, endpoint, reason, count=1):
+        """Count failed requests, or failed profiles within a batch, by reason."""
+        if not self.enabled:
+            return
+        with self._lock:
+            key = (endpoint, reason)
+            self._errors[key] = self._errors.get(key, 0) + count
+
+    def render(self, cache_stats=None, info=None, shards=None):
+        """
+        The metrics in Prometheus text format.
+
+        cache_stats is ResponseCache.stats(); info is a dict of labels for a
+        constant ml_artifact_info gauge (e.g. the active artifact version);
+        shards is the active ShardRegistry (model_shards.py), if any.
+        """
+        lines = []
+
+        def header(name, kind, description):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            header('ml_request_duration_seconds', 'histogram', 'Total time spent handling a request')
+            for endpoint, histogram in sorted(self._request_seconds.items()):
+                lines.extend(histogram.lines('ml_request_duration_seconds', _labels(['endpoint'], [endpoint])))
+
+            header('ml_stage_duration_seconds', 'histogram', 'Time spent in each stage of a request')
+            for (endpoint, stage), histogram in sorted(self._stage_seconds.items()):
+                labels = _labels(['endpoint', 'stage'], [endpoint, stage])
+                lines.extend(histogram.lines('ml_stage_duration_seconds', labels))
+
+            header('ml_requests_total', 'counter', 'Requests handled, by endpoint and HTTP status')
+            for (endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f'ml_requests_total{{{_labels(["endpoint", "status"], [endpoint, status])}}} {count}')
+
+            header('ml_errors_total', 'counter', 'Rejected requests or batch profiles, by reason')
+            for (endpoint, reason), count in sorted(self._errors.items()):
+                lines.append(f'ml_errors_total{{{_labels(["endpoint", "reason"], [endpoint, reason])}}} {count}')
+
+        if cache_stats is not None:
+            header('ml_cache_events_total', 'counter', 'Response cache lookups and removals, by event')
+            for event in ('hits', 'misses', 'evictions', 'expirations'):
+                lines.append(f'ml_cache_events_total{{event="{event}"}} {cache_stats[event]}')
+            header('ml_cache_entries', 'gauge', 'Responses currently cached')
+            lines.append(f'ml_cache_entries {cache_stats["size"]}')
+
+        if shards is not None:
+            shard_stats = shards.stats()
+            header('ml_shard_events_total', 'counter', 'Model shard lookups, loads and fallbacks, by event')
+            for event in ('hits', 'loads', 'evictions', 'load_errors', 'fallbacks'):
+                lines.append(f'ml_shard_events_total{{event="{event}"}} {shard_stats[event]}')
+            header('ml_shards_resident', 'gauge', 'Model shards currently loaded')
+            lines.append(f'ml_shards_resident {len(shard_stats["resident"])}')
+            header('ml_shard_load_duration_seconds', 'histogram', 'Time spent loading a model shard')
+            lines.extend(shards.load_seconds.lines('ml_shard_load_duration_seconds', ''))
+
+        if info:
+            header('ml_artifact_info', 'gauge', 'Active artifact set (value is always 1)')
+            lines.append(f'ml_artifact_info{{{_labels(info.keys(), info.values())}}} 1')
+
+        header('ml_process_start_time_seconds', 'gauge', 'Unix time the metrics registry was created')
+        lines.append(f'ml_process_start_time_seconds {_number(self._started)}')
+        return '\n'.join(lines) + '\n'
+
+
+def server_timing(stages):
+    """Server-Timing header value for [(stage, seconds), ...], in milliseconds."""
+    return ', '.join(f'{stage};dur={seconds * 1000:.3f}' for stage, seconds in stages)
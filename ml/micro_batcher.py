@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+micro_batcher.py
+Coalesces concurrent asyncio requests into micro-batches.
+
+Callers await submit(item). The first item of an empty queue opens a
+window: items arriving within max_wait seconds, up to max_batch_size, are
+scored together by one call of score_batch(items) on a worker thread, and
+each caller gets back its own element of the returned list. While one batch
+is being scored the next one collects, so a burst of single-row requests
+becomes a few vectorized model calls instead of one per request.
+
+Latency added per request is bounded by max_wait plus the time of one
+batch; when more than max_pending items are waiting, submit() raises
+Overloaded instead of growing the queue without limit.
+
+Usage:
+    batcher = MicroBatcher(score_batch, max_batch_size=64, max_wait=0.002)
+    result = await batcher.submit(item)
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    """Raised by submit() when the queue is full."""
+
+
+class MicroBatcher:
+    """Runs score_batch over coalesced submissions, one batch at a time."""
+
+    def __init__(self, score_batch, max_batch_size=64, max_wait=0.002, max_pending=1000):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._wakeup = None
+        self._task = None
+        # A single scoring thread keeps batches in order and off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='micro-batch')
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.rejected = 0
+
+    def _start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item):
+        """Queue item and wait for its result (or the exception its batch raised)."""
+        if self._task is None or self._task.done():
+            self._start()
+        if len(self._pending) >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded(f'{len(self._pending)} requests already waiting')
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        self._wakeup.set()
+        return await future
+
+    async def _collect(self):
+        """Wait for one item, then let more arrive until the window closes or the batch is full."""
+        while not self._pending:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(self._pending) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            # Items stay in the deque, so a timeout here can never lose one
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return [self._pending.popleft() for _ in range(min(self.max_batch_size, len(self._pending)))]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.score_batch, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(items)
+                self.largest_batch = max(self.largest_batch, len(items))
+            for (_, future), result in zip(batch, results):
+                # A caller that disconnected has cancelled its future
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'window_ms': self.max_wait * 1000,
+                'batches': self.batches,
+                'requests': self.items,
+                'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'rejected': self.rejected,
+                'waiting': len(self._pending)
+            }
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+model_search.py
+Cross-validated hyperparameter search for the exercise classifier.
+
+Each candidate is a set of LightGBM parameters scored with stratified
+k-fold cross-validation. Every fold trains up to MAX_ESTIMATORS rounds and
+stops early once the validation log loss has not improved for
+EARLY_STOPPING_ROUNDS, so a candidate also yields how many boosting rounds
+it actually needs. The first candidate is always the previous fixed
+configuration (LightGBM defaults), so the search can only replace it with
+something that scores better.
+
+Candidates run in a process pool. LightGBM's own thread count is set to
+cores // workers, so the pool never runs more threads than there are cores.
+
+Inference cost is measured afterwards in the parent process, one candidate
+at a time, so timings are not skewed by the other workers: the model from
+the last fold is timed on single-row predict_proba calls (what /predict
+does) with both the LightGBM booster and the compiled tree engine, next to
+its tree and leaf counts.
+
+Usage:
+    candidates = sample_candidates(DEFAULT_SEARCH_SPACE, count=12)
+    results = search(X, y, candidates, folds=5, workers=4)
+    best = select_candidate(results, max_latency_us=500)
+"""
+
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import lightgbm as lgb
+import numpy as np
+from sklearn.metrics import log_loss
+from sklearn.model_selection import StratifiedKFold
+
+from artifacts import BoosterPredictor
+from tree_engine import CompiledForest
+
+# Values tried per LightGBM parameter; the full grid is sampled at random
+DEFAULT_SEARCH_SPACE = {
+    'num_leaves': [15, 31, 63],
+    'learning_rate': [0.05, 0.1, 0.2],
+    'min_child_samples': [10, 20, 40],
+    'colsample_bytree': [0.8, 1.0],
+    'subsample': [0.8, 1.0],
+    'reg_lambda': [0.0, 1.0]
+}
+
+# Parameters shared by every candidate
+BASE_PARAMS = {'random_state': 42, 'subsample_freq': 1, 'verbose': -1}
+
+MAX_ESTIMATORS = 500
+EARLY_STOPPING_ROUNDS = 20
+
+# Rows timed per candidate when measuring single-row latency
+LATENCY_ROWS = 200
+
+# Training data of this worker process, set once by init_worker()
+worker_data = None
+
+
+def sample_candidates(space=None, count=12, seed=42):
+    """
+    Up to count parameter sets from the grid spanned by space, starting with
+    the LightGBM defaults ({}). The same seed always gives the same sample.
+    """
+    space = DEFAULT_SEARCH_SPACE if space is None else space
+    names = sorted(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    if count - 1 < len(grid):
+        grid = random.Random(seed).sample(grid, max(count - 1, 0))
+    return [{}] + grid
+
+
+def usable_folds(y, folds):
+    """folds reduced so every class has at least one row in each fold."""
+    _, counts = np.unique(y, return_counts=True)
+    return max(2, min(folds, int(counts.min())))
+
+
+def init_worker(X, y):
+    """Keep the training data once per worker process."""
+    global worker_data
+    worker_data = (X, y)
+
+
+def evaluate_candidate(index, params, folds=5, early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                       max_estimators=MAX_ESTIMATORS, threads=1, seed=42):
+    """Cross-validate one candidate on the worker's data (see init_worker)."""
+    X, y = worker_data
+    classes, labels = np.unique(y, return_inverse=True)
+    # Same objective LGBMClassifier picks; sklearn parameter names are LightGBM aliases
+    objective = {'objective': 'multiclass', 'num_class': len(classes)} if len(classes) > 2 else {'objective': 'binary'}
+    train_params = {**BASE_PARAMS, **params, **objective, 'n_jobs': threads}
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+
+    accuracies, losses, iterations = [], [], []
+    started = time.perf_counter()
+    for train, valid in splitter.split(X, labels):
+        train_set = lgb.Dataset(X[train], labels[train])
+        valid_set = lgb.Dataset(X[valid], labels[valid], reference=train_set)
+        callbacks = [lgb.early_stopping(early_stopping_rounds, verbose=False)] if early_stopping_rounds else []
+        booster = lgb.train(train_params, train_set, num_boost_round=max_estimators,
+                            valid_sets=[valid_set], callbacks=callbacks)
+
+        best_iteration = booster.best_iteration or max_estimators
+        probabilities = BoosterPredictor(booster, classes).predict_proba(X[valid])
+        accuracies.append(float(np.mean(probabilities.argmax(axis=1) == labels[valid])))
+        losses.append(float(log_loss(labels[valid], probabilities, labels=np.arange(len(classes)))))
+        iterations.append(int(best_iteration))
+
+    tree_info = booster.dump_model(num_iteration=best_iteration)['tree_info']
+    return {
+        'index': index,
+        'params': params,
+        'accuracy': float(np.mean(accuracies)),
+        'accuracy_std': float(np.std(accuracies)),
+        'log_loss': float(np.mean(losses)),
+        'fold_iterations': iterations,
+        # Rounds for a refit on all the data
+        'n_estimators': int(np.median(iterations)),
+        'trees': len(tree_info),
+        'leaves': sum(tree['num_leaves'] for tree in tree_info),
+        'fit_seconds': time.perf_counter() - started,
+        'model': booster.model_to_string(num_iteration=best_iteration),
+        'classes': classes
+    }
+
+
+def _single_row_us(predictor, X):
+    timings = []
+    for row in X:
+        started = time.perf_counter()
+        predictor.predict_proba(row[np.newaxis, :])
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1e6)
+
+
+def booster_latency(booster, classes, X, rows=LATENCY_ROWS):
+    """Median single-row predict_proba times (µs) of a booster with both inference engines."""
+    sample = np.ascontiguousarray(X[:rows], dtype=np.float64)
+    return {
+        'booster_us': _single_row_us(BoosterPredictor(booster, classes), sample),
+        'compiled_us': _single_row_us(CompiledForest.from_booster(booster, classes), sample)
+    }
+
+
+def measure_latency(result, X, rows=LATENCY_ROWS):
+    """Add median single-row predict_proba times (µs) for the candidate's last-fold model."""
+    result.update(booster_latency(lgb.Booster(model_str=result['model']), result['classes'], X, rows))
+    return result
+
+
+def search(X, y, candidates, folds=5, workers=None, early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+           max_estimators=MAX_ESTIMATORS, threads=None, measure=True):
+    """
+    Cross-validate every candidate and return one result dict per candidate,
+    in candidate order. workers defaults to the number of cores and threads
+    (LightGBM threads per worker) to cores // workers.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or cores, len(candidates)))
+    threads = threads or max(1, cores // workers)
+    folds = usable_folds(y, folds)
+    settings = {'folds': folds, 'early_stopping_rounds': early_stopping_rounds,
+                'max_estimators': max_estimators, 'threads': threads}
+
+    if workers == 1:
+        init_worker(X, y)
+        results = [evaluate_candidate(i, params, **settings) for i, params in enumerate(candidates)]
+    else:
+        # fork where available: train_model.py is a script without a __main__
+        # guard, and spawned workers would re-run it on import
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=init_worker, initargs=(X, y)) as pool:
+            futures = [pool.submit(evaluate_candidate, i, params, **settings) for i, params in enumerate(candidates)]
+            results = [future.result() for future in futures]
+
+    if measure:
+        for result in results:
+            measure_latency(result, X)
+    return results
+
+
+def select_candidate(results, max_latency_us=None, accuracy_tolerance=0.0, engine='booster'):
+    """
+    The result to train the final model with.
+
+    Candidates slower than max_latency_us (single-row time with engine) are
+    skipped unless none is fast enough, in which case the fastest is chosen.
+    Among the rest, the fastest one whose accuracy is within
+    accuracy_tolerance of the best wins.
+    """
+    latency = f'{engine}_us'
+    eligible = [r for r in results if max_latency_us is None or r[latency] <= max_latency_us]
+    if not eligible:
+        return min(results, key=lambda r: r[latency])
+    best_accuracy = max(r['accuracy'] for r in eligible)
+    close = [r for r in eligible if r['accuracy'] >= best_accuracy - accuracy_tolerance]
+    return min(close, key=lambda r: (r[latency], -r['accuracy'], r['index']))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+model_shards.py
+Per-Workout_Type model shards and the registry that serves them.
+
+train_model.py (WORKOUT_SHARDS=1) fits one classifier per Workout_Type on
+that type's rows, next to the global model, and write_shards() saves them to
+model_shards/: one directory per shard with its flat tree arrays
+(forest.npz) and LightGBM model (booster.txt), plus shards.json listing each
+shard's Workout_Type, rows, classes and version. Like model_bundle/, it is
+published as a symlink to a numbered directory that is switched atomically
+(see artifact_bundle.publish_directory).
+
+The API routes a request to the shard of its Workout_Type (matched without
+regard to case) and falls back to the global model when there is none. A
+ShardRegistry loads each shard on first use and keeps at most `capacity`
+loaded, evicting the least recently used one, so memory stays bounded however
+many shards there are. It counts hits, loads, evictions, load errors and
+fallbacks and keeps a histogram of load times for /metrics. A shard that
+fails to load is not retried until the artifacts are reloaded; its requests
+are served by the global model.
+
+Usage:
+    write_shards('model_shards', {'Cardio': {'forest': forest, 'booster': booster, 'rows': 1499}}, training_columns)
+    registry = ShardRegistry('model_shards', loader, capacity=4)
+    shard = registry.get(registry.route('cardio'))   # loader(directory, info), or None
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+from artifact_bundle import publish_directory
+from metrics import Histogram
+
+# Profile and dataset column a request is routed on
+SHARD_COLUMN = 'Workout_Type'
+SHARDS_DIR = 'model_shards'
+SHARDS_INDEX = 'shards.json'
+SHARDS_FORMAT = 1
+SHARD_FOREST_FILE = 'forest.npz'
+SHARD_BOOSTER_FILE = 'booster.txt'
+
+
+def shard_directory(name):
+    """Directory name of the shard for a Workout_Type value."""
+    return re.sub(r'[^a-z0-9]+', '_', str(name).strip().lower()).strip('_') or 'shard'
+
+
+def write_shards(directory, shards, training_columns):
+    """
+    Write {workout_type: {'forest', 'booster', 'rows'}} to directory, replacing
+    any previous shards there (through a temporary directory published like
+    write_bundle's). Returns the version of the shard set.
+    """
+    staging = directory + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    entries = {}
+    used = set()
+    for name, shard in shards.items():
+        subdirectory = shard_directory(name)
+        while subdirectory in used:
+            subdirectory += '_'
+        used.add(subdirectory)
+        os.makedirs(os.path.join(staging, subdirectory))
+        shard['forest'].save(os.path.join(staging, subdirectory, SHARD_FOREST_FILE))
+        model_text = shard['booster'].model_to_string()
+        with open(os.path.join(staging, subdirectory, SHARD_BOOSTER_FILE), 'w', encoding='utf-8') as f:
+            f.write(model_text)
+        entries[name] = {
+            'directory': subdirectory,
+            'rows': int(shard['rows']),
+            'classes': shard['forest'].classes_.tolist(),
+            'trees': shard['forest'].n_trees,
+            'version': hashlib.sha1(model_text.encode()).hexdigest()[:12]
+        }
+
+    digest = hashlib.sha1(json.dumps([list(training_columns), sorted(
+        (name, entry['version']) for name, entry in entries.items())]).encode())
+    index = {
+        'format': SHARDS_FORMAT,
+        'version': digest.hexdigest()[:12],
+        'training_columns': list(training_columns),
+        'shards': entries
+    }
+    with open(os.path.join(staging, SHARDS_INDEX), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+
+    publish_directory(staging, directory)
+    return index['version']
+
+
+def has_shards(directory):
+    return os.path.isfile(os.path.join(directory, SHARDS_INDEX))
+
+
+class ShardRegistry:
+    """Thread-safe LRU of loaded model shards, loaded on first use."""
+
+    def __init__(self, directory, loader, capacity=4, clock=time.perf_counter):
+        # Resolved once: shards loaded later come from the same version as the index
+        directory = os.path.realpath(directory)
+        with open(os.path.join(directory, SHARDS_INDEX), encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('format') != SHARDS_FORMAT:
+            raise ValueError(f"Unsupported shard format {index.get('format')} in {directory}")
+        if capacity < 1:
+            raise ValueError(f'Shard capacity must be at least 1, got {capacity}')
+        self.directory = directory
+        self.version = index['version']
+        self.training_columns = index['training_columns']
+        self.shards = index['shards']
+        self.capacity = capacity
+        self._loader = loader
+        self._clock = clock
+        self._names = {name.strip().lower(): name for name in self.shards}
+        self._resident = OrderedDict()
+        self._failed = {}
+        self._lock = threading.Lock()
+        # Held while loading so two requests for a cold shard load it once
+        self._load_lock = threading.Lock()
+        self.load_seconds = Histogram()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_errors = 0
+        self.fallbacks = 0
+
+    def __len__(self):
+        return len(self.shards)
+
+    def route(self, workout_type):
+        """Name of the shard for a Workout_Type value, or None (counted as a fallback)."""
+        name = self._names.get(str(workout_type).strip().lower()) if workout_type is not None else None
+        if name is None:
+            with self._lock:
+                self.fallbacks += 1
+        return name
+
+    def _resident_shard(self, name):
+        # Caller holds self._lock
+        shard = self._resident.get(name)
+        if shard is not None:
+            self._resident.move_to_end(name)
+            self.hits += 1
+        return shard
+
+    def get(self, name):
+        """The loaded shard, loading it (and evicting the least recently used) if needed; None if it fails."""
+        with self._lock:
+            shard = self._resident_shard(name)
+            if shard is not None:
+                return shard
+            if name in self._failed:
+                self.fallbacks += 1
+                return None
+
+        with self._load_lock:
+            with self._lock:
+                shard = self._resident_shard(name)
+                if shard is not None:
+                    return shard
+
+            info = self.shards[name]
+            started = self._clock()
+            try:
+                shard = self._loader(os.path.join(self.directory, info['directory']), info)
+            except Exception as e:
+                with self._lock:
+                    self._failed[name] = str(e)
+                    self.load_errors += 1
+                    self.fallbacks += 1
+                print(f"❌ Model shard '{name}' failed to load, serving the global model: {e}")
+                return None
+            seconds = self._clock() - started
+
+            with self._lock:
+                self.loads += 1
+                self.load_seconds.observe(seconds)
+                self._resident[name] = shard
+                while len(self._resident) > self.capacity:
+                    self._resident.popitem(last=False)
+                    self.evictions += 1
+            return shard
+
+    def stats(self):
+        with self._lock:
+            return {
+                'shards': len(self.shards),
+                'capacity': self.capacity,
+                'resident': list(self._resident),
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'load_errors': self.load_errors,
+                'fallbacks': self.fallbacks,
+                'load_seconds_total': round(self.load_seconds.sum, 4),
+                'failed': dict(self._failed)
+            }
+
+    def describe(self):
+        """Summary for /health: the shards on disk plus the registry counters."""
+        description = self.stats()
+        description['version'] = self.version
+        description['workout_types'] = {
+            name: {'rows': info['rows'], 'classes': len(info['classes']), 'trees': info['trees']}
+            for name, info in self.shards.items()
+        }
+        return description
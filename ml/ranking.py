@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+ranking.py
+Top-k selection over class probability arrays.
+
+np.argpartition picks the k best classes in linear time; only those k are
+then sorted. This replaces zipping every class with its probability and
+sorting the whole list in Python, and works on a single probability row or
+on a 2-D batch of rows at once.
+
+Usage:
+    top = top_k_indices(probabilities, 4)   # (n_classes,) -> (4,), (n, n_classes) -> (n, 4)
+"""
+
+import numpy as np
+
+
+def top_k_indices(probabilities, k):
+    """
+    Indices of the k highest probabilities along the last axis, highest first.
+
+    Selected classes with equal probabilities are ordered by class index, like
+    the stable sort this replaces (a tie straddling the k-th place may keep
+    either class). Raises ValueError unless 1 <= k <= number of classes.
+    """
+    probabilities = np.asarray(probabilities)
+    n_classes = probabilities.shape[-1]
+    if not 1 <= k <= n_classes:
+        raise ValueError(f'k must be between 1 and {n_classes}, got {k}')
+
+    if probabilities.ndim == 1:
+        # Single row: plain indexing avoids the take_along_axis overhead
+        candidates = np.argpartition(-probabilities, k - 1)[:k] if k < n_classes else np.arange(n_classes)
+        return candidates[np.lexsort((candidates, -probabilities[candidates]))]
+
+    if k < n_classes:
+        candidates = np.argpartition(-probabilities, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n_classes), probabilities.shape)
+
+    values = np.take_along_axis(probabilities, candidates, axis=-1)
+    order = np.lexsort((candidates, -values), axis=-1)
+    return np.take_along_axis(candidates, order, axis=-1)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+recommendation_grid.py
+Precomputed top-k recommendations over a quantized grid of user profiles.
+
+The API's input domain is small and bounded: three experience levels,
+seven workout frequencies, a few genders and limited ranges of age, weight,
+height and body fat. train_model.py can optionally score the model once on
+every point of a regular grid over that space and store the top-k classes
+of each cell (uint8/uint16 class indices plus float16 confidences). The
+API then answers a profile inside the grid with two array reads instead of
+a predict_proba call, and scores anything outside it live.
+
+A continuous field (age, weight, height, fat %) is snapped to the nearest
+grid point. Experience level and workout frequency must sit exactly on one.
+Categorical fields use one slot per training dummy column plus one for any
+other value, matching how FeatureEncoder encodes them. BMI is derived from
+the snapped weight and height, so each cell is answered exactly as the
+model answers its representative profile. grid_agreement() measures how
+often that matches live inference for real profiles.
+
+Usage:
+    grid = RecommendationGrid.build(predictor, training_columns, axes=DEFAULT_AXES, top_k=4)
+    answer = grid.lookup(feature_data, num_recommendations)   # None -> score live
+"""
+
+import numpy as np
+
+from features import CATEGORICAL_FIELDS, NUMERIC_FIELDS, FeatureEncoder
+from ranking import top_k_indices
+
+# (start, stop, step) per numeric field; both ends are grid points
+DEFAULT_AXES = {
+    'Age': (15, 65, 5),
+    'Weight (kg)': (40, 130, 10),
+    'Height (m)': (1.5, 2.0, 0.1),
+    'Fat_Percentage': (10, 40, 5),
+    'Experience_Level': (1, 3, 1),
+    'Workout_Frequency (days/week)': (1, 7, 1)
+}
+
+# Fields a profile must match exactly; the other axes snap to the nearest point
+EXACT_FIELDS = ('Experience_Level', 'Workout_Frequency (days/week)')
+
+# Cells scored per predict_proba call while building
+BUILD_CHUNK_SIZE = 20000
+
+
+def _axis_points(start, stop, step):
+    count = int(round((stop - start) / step)) + 1
+    return np.round(start + step * np.arange(count), 10)
+
+
+class RecommendationGrid:
+    """Top-k class indices and confidences for every cell of a profile grid."""
+
+    def __init__(self, axes, categories, top_indices, confidences, n_classes):
+        self.axes = {field: tuple(float(v) for v in spec) for field, spec in axes.items()}
+        # Slot 0 of each categorical field is "any value without a dummy column"
+        self.categories = {field: list(values) for field, values in categories.items()}
+        self.top_indices = top_indices
+        self.confidences = confidences
+        self.n_classes = int(n_classes)
+        self.top_k = top_indices.shape[1]
+
+        self._numeric = []
+        for field, (start, stop, step) in self.axes.items():
+            count = len(_axis_points(start, stop, step))
+            self._numeric.append((field, start, step, count, field in EXACT_FIELDS))
+        self._slots = {
+            field: {value: slot for slot, value in enumerate(values) if slot > 0}
+            for field, values in self.categories.items()
+        }
+        self.shape = tuple(count for _, _, _, count, _ in self._numeric) + tuple(
+            len(values) for values in self.categories.values()
+        )
+        self._strides = np.cumprod((1,) + self.shape[:0:-1])[::-1].tolist()
+        if len(self.top_indices) != int(np.prod(self.shape)):
+            raise ValueError(f'Grid has {len(self.top_indices)} cells, expected {int(np.prod(self.shape))}')
+
+    @classmethod
+    def build(cls, predictor, training_columns, axes=None, top_k=4, chunk_size=BUILD_CHUNK_SIZE):
+        """Score predictor on every grid cell and keep the top_k classes of each."""
+        axes = dict(DEFAULT_AXES if axes is None else axes)
+        n_classes = len(predictor.classes_)
+        if not 1 <= top_k <= n_classes:
+            raise ValueError(f'top_k must be between 1 and {n_classes}, got {top_k}')
+        missing = [field for field in NUMERIC_FIELDS if field not in axes]
+        if missing:
+            raise ValueError(f'Grid axes missing for {missing}')
+
+        categories = {}
+        for field in CATEGORICAL_FIELDS:
+            prefix = field + '_'
+            categories[field] = [None] + [column[len(prefix):] for column in training_columns
+                                          if column.startswith(prefix)]
+
+        points = [_axis_points(*axes[field]) for field in axes]
+        shape = tuple(len(p) for p in points) + tuple(len(values) for values in categories.values())
+        n_cells = int(np.prod(shape))
+
+        columns = list(training_columns)
+        encoder = FeatureEncoder(columns)
+        index_dtype = np.uint8 if n_classes <= 256 else np.uint16
+        top_indices = np.empty((n_cells, top_k), dtype=index_dtype)
+        confidences = np.empty((n_cells, top_k), dtype=np.float16)
+
+        for start in range(0, n_cells, chunk_size):
+            cells = np.arange(start, min(start + chunk_size, n_cells))
+            coordinates = np.unravel_index(cells, shape)
+            X = np.zeros((len(cells), encoder.n_features), dtype=np.float64)
+            values = {field: p[coordinates[i]] for i, (field, p) in enumerate(zip(axes, points))}
+            if 'Weight (kg)' in values and 'Height (m)' in values:
+                values['BMI'] = values['Weight (kg)'] / values['Height (m)'] ** 2
+            for field, column_values in values.items():
+                if field in columns:
+                    X[:, columns.index(field)] = column_values
+            for offset, (field, slots) in enumerate(categories.items()):
+                coordinate = coordinates[len(points) + offset]
+                for slot, value in enumerate(slots):
+                    if slot > 0:
+                        X[:, columns.index(f'{field}_{value}')] = coordinate == slot
+
+            probabilities = predictor.predict_proba(X)
+            top = top_k_indices(probabilities, top_k)
+            top_indices[cells] = top
+            confidences[cells] = np.take_along_axis(probabilities, top, axis=1)
+
+        return cls(axes, categories, top_indices, confidences, n_classes)
+
+    def __len__(self):
+        return len(self.top_indices)
+
+    @property
+    def nbytes(self):
+        return self.top_indices.nbytes + self.confidences.nbytes
+
+    def cell(self, feature_data):
+        """Flat cell index for a build_features() row, or None if it is outside the grid."""
+        cell = 0
+        for (field, start, step, count, exact), stride in zip(self._numeric, self._strides):
+            position = (feature_data[field] - start) / step
+            index = int(round(position))
+            if not 0 <= index < count or (exact and abs(position - index) > 1e-9):
+                return None
+            cell += index * stride
+        for (field, slots), stride in zip(self._slots.items(), self._strides[len(self._numeric):]):
+            value = feature_data[field]
+            cell += slots.get(None if value is None else str(value), 0) * stride
+        return cell
+
+    def lookup(self, feature_data, k):
+        """
+        (top_indices, probabilities) for the profile's cell, or None when the
+        profile is outside the grid or k exceeds the stored top_k.
+
+        probabilities holds the stored confidences at the top classes and 0
+        elsewhere, so it can stand in for a predict_proba row.
+        """
+        if k > self.top_k:
+            return None
+        cell = self.cell(feature_data)
+        if cell is None:
+            return None
+        top_indices = self.top_indices[cell, :k].astype(np.intp)
+        probabilities = np.zeros(self.n_classes)
+        probabilities[top_indices] = self.confidences[cell, :k]
+        return top_indices, probabilities
+
+    def arrays(self):
+        return {'top_indices': self.top_indices, 'confidences': self.confidences}
+
+    def settings(self):
+        return {
+            'axes': {field: list(spec) for field, spec in self.axes.items()},
+            'categories': self.categories,
+            'n_classes': self.n_classes
+        }
+
+    def describe(self):
+        return {'cells': len(self), 'top_k': self.top_k, 'bytes': self.nbytes}
+
+
+def grid_agreement(grid, predictor, training_columns, feature_rows, k=None):
+    """
+    Compare grid answers with live inference for a list of build_features() rows.
+
+    Returns the fraction of rows inside the grid and, for those rows, how
+    often the top-1 class matches, the mean overlap of the top-k sets, how
+    often the top-k lists are identical and the mean absolute difference
+    between stored and live confidences of the live top-k classes.
+    """
+    k = k or grid.top_k
+    answers = [(row, grid.lookup(row, k)) for row in feature_rows]
+    covered = [(row, answer) for row, answer in answers if answer is not None]
+    report = {'rows': len(feature_rows), 'coverage': len(covered) / len(feature_rows) if feature_rows else 0.0}
+    if not covered:
+        return report
+
+    live = predictor.predict_proba(FeatureEncoder(training_columns).transform([row for row, _ in covered]))
+    live_top = top_k_indices(live, k)
+    grid_top = np.array([answer[0] for _, answer in covered])
+    grid_probabilities = np.array([answer[1] for _, answer in covered])
+
+    report['top1_agreement'] = float(np.mean(grid_top[:, 0] == live_top[:, 0]))
+    report['topk_overlap'] = float(np.mean([len(set(g) & set(l)) / k for g, l in zip(grid_top, live_top)]))
+    report['topk_exact'] = float(np.mean(np.all(grid_top == live_top, axis=1)))
+    # Confidence error on the live top-k (a class missing from the grid's list counts as 0)
+    report['confidence_mae'] = float(np.mean(np.abs(
+        np.take_along_axis(grid_probabilities, live_top, axis=1) - np.take_along_axis(live, live_top, axis=1)
+    )))
+    return report
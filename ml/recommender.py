@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+recommender.py
+Turns model probabilities into recommendation responses.
+
+Shared by the API (app.py) and the offline bulk scorer (score_bulk.py) so
+both produce identical results for the same profile and artifact set:
+- build_recommendation()  response body for one scored profile
+- grid_answer()           top-k from the precomputed recommendation grid
+- parse_model_variant()   which model variant ('fast' or 'full') scores a request
+- shard_for()             the per-Workout_Type model shard that scores a profile
+- cache_key()             response cache key of a profile
+- score_profiles()        validate, encode and score a list of profiles with
+                          one predict_proba call per shard, with a per-profile
+                          error entry for invalid input; /predict/batch adds
+                          its response cache, error counters and stage timer
+
+Usage:
+    results = score_profiles(artifacts, profiles, num_recommendations=4)
+    results = score_profiles(artifacts, profiles, 4, 'fast', cache=response_cache, timer=timer)
+"""
+
+from artifacts import MODEL_VARIANTS
+from features import build_features
+from metrics import NULL_TIMER
+from model_shards import SHARD_COLUMN
+from ranking import top_k_indices
+
+# Number of recommendations returned unless the request sets num_recommendations
+DEFAULT_NUM_RECOMMENDATIONS = 4
+
+# Details returned for a predicted exercise missing from the knowledge base
+MISSING_EXERCISE_DETAILS = {
+    'sets': None,
+    'reps': None,
+    'calories_per_30min': None,
+    'benefit': 'N/A',
+    'equipment_needed': 'N/A',
+    'target_muscle_group': 'N/A',
+    'difficulty_level': 'N/A'
+}
+
+
+def predict_probabilities(artifacts, X, variant=None):
+    """Class probabilities for an encoded feature matrix in training_columns order."""
+    # Model shards only have the full model
+    return artifacts.variants.get(variant or artifacts.default_variant, artifacts.predictor).predict_proba(X)
+
+
+def shard_for(artifacts, profile):
+    """
+    (artifacts, shard): the model shard for the profile's Workout_Type and its
+    name, or the artifacts themselves and None when they have no shards, no
+    shard matches or the shard fails to load.
+    """
+    if artifacts.shards is None or not isinstance(profile, dict):
+        return artifacts, None
+    name = artifacts.shards.route(profile.get(SHARD_COLUMN))
+    shard = artifacts.shards.get(name) if name is not None else None
+    return (shard, name) if shard is not None else (artifacts, None)
+
+
+def shard_key(artifacts, profile):
+    """Response cache key part for the shard a profile is routed to: its Workout_Type when there are shards."""
+    if artifacts.shards is None or profile.get(SHARD_COLUMN) is None:
+        return None
+    return str(profile[SHARD_COLUMN]).strip().lower()
+
+
+def cache_key(artifacts, profile, num_recommendations, variant):
+    """
+    (key, profile) for the response cache: the quantized profile (see
+    ProfileKeyBuilder.canonicalize) plus everything else that changes the
+    answer. Raises KeyError/ValueError/TypeError for bad input.
+    """
+    key, profile = artifacts.profile_keys.canonicalize(profile)
+    return key + (num_recommendations, variant, shard_key(artifacts, profile)), profile
+
+
+def recommendation_count(artifacts, num_recommendations):
+    """Recommendations a model can return: a shard may know fewer exercises than the global model."""
+    return min(num_recommendations, len(artifacts.classes))
+
+
+def grid_answer(artifacts, feature_data, num_recommendations, variant=None):
+    """
+    (top_indices, probabilities) from the artifacts' grid, or None to score
+    the profile live. The grid holds the full model's answers, so requests
+    for the fast variant are always scored live.
+    """
+    if artifacts.grid is None or (variant or artifacts.default_variant) != 'full':
+        return None
+    return artifacts.grid.lookup(feature_data, num_recommendations)
+
+
+def parse_num_recommendations(artifacts, input_data):
+    """Read and validate the optional num_recommendations field (1..number of classes)."""
+    value = input_data.get('num_recommendations', DEFAULT_NUM_RECOMMENDATIONS)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('num_recommendations must be an integer')
+    if not 1 <= value <= len(artifacts.classes):
+        raise ValueError(f'num_recommendations must be between 1 and {len(artifacts.classes)}')
+    return value
+
+
+def parse_model_variant(artifacts, input_data):
+    """
+    Read and validate the optional model_variant field ('fast' or 'full',
+    default: the artifacts' default variant). 'fast' is served by the full
+    model when the artifacts have no fast variant.
+    """
+    value = input_data.get('model_variant', artifacts.default_variant)
+    if value not in MODEL_VARIANTS:
+        raise ValueError(f'model_variant must be one of {", ".join(MODEL_VARIANTS)}')
+    return value if value in artifacts.variants else 'full'
+
+
+def exercise_recommendations_for(artifacts, probabilities, top_indices, experience_level):
+    """Build the exercise recommendations for one row of probabilities."""
+    exercise_recommendations = []
+
+    for class_index in top_indices:
+        exercise_name = artifacts.classes[class_index]
+        confidence = probabilities[class_index]
+
+        # Smart lookup by exercise name AND experience level, falling back to any level
+        record = artifacts.exercise_index.lookup(exercise_name, experience_level)
+        if record is None:
+            # Fallback if no knowledge base entry (shouldn't happen with proper training)
+            record = MISSING_EXERCISE_DETAILS
+
+        exercise_details = {
+            'exercise_name': exercise_name,
+            'confidence': float(confidence)
+        }
+        exercise_details.update(record)
+        exercise_recommendations.append(exercise_details)
+
+    return exercise_recommendations
+
+
+def diet_suggestion_for(artifacts, diet_type, meal_type):
+    """Look up the nutrition averages for a diet/meal combination."""
+    suggestion = artifacts.diet_index.lookup(diet_type, meal_type)
+    if suggestion is not None:
+        return suggestion
+
+    # No match found - return default message
+    return {
+        'diet_type': diet_type,
+        'meal_type': meal_type,
+        'message': 'No specific diet suggestion available for this combination'
+    }
+
+
+def build_recommendation(artifacts, input_data, feature_data, bmi, probabilities, top_indices):
+    """Assemble the response body for one scored profile."""
+    # Extract diet preferences
+    diet_type = input_data.get('diet_type', 'Balanced')
+    meal_type = input_data.get('meal_type', 'Lunch')
+
+    return {
+        'success': True,
+        'bmi': round(bmi, 2),
+        'exercise_recommendations': exercise_recommendations_for(
+            artifacts, probabilities, top_indices, feature_data['Experience_Level']
+        ),
+        'diet_suggestion': diet_suggestion_for(artifacts, diet_type, meal_type)
+    }
+
+
+def score_profiles(artifacts, profiles, num_recommendations=DEFAULT_NUM_RECOMMENDATIONS, variant=None,
+                   cache=None, on_error=None, timer=NULL_TIMER):
+    """
+    Score a list of profiles, returning one result per profile in input order.
+
+    A profile that fails validation gets {'success': False, 'error': ...}
+    (the same messages /predict/batch returns) instead of failing the list,
+    and on_error, if given, is called with 'missing_field' or 'invalid_input'.
+    Profiles inside the grid are answered from it; the rest are scored by the
+    shard of their Workout_Type (see shard_for), with one predict_proba call
+    per shard. With a cache (a ResponseCache), cached profiles are not
+    rescored and new results are stored under cache_key. timer marks the
+    features, predict and lookup stages of each shard.
+    """
+    results = [None] * len(profiles)
+    keys = [None] * len(profiles)
+    use_cache = cache is not None and cache.enabled
+
+    def answer(index, result):
+        results[index] = result
+        if keys[index] is not None:
+            cache.put(keys[index], result, version=artifacts.version)
+
+    # Validate every profile up front, answering cached and in-grid ones and
+    # grouping the rest by the shard that scores them
+    groups = {}
+    for index, profile in enumerate(profiles):
+        try:
+            if not isinstance(profile, dict):
+                raise TypeError('profile must be a JSON object')
+            if use_cache:
+                keys[index], profile = cache_key(artifacts, profile, num_recommendations, variant)
+                results[index] = cache.get(keys[index])
+                if results[index] is not None:
+                    continue
+            feature_data, bmi = build_features(profile)
+            scorer, shard = shard_for(artifacts, profile)
+            grid = grid_answer(scorer, feature_data, num_recommendations, variant)
+            if grid is not None:
+                top_indices, probabilities = grid
+                answer(index, build_recommendation(scorer, profile, feature_data, bmi, probabilities, top_indices))
+                continue
+            groups.setdefault(shard, (scorer, []))[1].append((index, profile, feature_data, bmi))
+        except KeyError as e:
+            if on_error is not None:
+                on_error('missing_field')
+            results[index] = {'success': False, 'error': f'Missing required field: {str(e)}'}
+        except (TypeError, ValueError) as e:
+            if on_error is not None:
+                on_error('invalid_input')
+            results[index] = {'success': False, 'error': f'Invalid input: {str(e)}'}
+
+    if not groups:
+        timer.mark('features')
+    for scorer, valid in groups.values():
+        input_encoded = scorer.feature_encoder.transform([item[2] for item in valid])
+        timer.mark('features')
+        probabilities = predict_probabilities(scorer, input_encoded, variant)
+        timer.mark('predict')
+        top_indices = top_k_indices(probabilities, recommendation_count(scorer, num_recommendations))
+        for (index, profile, feature_data, bmi), row, top in zip(valid, probabilities, top_indices):
+            answer(index, build_recommendation(scorer, profile, feature_data, bmi, row, top))
+        timer.mark('lookup')
+    return results
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+response_cache.py
+In-process cache of /predict responses keyed on a quantized user profile.
+
+Profiles change rarely but the dashboard calls /predict on every load, so
+identical (or nearly identical) profiles are answered from memory:
+- ProfileKeyBuilder  canonicalizes a profile into a hashable key derived from
+                     training_columns, quantizing weight, height and fat %
+- ResponseCache      bounded LRU with TTL expiry and hit/miss counters,
+                     cleared whenever the loaded artifact version changes
+- artifact_fingerprint()  version string for a set of artifact files
+
+A response is always computed from the quantized profile, so every request
+that maps to a key gets the same answer regardless of which one filled it.
+
+Usage:
+    key_builder = ProfileKeyBuilder(training_columns)
+    cache = ResponseCache(max_size=10000, ttl=3600)
+    key, profile = key_builder.canonicalize(input_data)
+    response = cache.get(key)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from features import CATEGORICAL_FIELDS, NUMERIC_FIELDS
+
+# Default quantization step per continuous field
+DEFAULT_STEPS = {
+    'Weight (kg)': 0.1,
+    'Height (m)': 0.01,
+    'Fat_Percentage': 0.1
+}
+
+# Request fields outside the model features that still shape the response
+EXTRA_KEY_FIELDS = [
+    ('diet_type', 'Balanced'),
+    ('meal_type', 'Lunch')
+]
+
+
+def quantize(value, step):
+    """Snap value to the nearest multiple of step (rounded to drop float noise)."""
+    return round(round(value / step) * step, 10)
+
+
+def artifact_fingerprint(paths):
+    """Short version string from the size and mtime of each artifact file."""
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f'{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()[:12]
+
+
+class ProfileKeyBuilder:
+    """
+    Builds cache keys from the model's input fields as named by training_columns.
+
+    Numeric fields are read in training order (BMI is left out because it is
+    derived from weight and height). A categorical value only matters if it
+    has a dummy column, so unseen categories share one key slot, just as they
+    share an all-zero encoding.
+    """
+
+    def __init__(self, training_columns, steps=None):
+        self.steps = dict(DEFAULT_STEPS, **(steps or {}))
+        self._numeric = [column for column in training_columns if column in NUMERIC_FIELDS]
+        self._categories = {
+            field: {column[len(field) + 1:] for column in training_columns if column.startswith(field + '_')}
+            for field in CATEGORICAL_FIELDS
+        }
+
+    def canonicalize(self, input_data):
+        """
+        Return (key, profile) where profile is input_data with quantized values.
+
+        Raises KeyError/ValueError/TypeError like build_features for bad input.
+        """
+        profile = dict(input_data)
+        for field in NUMERIC_FIELDS:
+            value = float(input_data[field])
+            step = self.steps.get(field)
+            profile[field] = quantize(value, step) if step else value
+
+        key = [profile[column] for column in self._numeric]
+        for field, categories in self._categories.items():
+            value = input_data[field]
+            key.append(value if str(value) in categories else None)
+        for field, default in EXTRA_KEY_FIELDS:
+            key.append(input_data.get(field, default))
+        return tuple(key), profile
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_size=10000, ttl=3600, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        """Cached value for key, or None on a miss or an expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version=None):
+        """
+        Store value for key. A value computed from an artifact version other
+        than the current one (a request that overlapped a reload) is dropped.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def set_version(self, version):
+        """Bind the cache to an artifact version, dropping entries from any other."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'version': self.version
+            }
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+retrain_incremental.py
+Incremental retraining from workout logs appended to the training CSV.
+
+train_model.py saves training_state.joblib next to the other artifacts: how
+far into the CSV it read (see dataset.data_checkpoint) and the running
+knowledge base aggregates (see knowledge_aggregates.py). This script reads
+only the rows appended since then and:
+- continues boosting the existing model on them for --rounds rounds
+  (LightGBM init_model), keeping its classes and parameters but capping leaf
+  outputs (CONTINUE_PARAMS); a run that raises the log loss on the new rows
+  stops without writing anything
+- merges them into the knowledge base aggregates; the resulting knowledge
+  bases are identical to a full groupby over every row
+- writes the same artifacts as train_model.py (model, compiled model,
+  knowledge bases, model_bundle/), so the API and its hot reload pick them up
+
+Rows for an exercise the model has no class for still update the knowledge
+base but are not boosted on; a full train_model.py run adds new classes.
+A recommendation grid or fast model variant in the old bundle was computed
+for the old model and is dropped; rerun train_model.py with PRECOMPUTE_GRID=1
+or FAST_MODEL=1 to rebuild them. Per-Workout_Type model shards
+(model_shards/) are not retrained either; they are removed so that every
+request is scored by the updated global model until train_model.py is rerun
+with WORKOUT_SHARDS=1.
+
+--verify also rebuilds both knowledge bases from the whole CSV with pandas
+groupby and stops without writing anything if they differ.
+
+Usage:
+    python3 retrain_incremental.py
+    python3 retrain_incremental.py --data Final_data.csv --rounds 20 --verify
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from sklearn.metrics import log_loss
+
+from artifact_bundle import remove_published, write_bundle
+from artifacts import (BUNDLE_DIR, COMPILED_MODEL_FILE, DIET_KNOWLEDGE_BASE_FILE, KNOWLEDGE_BASE_FILE,
+                       MODEL_FILE, TRAINING_COLUMNS_FILE, TRAINING_STATE_FILE, BoosterPredictor)
+from dataset import FEATURE_COLUMNS, TARGET_COLUMN, load_training_data, read_appended_rows
+from knowledge_aggregates import KNOWLEDGE_COLUMNS, knowledge_bases
+from model_shards import SHARDS_DIR
+from tree_engine import CompiledForest
+
+# Overrides for the added rounds. A model fitted for many rounds is confident
+# on most rows, so their hessians are near zero and uncapped Newton steps on
+# new rows produce huge leaf values (log loss 4.2 -> 23 on the sample data);
+# capping each leaf output keeps the update small.
+CONTINUE_PARAMS = {'max_delta_step': 0.7}
+
+
+def encode(rows, training_columns):
+    """One-hot encode rows into the training column layout, as train_model.py does."""
+    encoded = pd.get_dummies(rows[FEATURE_COLUMNS], columns=['Gender'])
+    return encoded.reindex(columns=training_columns, fill_value=0).to_numpy(dtype=np.float64)
+
+
+def probabilities(model, X):
+    return BoosterPredictor(model.booster_, model.classes_).predict_proba(X)
+
+
+def continue_boosting(model, X, labels, rounds):
+    """A new classifier with rounds more trees fitted to (X, labels) on top of model's booster."""
+    params = model.get_params()
+    params.update(n_estimators=rounds, **CONTINUE_PARAMS)
+    # The classifier takes its classes from y, so classes the new rows lack get
+    # one zero-weight row each: classes_ and the booster's class order stay as they were
+    missing = np.setdiff1d(np.arange(len(model.classes_)), labels)
+    X_fit = np.vstack([X, np.repeat(X[:1], len(missing), axis=0)])
+    y_fit = model.classes_[np.concatenate([labels, missing])]
+    weights = np.concatenate([np.ones(len(labels)), np.zeros(len(missing))])
+    return lgb.LGBMClassifier(**params).fit(X_fit, y_fit, sample_weight=weights, init_model=model.booster_)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Retrain from rows appended to the training CSV')
+    parser.add_argument('--data', default='Final_data.csv', help='Training CSV (default: Final_data.csv)')
+    parser.add_argument('--artifact-dir', default=os.environ.get('ARTIFACT_DIR', '.'))
+    parser.add_argument('--rounds', type=int, default=int(os.environ.get('INCREMENTAL_ROUNDS', 20)),
+                        help='Boosting rounds added on the new rows (default: 20)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Check the knowledge bases against a full rebuild from the whole CSV')
+    args = parser.parse_args()
+
+    def path(name):
+        return os.path.join(args.artifact_dir, name)
+
+    print("=" * 60)
+    print(f"Incremental retraining from {args.data}")
+    print("=" * 60)
+
+    if not os.path.exists(path(TRAINING_STATE_FILE)):
+        print(f"❌ {path(TRAINING_STATE_FILE)} not found; run train_model.py first")
+        sys.exit(1)
+    state = joblib.load(path(TRAINING_STATE_FILE))
+
+    started = time.perf_counter()
+    try:
+        new_rows, checkpoint = read_appended_rows(args.data, state['data'])
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if new_rows is None:
+        print(f"✓ No new rows since row {state['data']['rows']}; artifacts unchanged")
+        return
+    print(f"✓ Read {len(new_rows)} new rows (rows {state['data']['rows'] + 1}-{checkpoint['rows']}) "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    # Knowledge bases: merge the new rows into the running aggregates
+    aggregates = state['aggregates']
+    aggregates.update(new_rows)
+    knowledge_base = aggregates.exercise_kb()
+    diet_knowledge_base = aggregates.diet_kb()
+    print(f"✓ Knowledge bases updated: {len(knowledge_base)} exercise-level and "
+          f"{len(diet_knowledge_base)} diet-meal combinations")
+
+    if args.verify:
+        full, _ = load_training_data(args.data, columns=KNOWLEDGE_COLUMNS, end=checkpoint['offset'])
+        expected_kb, expected_diet_kb = knowledge_bases(full)
+        if not (knowledge_base.equals(expected_kb) and diet_knowledge_base.equals(expected_diet_kb)):
+            print("❌ Incremental knowledge bases differ from a full rebuild; nothing written")
+            sys.exit(1)
+        print(f"✓ Knowledge bases identical to a full rebuild over {len(full)} rows")
+
+    # Model: continue boosting on the rows whose exercise is a known class
+    model = joblib.load(path(MODEL_FILE))
+    training_columns = joblib.load(path(TRAINING_COLUMNS_FILE))
+    class_index = {name: i for i, name in enumerate(model.classes_)}
+    known = new_rows[TARGET_COLUMN].astype(object).map(class_index).notna().to_numpy()
+    unknown = sorted(new_rows.loc[~known, TARGET_COLUMN].astype(object).unique())
+    if unknown:
+        print(f"  - {(~known).sum()} rows for exercises the model does not know ({', '.join(unknown[:5])}"
+              f"{', ...' if len(unknown) > 5 else ''}) only update the knowledge base")
+
+    if known.any():
+        X = encode(new_rows[known], training_columns)
+        labels = new_rows.loc[known, TARGET_COLUMN].astype(object).map(class_index).to_numpy(dtype=np.int64)
+        loss_before = log_loss(labels, probabilities(model, X), labels=range(len(model.classes_)))
+        started = time.perf_counter()
+        model = continue_boosting(model, X, labels, args.rounds)
+        boosted = probabilities(model, X)
+        loss_after = log_loss(labels, boosted, labels=range(len(model.classes_)))
+        print(f"✓ Added {args.rounds} boosting rounds on {known.sum()} rows in {time.perf_counter() - started:.2f}s "
+              f"(log loss on them {loss_before:.4f} -> {loss_after:.4f}, "
+              f"accuracy {np.mean(boosted.argmax(axis=1) == labels):.1%})")
+        if loss_after > loss_before:
+            print("❌ The added rounds made the model worse on the new rows; nothing written. "
+                  "Retrain with train_model.py")
+            sys.exit(1)
+
+    # Check the compiled export before writing anything
+    compiled_model = CompiledForest.from_booster(model.booster_, model.classes_)
+    X_check = encode(new_rows.head(1000), training_columns)
+    max_diff = np.abs(compiled_model.predict_proba(X_check) - probabilities(model, X_check)).max()
+    if max_diff > 1e-9:
+        print(f"❌ Compiled model differs from LightGBM (max probability difference {max_diff:.2e}); nothing written")
+        sys.exit(1)
+
+    # Same artifacts as train_model.py
+    joblib.dump(model, path(MODEL_FILE))
+    print(f"✓ Saved: {MODEL_FILE}")
+    compiled_model.save(path(COMPILED_MODEL_FILE))
+    print(f"✓ Saved: {COMPILED_MODEL_FILE} ({compiled_model.n_trees} trees)")
+
+    joblib.dump(knowledge_base, path(KNOWLEDGE_BASE_FILE))
+    joblib.dump(diet_knowledge_base, path(DIET_KNOWLEDGE_BASE_FILE))
+    print(f"✓ Saved: {KNOWLEDGE_BASE_FILE}, {DIET_KNOWLEDGE_BASE_FILE}")
+
+    # Removed before the bundle changes, so a reload never pairs old shards with the new model
+    if os.path.lexists(path(SHARDS_DIR)):
+        remove_published(path(SHARDS_DIR))
+        print(f"✓ Removed: {SHARDS_DIR}/ (trained for the old model; rerun train_model.py with WORKOUT_SHARDS=1)")
+
+    bundle_version = write_bundle(path(BUNDLE_DIR), compiled_model, training_columns,
+                                  knowledge_base, diet_knowledge_base, booster=model.booster_)
+    print(f"✓ Saved: {BUNDLE_DIR}/ (version {bundle_version}, without a recommendation grid or fast variant)")
+
+    # Written last: a failed run above leaves the old state to retry from
+    joblib.dump({'data': checkpoint, 'aggregates': aggregates}, path(TRAINING_STATE_FILE))
+    print(f"✓ Saved: {TRAINING_STATE_FILE} (checkpoint at row {checkpoint['rows']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+score_bulk.py
+Offline bulk scoring of user profiles into NDJSON recommendations.
+
+Backfills recommendations without HTTP round-trips: the input file is read
+in fixed-size chunks, each chunk is scored in a worker process with one
+predict_proba call (artifacts are loaded once per worker), and results are
+written in input order, one JSON object per line. At most
+2 x --workers chunks are in flight, so memory stays bounded however large
+the input is.
+
+Input is NDJSON (one profile object per line, same fields as /predict) or
+CSV with the field names as header. Each output line is the /predict
+response for that profile plus its input "row" number (and the --id-field
+value if present); invalid profiles get a {"success": false, "error": ...}
+line instead of stopping the run. Profiles are scored with --model-variant,
+which defaults to MODEL_VARIANT as in the API, so results match /predict
+for the same bundle.
+
+Usage:
+    python3 score_bulk.py profiles.ndjson recommendations.ndjson
+    python3 score_bulk.py users.csv - --workers 8 --chunk-size 2000
+    python3 score_bulk.py users.csv out.ndjson --model-variant full
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from artifacts import MODEL_VARIANTS, load_artifacts
+from recommender import DEFAULT_NUM_RECOMMENDATIONS, score_profiles
+
+# Artifact set of this worker process, loaded once by init_worker()
+worker_artifacts = None
+
+
+def init_worker(directory, engine, artifact_format, use_grid=True, model_variant='full'):
+    """Load the artifacts once per worker process."""
+    global worker_artifacts
+    # One scoring thread per process: the pool already uses every core
+    os.environ.setdefault('OMP_NUM_THREADS', '1')
+    worker_artifacts = load_artifacts(directory, engine=engine, artifact_format=artifact_format, use_grid=use_grid,
+                                      model_variant=model_variant)
+
+
+def class_count():
+    """Number of exercise classes in this worker's artifacts."""
+    return len(worker_artifacts.classes)
+
+
+def read_records(path):
+    """
+    Yield (profile, error) per input record; error is set (and profile None)
+    when the record could not be parsed.
+    """
+    stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if path.lower().endswith('.csv'):
+            for row in csv.DictReader(stream):
+                # Empty cells mean "not provided", so optional fields get their defaults
+                yield {field: value for field, value in row.items() if value not in ('', None)}, None
+        else:
+            for line in stream:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line), None
+                except ValueError as e:
+                    yield None, f'Invalid JSON: {e}'
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def read_chunks(path, chunk_size):
+    chunk = []
+    for record in read_records(path):
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def score_chunk(chunk, first_row, num_recommendations, id_field, artifacts=None):
+    """Score one chunk; returns (output lines serialized in the worker, invalid count)."""
+    artifacts = artifacts or worker_artifacts
+    profiles = [profile for profile, error in chunk if error is None]
+    scored = iter(score_profiles(artifacts, profiles, num_recommendations))
+
+    lines = []
+    invalid = 0
+    for offset, (profile, error) in enumerate(chunk):
+        output = {'row': first_row + offset}
+        if isinstance(profile, dict) and id_field in profile:
+            output[id_field] = profile[id_field]
+        output.update(next(scored) if error is None else {'success': False, 'error': error})
+        invalid += not output['success']
+        lines.append(json.dumps(output))
+    return lines, invalid
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a file of user profiles into NDJSON recommendations')
+    parser.add_argument('input', help='NDJSON or .csv file of profiles (- for NDJSON on stdin)')
+    parser.add_argument('output', help='NDJSON output file (- for stdout)')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Profiles per chunk (default: 1000)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Scoring processes (default: CPU count; 0 scores in this process)')
+    parser.add_argument('--num-recommendations', type=int, default=DEFAULT_NUM_RECOMMENDATIONS,
+                        help=f'Exercises per profile (default: {DEFAULT_NUM_RECOMMENDATIONS})')
+    parser.add_argument('--id-field', default='user_id', help='Input field copied to each output line (default: user_id)')
+    parser.add_argument('--artifact-dir', default=os.environ.get('ARTIFACT_DIR', '.'))
+    parser.add_argument('--engine', default=os.environ.get('INFERENCE_ENGINE', 'booster'), choices=['booster', 'compiled'])
+    parser.add_argument('--artifact-format', default=os.environ.get('ARTIFACT_FORMAT', 'auto'),
+                        choices=['auto', 'bundle', 'joblib'])
+    parser.add_argument('--no-grid', action='store_true', default=os.environ.get('RECOMMENDATION_GRID', '1') == '0',
+                        help="Score every profile live instead of using the bundle's recommendation grid")
+    parser.add_argument('--model-variant', default=os.environ.get('MODEL_VARIANT', 'fast'), choices=MODEL_VARIANTS,
+                        help="Model variant, as the API's MODEL_VARIANT ('fast' uses the full model "
+                             "when the bundle has no fast variant; default: fast)")
+    args = parser.parse_args()
+
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
+    if args.num_recommendations < 1:
+        parser.error('--num-recommendations must be at least 1')
+
+    log = sys.stderr
+    print("=" * 60, file=log)
+    print(f"Bulk scoring {args.input} -> {args.output}", file=log)
+    print(f"  {args.workers or 'in-process'} workers, chunks of {args.chunk_size}, "
+          f"{args.engine} engine, {args.model_variant} model", file=log)
+    print("=" * 60, file=log)
+
+    # --num-recommendations is checked against the loaded artifacts (here or
+    # in a worker) before any output is written, like /predict checks it
+    pool = None
+    if args.workers == 0:
+        artifacts = load_artifacts(args.artifact_dir, engine=args.engine, artifact_format=args.artifact_format,
+                                   use_grid=not args.no_grid, model_variant=args.model_variant)
+        classes = len(artifacts.classes)
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=args.workers, initializer=init_worker,
+            initargs=(args.artifact_dir, args.engine, args.artifact_format, not args.no_grid, args.model_variant)
+        )
+        classes = pool.submit(class_count).result()
+    if args.num_recommendations > classes:
+        if pool is not None:
+            pool.shutdown()
+        parser.error(f'--num-recommendations must be between 1 and {classes}')
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    started = time.perf_counter()
+    rows = 0
+    failed = 0
+
+    def write(result):
+        nonlocal rows, failed
+        lines, invalid = result
+        output.write('\n'.join(lines) + '\n')
+        rows += len(lines)
+        failed += invalid
+
+    try:
+        if pool is None:
+            for chunk in read_chunks(args.input, args.chunk_size):
+                write(score_chunk(chunk, rows, args.num_recommendations, args.id_field, artifacts))
+        else:
+            with pool:
+                pending = deque()
+                next_row = 0
+                for chunk in read_chunks(args.input, args.chunk_size):
+                    pending.append(pool.submit(score_chunk, chunk, next_row, args.num_recommendations, args.id_field))
+                    next_row += len(chunk)
+                    # Bounded read-ahead: wait for the oldest chunk before reading more
+                    if len(pending) >= 2 * args.workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ Scored {rows} profiles ({failed} invalid) in {elapsed:.2f}s "
+          f"- {rows / elapsed if elapsed else 0:,.0f} rows/s", file=log)
+
+
+if __name__ == '__main__':
+    main()
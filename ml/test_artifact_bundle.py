@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+test_artifact_bundle.py
+Round-trip tests for the memory-mapped artifact bundle.
+
+A bundle is written from the shipped knowledge bases and a small synthetic
+LightGBM model; everything read back must match the in-memory indexes and
+the compiled forest it was written from.
+
+Usage:
+    python3 -m pytest test_artifact_bundle.py
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+from artifact_bundle import ArtifactBundle, is_bundle, remove_published, write_bundle
+from artifacts import load_artifacts
+from conftest import TRAINING_COLUMNS
+from knowledge_index import DietIndex, ExerciseIndex
+from tree_engine import CompiledForest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope='module')
+def exercise_kb():
+    return joblib.load(os.path.join(HERE, 'knowledge_base.joblib'))
+
+
+@pytest.fixture(scope='module')
+def diet_kb():
+    return joblib.load(os.path.join(HERE, 'diet_knowledge_base.joblib'))
+
+
+@pytest.fixture(scope='module')
+def model(fit_classifier):
+    return fit_classifier(['Squats', 'Push-ups', 'Plank', 'Lunges'], n_estimators=20)
+
+
+@pytest.fixture(scope='module')
+def bundle_dir(tmp_path_factory, model, exercise_kb, diet_kb):
+    directory = str(tmp_path_factory.mktemp('artifacts') / 'model_bundle')
+    forest = CompiledForest.from_booster(model.booster_, model.classes_)
+    write_bundle(directory, forest, TRAINING_COLUMNS, exercise_kb, diet_kb, booster=model.booster_)
+    return directory
+
+
+def normalized(record):
+    """Missing text values are NaN in the DataFrame indexes and None in the bundle."""
+    if record is None:
+        return None
+    return {field: None if isinstance(value, float) and np.isnan(value) else value
+            for field, value in record.items()}
+
+
+def test_exercise_lookups_match_index(bundle_dir, exercise_kb):
+    expected = ExerciseIndex(exercise_kb)
+    bundle = ArtifactBundle(bundle_dir)
+    levels = sorted(exercise_kb['Experience_Level'].unique()) + [1, 2, 3, 99]
+
+    assert len(bundle.exercise_index) == len(expected)
+    for name in exercise_kb['Name of Exercise'].unique():
+        for level in levels:
+            assert bundle.exercise_index.lookup(name, level) == normalized(expected.lookup(name, level))
+    assert bundle.exercise_index.lookup('Not An Exercise', 1) is None
+
+
+def test_diet_lookups_match_index(bundle_dir, diet_kb):
+    expected = DietIndex(diet_kb)
+    bundle = ArtifactBundle(bundle_dir)
+
+    assert len(bundle.diet_index) == len(expected)
+    for diet_type in diet_kb['diet_type'].unique():
+        for meal_type in diet_kb['meal_type'].unique():
+            assert bundle.diet_index.lookup(diet_type, meal_type) == expected.lookup(diet_type, meal_type)
+    assert bundle.diet_index.lookup('Carnivore', 'Brunch') is None
+
+
+def test_forest_and_booster_match_model(bundle_dir, model):
+    X = np.random.default_rng(1).normal(size=(50, len(TRAINING_COLUMNS)))
+    expected = model.predict_proba(X)
+    parent = os.path.dirname(bundle_dir)
+
+    for engine in ('compiled', 'booster'):
+        artifacts = load_artifacts(parent, engine=engine, artifact_format='bundle')
+        np.testing.assert_allclose(artifacts.predictor.predict_proba(X), expected, rtol=0, atol=1e-9)
+        assert artifacts.classes == model.classes_.tolist()
+        assert artifacts.training_columns == TRAINING_COLUMNS
+        assert artifacts.source == 'bundle'
+
+
+def test_rewrite_replaces_bundle_and_version(bundle_dir, model, exercise_kb, diet_kb):
+    version = ArtifactBundle(bundle_dir).version
+    smaller = lgb.Booster(model_str=model.booster_.model_to_string(num_iteration=5))
+    forest = CompiledForest.from_booster(smaller, model.classes_)
+    directory = bundle_dir + '_rewrite'
+
+    first = write_bundle(directory, forest, TRAINING_COLUMNS, exercise_kb, diet_kb)
+    second = write_bundle(directory, forest, TRAINING_COLUMNS, exercise_kb, diet_kb)
+
+    assert first == second != version
+    assert is_bundle(directory)
+    assert not os.path.exists(directory + '.tmp')
+
+
+def test_rewrite_swaps_a_symlink_and_keeps_the_previous_version(bundle_dir, model, exercise_kb, diet_kb):
+    forest = CompiledForest.from_booster(model.booster_, model.classes_)
+    parent = os.path.dirname(bundle_dir) + '_publish'
+    os.makedirs(parent)
+    directory = os.path.join(parent, 'model_bundle')
+
+    # A plain directory from an older writer becomes the first version
+    shutil.copytree(bundle_dir, directory)
+    opened = ArtifactBundle(directory)
+    write_bundle(directory, forest, TRAINING_COLUMNS, exercise_kb, diet_kb)
+    assert os.readlink(directory) == 'model_bundle.v2'
+
+    write_bundle(directory, forest, TRAINING_COLUMNS, exercise_kb, diet_kb)
+    write_bundle(directory, forest, TRAINING_COLUMNS, exercise_kb, diet_kb)
+    assert os.readlink(directory) == 'model_bundle.v4'
+    assert sorted(os.listdir(parent)) == ['model_bundle', 'model_bundle.v3', 'model_bundle.v4']
+
+    # A bundle opened before keeps reading its deleted, memory-mapped version
+    assert not os.path.exists(os.path.join(parent, 'model_bundle.v1'))
+    assert opened.forest.predict_proba(np.zeros((1, len(TRAINING_COLUMNS)))).shape == (1, len(model.classes_))
+
+    remove_published(directory)
+    assert os.listdir(parent) == []
+
+
+def test_compiled_bundle_path_defers_heavy_imports(bundle_dir):
+    code = (
+        'import sys; from artifacts import load_artifacts; '
+        f'load_artifacts({os.path.dirname(bundle_dir)!r}, engine="compiled", artifact_format="bundle"); '
+        'print(sorted(m for m in ("pandas", "joblib", "sklearn", "lightgbm") if m in sys.modules))'
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+
+
+def test_fast_variant_is_served_by_default_when_present(tmp_path, model, exercise_kb, diet_kb):
+    fast_booster = lgb.Booster(model_str=model.booster_.model_to_string(num_iteration=5))
+    forest = CompiledForest.from_booster(model.booster_, model.classes_)
+    fast = {'forest': CompiledForest.from_booster(fast_booster, model.classes_), 'booster': fast_booster,
+            'report': {'method': 'truncated', 'iterations': 5}}
+    write_bundle(str(tmp_path / 'model_bundle'), forest, TRAINING_COLUMNS, exercise_kb, diet_kb,
+                 booster=model.booster_, fast=fast)
+    X = np.random.default_rng(2).normal(size=(20, len(TRAINING_COLUMNS)))
+
+    for engine in ('compiled', 'booster'):
+        artifacts = load_artifacts(str(tmp_path), engine=engine, artifact_format='bundle', model_variant='fast')
+        assert artifacts.default_variant == 'fast'
+        np.testing.assert_allclose(artifacts.variants['fast'].predict_proba(X),
+                                   model.predict_proba(X, num_iteration=5), rtol=0, atol=1e-9)
+        np.testing.assert_allclose(artifacts.variants['full'].predict_proba(X), model.predict_proba(X),
+                                   rtol=0, atol=1e-9)
+        variants = artifacts.describe()['model_variants']
+        assert variants['fast'] == {'trees': 20, 'default': True, 'method': 'truncated', 'iterations': 5}
+        assert variants['full'] == {'trees': 80, 'default': False}
+
+
+def test_fast_variant_falls_back_to_full(bundle_dir):
+    artifacts = load_artifacts(os.path.dirname(bundle_dir), artifact_format='bundle', model_variant='fast')
+    assert artifacts.default_variant == 'full' and list(artifacts.variants) == ['full']
+    with pytest.raises(ValueError):
+        load_artifacts(os.path.dirname(bundle_dir), artifact_format='bundle', model_variant='tiny')
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+test_artifact_reloader.py
+Tests for hot reloading of the serving artifacts.
+
+The reloader is driven with small stand-in artifact sets and a fingerprint
+the test controls, so swaps, rejections and the watcher's debounce can be
+checked without training a model.
+
+Usage:
+    python3 -m pytest test_artifact_reloader.py
+"""
+
+import threading
+
+import pytest
+
+from artifact_reloader import ArtifactReloader
+
+
+class FakeArtifacts:
+    def __init__(self, version, valid=True):
+        self.version = version
+        self.valid = valid
+
+
+class Files:
+    """The artifact files on disk: what load() would read and their fingerprint."""
+
+    def __init__(self, artifacts):
+        self.artifacts = artifacts
+        self.fingerprint = artifacts.version
+        self.loads = 0
+
+    def write(self, artifacts):
+        self.artifacts = artifacts
+        self.fingerprint = artifacts.version
+
+    def load(self):
+        self.loads += 1
+        return self.artifacts
+
+
+def check_valid(artifacts):
+    if not artifacts.valid:
+        raise ValueError('bad warm-up prediction')
+
+
+@pytest.fixture
+def files():
+    return Files(FakeArtifacts('v1'))
+
+
+def make_reloader(files, **kwargs):
+    return ArtifactReloader(files.load, lambda: files.fingerprint, files.load(),
+                            warm_up=check_valid, **kwargs)
+
+
+def test_reload_swaps_in_new_version(files):
+    swapped = []
+    reloader = make_reloader(files, on_swap=swapped.append)
+    old = reloader.current
+
+    files.write(FakeArtifacts('v2'))
+    assert reloader.reload() == (True, None)
+    assert reloader.current.version == 'v2'
+    assert swapped == [reloader.current]
+    # A request that picked up the old set before the swap still holds it intact
+    assert old.version == 'v1'
+    assert reloader.reloads == 1
+
+
+def test_reload_of_same_version_keeps_current(files):
+    reloader = make_reloader(files)
+    current = reloader.current
+    assert reloader.reload() == (False, None)
+    assert reloader.current is current
+
+
+def test_failed_warm_up_keeps_old_version(files):
+    reloader = make_reloader(files)
+    files.write(FakeArtifacts('v2', valid=False))
+
+    swapped, error = reloader.reload()
+    assert not swapped
+    assert 'bad warm-up prediction' in error
+    assert reloader.current.version == 'v1'
+    assert reloader.failures == 1
+    assert reloader.status()['last_error'] == error
+
+
+def test_failed_load_keeps_old_version(files):
+    def broken_load():
+        raise FileNotFoundError('knowledge_base.joblib')
+
+    reloader = ArtifactReloader(broken_load, lambda: files.fingerprint, files.load())
+    swapped, error = reloader.reload()
+    assert not swapped
+    assert error.startswith('FileNotFoundError')
+    assert reloader.current.version == 'v1'
+
+
+def test_watcher_waits_for_files_to_settle(files):
+    reloader = make_reloader(files)
+
+    # Poll 1 sees the files mid-retrain; nothing is loaded until a poll agrees
+    files.write(FakeArtifacts('v2'))
+    previous = reloader.check(None)
+    assert reloader.current.version == 'v1'
+    files.write(FakeArtifacts('v3'))
+    previous = reloader.check(previous)
+    assert reloader.current.version == 'v1'
+
+    previous = reloader.check(previous)
+    assert reloader.current.version == 'v3'
+
+    # Unchanged files are not reloaded again
+    loads = files.loads
+    reloader.check(previous)
+    assert files.loads == loads
+
+
+def test_watcher_does_not_retry_rejected_files(files):
+    reloader = make_reloader(files)
+    files.write(FakeArtifacts('v2', valid=False))
+    previous = reloader.check(reloader.check(None))
+    loads = files.loads
+
+    reloader.check(previous)
+    assert files.loads == loads
+    assert reloader.current.version == 'v1'
+
+
+def test_concurrent_reloads_run_one_at_a_time(files):
+    inside = []
+    overlap = []
+
+    def slow_load():
+        inside.append(1)
+        if len(inside) > 1:
+            overlap.append(1)
+        threading.Event().wait(0.01)
+        inside.pop()
+        return files.artifacts
+
+    reloader = ArtifactReloader(slow_load, lambda: files.fingerprint, files.load())
+    files.write(FakeArtifacts('v2'))
+    threads = [threading.Thread(target=reloader.reload) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not overlap
+    assert reloader.current.version == 'v2'
+    assert reloader.reloads == 1
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+test_build_cache.py
+Tests for the train_model.py stage cache: fingerprints, when a stage counts
+as up to date, and the time-saved report.
+
+Usage:
+    python3 -m pytest test_build_cache.py
+"""
+
+import hashlib
+import json
+import os
+
+from build_cache import BUILD_FORMAT, BuildCache, file_digest, stage_fingerprint
+
+
+def test_file_digest_covers_the_prefix(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b'a,b\n1,2\n3,')
+    assert file_digest(str(path)) == hashlib.sha256(b'a,b\n1,2\n3,').hexdigest()
+    assert file_digest(str(path), end=8) == hashlib.sha256(b'a,b\n1,2\n').hexdigest()
+
+
+def test_fingerprint_ignores_key_order_but_not_values():
+    assert stage_fingerprint({'data': 'x', 'params': {'a': 1, 'b': 2}}) == \
+        stage_fingerprint({'params': {'b': 2, 'a': 1}, 'data': 'x'})
+    assert stage_fingerprint({'data': 'x', 'params': {'a': 1}}) != stage_fingerprint({'data': 'x', 'params': {'a': 2}})
+
+
+def test_stage_is_fresh_until_inputs_or_outputs_change(tmp_path):
+    manifest = str(tmp_path / 'build_manifest.json')
+    output = tmp_path / 'model.joblib'
+    output.write_bytes(b'model')
+    outputs = [str(output)]
+
+    cache = BuildCache(manifest)
+    assert not cache.fresh('model', 'f1', outputs)
+    cache.built('model', 'f1', outputs, seconds=4.0)
+    assert json.loads(open(manifest).read())['format'] == BUILD_FORMAT
+
+    cache = BuildCache(manifest)
+    assert cache.fresh('model', 'f1', outputs)
+    assert not cache.fresh('model', 'f2', outputs)
+    assert not BuildCache(manifest, force=True).fresh('model', 'f1', outputs)
+    cache.skipped('model')
+    assert cache.summary()[-1].split()[-2:] == ['0.00', '4.00']
+
+    # Replaced (another size or mtime) or deleted outputs are rebuilt
+    output.write_bytes(b'retrained model')
+    assert not BuildCache(manifest).fresh('model', 'f1', outputs)
+    os.remove(output)
+    assert not BuildCache(manifest).fresh('model', 'f1', outputs)
+
+
+def test_unreadable_or_old_manifest_rebuilds_everything(tmp_path):
+    manifest = tmp_path / 'build_manifest.json'
+    output = tmp_path / 'columns.joblib'
+    output.write_bytes(b'columns')
+    manifest.write_text('{not json')
+    assert not BuildCache(str(manifest)).fresh('training_columns', 'f', [str(output)])
+
+    BuildCache(str(manifest)).built('training_columns', 'f', [str(output)], seconds=1.0)
+    data = json.loads(manifest.read_text())
+    data['format'] = BUILD_FORMAT - 1
+    manifest.write_text(json.dumps(data))
+    assert not BuildCache(str(manifest)).fresh('training_columns', 'f', [str(output)])
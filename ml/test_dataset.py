@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+test_dataset.py
+Tests for the compact training data loader and its columnar cache.
+
+Usage:
+    python3 -m pytest test_dataset.py
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import data_checkpoint, downcast, load_training_data, open_prefix, plain_columns, read_appended_rows
+
+COLUMNS = ['Age', 'Gender', 'Weight (kg)', 'Experience_Level', 'Name of Exercise', 'Sets']
+CATEGORICAL = ['Gender', 'Name of Exercise']
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 250
+    frame = pd.DataFrame({
+        'Age': rng.integers(18, 60, n),
+        'Gender': rng.choice(['Male', 'Female'], n),
+        'Weight (kg)': rng.uniform(40, 130, n).round(2),
+        'Experience_Level': rng.choice([1.0, 2.0, 3.0], n),
+        'Name of Exercise': rng.choice(['Squats', 'Plank', 'Burpees', 'Deadlift'], n),
+        'Sets': rng.integers(2, 6, n),
+        'Unused': ['x' * 50] * n
+    })
+    # Rows late in the file bring a new exercise and a missing weight
+    frame.loc[n - 1, 'Name of Exercise'] = 'Zottman Curls'
+    frame.loc[n - 2, 'Weight (kg)'] = np.nan
+    path = tmp_path / 'data.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def test_values_match_read_csv(csv_path):
+    df, source = load_training_data(csv_path, columns=COLUMNS, categorical=CATEGORICAL, chunk_size=40)
+    expected = pd.read_csv(csv_path, usecols=COLUMNS)[COLUMNS]
+
+    assert source == 'csv'
+    assert list(df.columns) == COLUMNS
+    assert df['Age'].dtype == np.int8 and df['Sets'].dtype == np.int8
+    assert df['Weight (kg)'].dtype == np.float64
+    assert df['Experience_Level'].dtype == np.float32
+    assert df['Name of Exercise'].cat.categories.tolist() == ['Burpees', 'Deadlift', 'Plank', 'Squats', 'Zottman Curls']
+    pd.testing.assert_frame_equal(plain_columns(df), expected)
+
+
+def test_groupby_order_matches_plain_strings(csv_path):
+    df, _ = load_training_data(csv_path, columns=COLUMNS, categorical=CATEGORICAL, chunk_size=40)
+    expected = pd.read_csv(csv_path).groupby(['Name of Exercise', 'Experience_Level']).agg({'Sets': 'mean'})
+    result = df.groupby(['Name of Exercise', 'Experience_Level'], observed=True).agg({'Sets': 'mean'})
+    pd.testing.assert_frame_equal(plain_columns(result.reset_index()), expected.reset_index())
+
+
+def test_downcast_keeps_every_value():
+    assert downcast(pd.Series([1, 300, -5])).dtype == np.int16
+    assert downcast(pd.Series([0.5, 1.25, np.nan])).dtype == np.float32
+    assert downcast(pd.Series([0.1, 75.23])).dtype == np.float64
+
+
+def test_cache_is_reused_until_the_csv_changes(csv_path, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    first, source = load_training_data(csv_path, columns=COLUMNS, categorical=CATEGORICAL, cache_dir=cache_dir)
+    assert source == 'csv' and os.path.isdir(cache_dir)
+
+    cached, source = load_training_data(csv_path, columns=COLUMNS, categorical=CATEGORICAL, cache_dir=cache_dir)
+    assert source == 'cache'
+    pd.testing.assert_frame_equal(cached, first)
+
+    # A subset of the cached columns is served from the cache too
+    subset, source = load_training_data(csv_path, columns=['Gender', 'Sets'], cache_dir=cache_dir)
+    assert source == 'cache' and list(subset.columns) == ['Gender', 'Sets']
+
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write('30,Male,70.5,2.0,Plank,3,x\n')
+    os.utime(csv_path, ns=(0, os.stat(csv_path).st_mtime_ns + 1))
+    reloaded, source = load_training_data(csv_path, columns=COLUMNS, categorical=CATEGORICAL, cache_dir=cache_dir)
+    assert source == 'csv' and len(reloaded) == len(first) + 1
+
+
+def test_appended_rows_are_read_from_the_checkpoint(csv_path):
+    df, _ = load_training_data(csv_path, columns=COLUMNS, categorical=CATEGORICAL)
+    checkpoint = data_checkpoint(csv_path, len(df))
+    assert read_appended_rows(csv_path, checkpoint, COLUMNS, CATEGORICAL) == (None, checkpoint)
+
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write('30,Male,70.5,2.0,Plank,3,x\n31,Female,60.0,1.0,Lunges,4,x\n32,Fem')
+    new_rows, after = read_appended_rows(csv_path, checkpoint, COLUMNS, CATEGORICAL)
+    assert plain_columns(new_rows)['Name of Exercise'].tolist() == ['Plank', 'Lunges']
+    assert after['rows'] == len(df) + 2
+
+    # The incomplete last line is read once it is finished
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write('ale,55.0,3.0,Squats,5,x\n')
+    new_rows, final = read_appended_rows(csv_path, after, COLUMNS, CATEGORICAL)
+    assert len(new_rows) == 1 and new_rows['Gender'].tolist() == ['Female']
+    assert final['offset'] == os.path.getsize(csv_path)
+
+
+def test_rewritten_csv_is_rejected(csv_path):
+    checkpoint = data_checkpoint(csv_path, 250)
+    with open(csv_path, 'r+b') as f:
+        f.seek(checkpoint['offset'] - 5)
+        f.write(b'9,x\n')
+    with pytest.raises(ValueError):
+        read_appended_rows(csv_path, checkpoint)
+
+
+def test_checkpoint_ends_on_a_whole_line(csv_path):
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write('30,Male,70.5,2.0,Pla')
+    checkpoint = data_checkpoint(csv_path)
+    with open_prefix(csv_path, checkpoint['offset']) as f:
+        assert f.read().endswith(b'\n')
+
+    # Loading up to the checkpoint skips the partial row and the cache
+    df, source = load_training_data(csv_path, columns=COLUMNS, end=checkpoint['offset'])
+    assert source == 'csv' and len(df) == 250
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+test_eda_stream.py
+Tests for the streaming EDA profile: every table must match the in-memory
+pandas report within the tolerances stated in eda_stream.py, whatever the
+chunk size, merged profiles must match the profile of all their rows, and
+partitions profiled in parallel must match the file they were split from,
+and stored profiles must be reused, extended with appended rows, or rebuilt
+as the file changes.
+
+Usage:
+    python3 -m pytest test_eda_stream.py
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import data_checkpoint, open_prefix
+import eda_stream
+from eda_stream import (PROFILE_CACHE_SUFFIX, QUANTILE_ACCURACY, DatasetProfile, ValueCounts, cached_profile,
+                        merge_profiles, profile_csv, profile_partitions)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PERCENTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def sample_frame(rows=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Age': rng.integers(18, 60, rows),
+        'Gender': rng.choice(['Male', 'Female'], rows),
+        'Weight (kg)': rng.normal(80, 15, rows).round(2),
+        'Balance': rng.standard_t(3, rows) * 1000,
+        'Level': rng.integers(1, 4, rows),
+        'Workout_Type': rng.choice(['Cardio', 'Strength', 'Yoga', 'HIIT'], rows, p=[0.4, 0.3, 0.2, 0.1]),
+        'Equipment Needed': rng.choice(['Dumbbells', 'Mat', None], rows),
+        'Notes': [f'note {i % 800}' for i in range(rows)],
+    })
+    df['Calories'] = df['Weight (kg)'] * 20 + rng.normal(0, 50, rows)
+    df.loc[rng.random(rows) < 0.05, 'Weight (kg)'] = np.nan
+    # Missing integers in the second half only: float64 when read whole
+    df.loc[rows // 2 + rng.integers(0, rows // 2, 20), 'Age'] = np.nan
+    df.loc[:999, 'Equipment Needed'] = None
+    df.loc[rows - 50:, :] = df.loc[:49, :].to_numpy()
+    return df
+
+
+@pytest.fixture(scope='module')
+def csv_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('eda') / 'data.csv'
+    sample_frame().to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def partition_dir(csv_path, tmp_path_factory):
+    """csv_path split into three files; duplicates span files and the last orders its columns differently."""
+    df = pd.read_csv(csv_path)
+    directory = tmp_path_factory.mktemp('partitions')
+    df.iloc[:1000].to_csv(directory / 'part-0.csv', index=False)
+    df.iloc[1000:2200].to_csv(directory / 'part-1.csv', index=False)
+    df.iloc[2200:, ::-1].to_csv(directory / 'part-2.csv', index=False)
+    return str(directory)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 700, 100000])
+def test_profile_matches_in_memory_report(csv_path, chunk_size):
+    if chunk_size == 1:
+        # One row per chunk is slow; a prefix covers the merge edge cases
+        df = pd.read_csv(csv_path, nrows=300)
+        profile = DatasetProfile()
+        for start in range(len(df)):
+            profile.update(df.iloc[start:start + 1].reset_index(drop=True))
+    else:
+        df = pd.read_csv(csv_path)
+        profile = profile_csv(csv_path, chunk_size=chunk_size)
+
+    assert profile.rows == len(df)
+    assert list(profile.info()['Dtype']) == [str(dtype) for dtype in df.dtypes]
+    assert profile.missing().equals(df.isnull().sum())
+    assert profile.duplicates() == df.duplicated().sum()
+    # Chunks of a text column without values are counted as float64
+    np.testing.assert_allclose(profile.memory_usage(), df.memory_usage(deep=True), rtol=0.15)
+
+    num = df.select_dtypes(include=[np.number])
+    expected = num.describe(percentiles=PERCENTILES).T
+    expected['skew'] = num.skew()
+    expected['kurtosis'] = num.kurtosis()
+    described = profile.describe(PERCENTILES)
+    assert list(described.columns) == list(expected.columns)
+    assert list(described.index) == list(num.columns)
+    exact = ['count', 'mean', 'std', 'min', 'max', 'skew', 'kurtosis']
+    np.testing.assert_allclose(described[exact], expected[exact], rtol=1e-9, atol=1e-12)
+    percentiles = described.columns[4:11]
+    # Low-cardinality columns are exact, the others within the sketch accuracy
+    np.testing.assert_allclose(described.loc[['Age', 'Level'], percentiles],
+                               expected.loc[['Age', 'Level'], percentiles], rtol=1e-12)
+    np.testing.assert_allclose(described[percentiles], expected[percentiles], rtol=QUANTILE_ACCURACY)
+
+    np.testing.assert_allclose(profile.corr(), num.corr(), rtol=1e-9, atol=1e-12)
+
+    for column in df.select_dtypes(include=['object', 'str']).columns:
+        assert profile.value_counts(column).equals(df[column].value_counts(dropna=False))
+        assert str(profile.unique_values(column)) == str(df[column].unique().tolist())
+        assert profile.nunique(column, dropna=False) == df[column].nunique(dropna=False)
+    assert profile.value_counts('Level').equals(df['Level'].value_counts(dropna=False))
+
+
+def test_merged_profiles_match_one_profile(csv_path):
+    df = pd.read_csv(csv_path)
+    whole = DatasetProfile().update(df)
+    merged = DatasetProfile().update(df.iloc[:1234]).merge(DatasetProfile().update(df.iloc[1234:]))
+
+    assert merged.rows == whole.rows
+    assert merged.duplicates() == whole.duplicates()
+    assert merged.info().equals(whole.info())
+    np.testing.assert_allclose(merged.describe(PERCENTILES), whole.describe(PERCENTILES), rtol=1e-9)
+    np.testing.assert_allclose(merged.corr(), whole.corr(), rtol=1e-9, atol=1e-12)
+    assert merged.value_counts('Workout_Type').equals(whole.value_counts('Workout_Type'))
+
+
+def test_heavy_hitters_bound_their_error():
+    rng = np.random.default_rng(1)
+    values = np.concatenate([np.repeat(['a', 'b', 'c'], [3000, 2000, 1000]),
+                             [f'rare {i}' for i in rng.integers(0, 5000, 4000)]])
+    rng.shuffle(values)
+    counts = ValueCounts(capacity=50)
+    for chunk in np.array_split(values, 13):
+        counts.update(pd.Series(chunk))
+
+    expected = pd.Series(values).value_counts()
+    estimated = counts.series('value')
+    assert not counts.exact and 0 < counts.error <= len(values) / 51
+    assert list(estimated.index[:3]) == ['a', 'b', 'c']
+    for value, count in estimated.items():
+        assert expected[value] - counts.error <= count <= expected[value]
+
+
+def test_text_after_numbers_is_rejected():
+    profile = DatasetProfile().update(pd.DataFrame({'x': [1.5, 2.0]}))
+    with pytest.raises(ValueError, match="Column 'x'"):
+        profile.update(pd.DataFrame({'x': ['high', 'low']}))
+    # Numbers in a later chunk of a text column stay text
+    profile = DatasetProfile().update(pd.DataFrame({'y': ['a', 'b']})).update(pd.DataFrame({'y': [1, 2]}))
+    assert profile.unique_values('y') == ['a', 'b', '1', '2']
+
+
+def test_partitions_profiled_in_parallel_match_one_file(csv_path, partition_dir):
+    paths = [os.path.join(partition_dir, f'part-{i}.csv') for i in range(3)]
+    partials = profile_partitions(paths, chunk_size=400, workers=2)
+    assert [p.rows for p in partials] == [1000, 1200, 800]
+    merged, whole = merge_profiles(partials), profile_csv(csv_path, chunk_size=400)
+
+    assert merged.columns == whole.columns
+    assert merged.duplicates() == whole.duplicates()
+    assert merged.info().equals(whole.info())
+    assert merged.missing().equals(whole.missing())
+    np.testing.assert_allclose(merged.describe(PERCENTILES), whole.describe(PERCENTILES), rtol=1e-9)
+    np.testing.assert_allclose(merged.corr(), whole.corr(), rtol=1e-9, atol=1e-12)
+    for column in whole.text_columns():
+        assert merged.value_counts(column).equals(whole.value_counts(column))
+    # The partials are left as they were
+    assert [p.rows for p in partials] == [1000, 1200, 800]
+
+
+def assert_same_profile(profile, expected):
+    assert profile.rows == expected.rows
+    assert profile.duplicates() == expected.duplicates()
+    assert profile.info().equals(expected.info())
+    np.testing.assert_allclose(profile.describe(PERCENTILES), expected.describe(PERCENTILES), rtol=1e-9)
+    np.testing.assert_allclose(profile.corr(), expected.corr(), rtol=1e-9, atol=1e-12)
+    for column in expected.text_columns():
+        assert profile.value_counts(column).equals(expected.value_counts(column))
+
+
+def test_cached_profile_follows_file_changes(csv_path, tmp_path, monkeypatch):
+    df = pd.read_csv(csv_path)
+    path = str(tmp_path / 'data.csv')
+    df.iloc[:2000].to_csv(path, index=False)
+
+    profile, source = cached_profile(path, chunk_size=500)
+    assert source == 'csv' and os.path.exists(path + PROFILE_CACHE_SUFFIX)
+    assert_same_profile(profile, profile_csv(path))
+
+    # Unchanged (even after a touch): the CSV is not parsed again
+    def no_read(*args, **kwargs):
+        raise AssertionError('CSV was read')
+    with monkeypatch.context() as patch:
+        patch.setattr(eda_stream.pd, 'read_csv', no_read)
+        assert cached_profile(path)[1] == 'cache'
+        os.utime(path, ns=(1, 1))
+        assert cached_profile(path)[1] == 'cache'
+
+    # Appended rows, the last without its newline yet
+    df.iloc[2000:].to_csv(path, mode='a', header=False, index=False)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('33,Female')
+    profile, source = cached_profile(path, chunk_size=500)
+    assert source == 'appended' and profile.rows == len(df)
+    assert_same_profile(profile, profile_csv(csv_path))
+
+    # Rewritten with the same size: profiled from scratch
+    with open(path, 'r+', encoding='utf-8') as f:
+        f.seek(len(f.readline()))
+        f.write('17')
+    profile, source = cached_profile(path)
+    assert source == 'csv'
+    with open_prefix(path, data_checkpoint(path)['offset']) as f:
+        assert_same_profile(profile, profile_csv(f))
+
+
+def eda_report(path, *extra):
+    output = subprocess.run([sys.executable, os.path.join(HERE, 'eda.py'), path, '--no-heatmap', *extra],
+                            cwd=HERE, capture_output=True, text=True, check=True).stdout
+    parts = output.split('--- End of EDA Report ---')[0].split('=' * 80)
+    return {title.strip(): body for title, body in zip(parts[1::2], parts[2::2])}
+
+
+def test_partition_report_matches_single_file(csv_path, partition_dir):
+    single = eda_report(csv_path, '--stream')
+    partitioned = eda_report(partition_dir, '--workers', '2', '--by-partition')
+    assert list(partitioned) == list(single) + ['9. Per-Partition Breakdown']
+    for title in single:
+        if not title.startswith(('1.', '4.', '6.')):
+            assert partitioned[title] == single[title], title
+    assert 'part-2.csv' in partitioned['9. Per-Partition Breakdown']
+    # A glob names the same partitions
+    assert eda_report(os.path.join(partition_dir, 'part-*.csv')) == {
+        title: body for title, body in partitioned.items() if not title.startswith('9.')}
+
+
+def test_eda_stream_report_matches_in_memory(csv_path):
+    def report(*extra):
+        return eda_report(csv_path, *extra)
+
+    in_memory, streamed = report(), report('--stream', '--chunk-size', '500')
+    assert list(streamed) == list(in_memory)
+    # Basic info is laid out differently, percentiles and correlations are compared above
+    for title in list(in_memory)[1:]:
+        if not title.startswith(('4.', '6.')):
+            assert streamed[title] == in_memory[title], title
+
+
+def test_cached_report_matches_streamed_report(csv_path, tmp_path):
+    path = str(tmp_path / 'data.csv')
+    pd.read_csv(csv_path).to_csv(path, index=False)
+    streamed = eda_report(path, '--stream')
+    assert eda_report(path, '--cache') == streamed
+    # The second run and its markdown report come from the stored profile
+    report = tmp_path / 'report.md'
+    assert eda_report(path, '--cache', '--out-md', str(report)) == streamed
+    assert '4. Numerical Columns Summary' in report.read_text()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+test_fast_model.py
+Tests for the latency-budgeted fast model variant.
+
+Usage:
+    python3 -m pytest test_fast_model.py
+"""
+
+import numpy as np
+import pytest
+
+from artifacts import BoosterPredictor
+from fast_model import agreement, distill, fast_candidates, select_fast, truncate
+from tree_engine import CompiledForest
+
+
+@pytest.fixture(scope='module')
+def model(fit_model):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1200, 6))
+    # A learnable rule over five classes
+    y = np.array(['Squats', 'Plank', 'Burpees', 'Lunges', 'Rows'])[
+        np.digitize(X[:, 0] + 0.5 * X[:, 1], [-1.0, -0.3, 0.3, 1.0])]
+    return fit_model(X, y, n_estimators=60), X
+
+
+def test_truncate_keeps_the_first_iterations(model):
+    model, X = model
+    fast = truncate(model.booster_, 10)
+    assert fast.num_trees() == 10 * len(model.classes_)
+    np.testing.assert_allclose(BoosterPredictor(fast, model.classes_).predict_proba(X),
+                               model.predict_proba(X, num_iteration=10), rtol=0, atol=1e-12)
+
+
+def test_distilled_student_is_a_compilable_classifier_that_agrees(model):
+    model, X = model
+    student = distill(model.booster_, X, num_leaves=4, rounds=40)
+    probabilities = BoosterPredictor(student, model.classes_).predict_proba(X)
+
+    assert student.dump_model()['objective'].startswith('multiclass')
+    assert student.num_trees() == 40 * len(model.classes_)
+    assert max(student.dump_model()['tree_info'], key=lambda tree: tree['num_leaves'])['num_leaves'] <= 4
+    np.testing.assert_allclose(CompiledForest.from_booster(student, model.classes_).predict_proba(X),
+                               probabilities, atol=1e-12)
+
+    # With the starting scores folded in, the student's class balance matches the teacher's
+    teacher = model.predict_proba(X)
+    np.testing.assert_allclose(probabilities.mean(axis=0), teacher.mean(axis=0), atol=0.02)
+    assert agreement(teacher, probabilities, k=1)['top1_agreement'] > 0.9
+
+
+def test_agreement_counts_overlap_and_exact_lists():
+    reference = np.array([[0.5, 0.3, 0.2, 0.0], [0.1, 0.2, 0.3, 0.4]])
+    probabilities = np.array([[0.5, 0.2, 0.3, 0.0], [0.4, 0.3, 0.2, 0.1]])
+    report = agreement(reference, probabilities, k=2)
+    assert report == {'top1_agreement': 0.5, 'topk_overlap': 0.25, 'topk_exact': 0.0}
+    assert agreement(reference, reference, k=4) == {'top1_agreement': 1.0, 'topk_overlap': 1.0, 'topk_exact': 1.0}
+
+
+def test_selection_respects_the_budget(model):
+    model, X = model
+    results = fast_candidates(model.booster_, model.classes_, X, leaves=[4], iterations=[5, 20], eval_rows=200)
+    assert [(r['method'], r['iterations']) for r in results] == [
+        ('truncated', 5), ('truncated', 20), ('distilled', 5), ('distilled', 20)]
+    assert all(r['rows'] == 200 and 0 <= r['topk_overlap'] <= 1 for r in results)
+
+    assert select_fast(results, budget_us=0.0) is None
+    unlimited = select_fast(results, budget_us=float('inf'), engine='compiled')
+    assert unlimited['topk_overlap'] == max(r['topk_overlap'] for r in results)
+    fastest = min(r['booster_us'] for r in results)
+    assert select_fast(results, budget_us=fastest)['booster_us'] == fastest
+
+
+def test_selection_refuses_candidates_below_the_agreement_floor():
+    results = [
+        {'topk_overlap': 0.9, 'top1_agreement': 0.6, 'booster_us': 10.0},
+        {'topk_overlap': 0.5, 'top1_agreement': 0.97, 'booster_us': 20.0},
+        {'topk_overlap': 0.95, 'top1_agreement': 0.99, 'booster_us': 500.0}
+    ]
+    assert select_fast(results, budget_us=100)['booster_us'] == 10.0
+    assert select_fast(results, budget_us=100, min_agreement=0.95)['booster_us'] == 20.0
+    assert select_fast(results, budget_us=100, min_agreement=0.98) is None
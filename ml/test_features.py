@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+test_features.py
+Parity tests for the NumPy feature encoder.
+
+FeatureEncoder must produce exactly the matrix the pandas reference path
+(get_dummies + reindex on training_columns) produces, for single rows and
+for batches mixing every gender.
+
+Usage:
+    python3 -m pytest test_features.py
+"""
+
+import os
+import random
+
+import joblib
+import numpy as np
+import pytest
+
+from features import FeatureEncoder, build_features, encode_features_pandas
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope='module')
+def training_columns():
+    return joblib.load(os.path.join(HERE, 'training_columns.joblib'))
+
+
+def random_profiles(count, seed=0):
+    """Profiles drawn from the field ranges documented in API_USAGE.md."""
+    rng = random.Random(seed)
+    return [
+        {
+            'Age': rng.randint(13, 120),
+            'Gender': rng.choice(['Male', 'Female', 'Other']),
+            'Weight (kg)': round(rng.uniform(30, 300), 1),
+            'Height (m)': round(rng.uniform(0.5, 3.0), 2),
+            'Fat_Percentage': round(rng.uniform(3, 60), 1),
+            'Experience_Level': rng.randint(1, 3),
+            'Workout_Frequency (days/week)': rng.randint(1, 7)
+        }
+        for _ in range(count)
+    ]
+
+
+def test_single_row_parity(training_columns):
+    encoder = FeatureEncoder(training_columns)
+    for profile in random_profiles(200):
+        feature_data, _ = build_features(profile)
+        expected = encode_features_pandas([feature_data], training_columns).to_numpy(dtype=np.float64)
+        np.testing.assert_array_equal(encoder.transform([feature_data]), expected)
+
+
+def test_batch_parity(training_columns):
+    encoder = FeatureEncoder(training_columns)
+    rows = [build_features(profile)[0] for profile in random_profiles(500, seed=1)]
+    expected = encode_features_pandas(rows, training_columns).to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(encoder.transform(rows), expected)
+
+
+def test_gender_dummy(training_columns):
+    encoder = FeatureEncoder(training_columns)
+    gender_index = training_columns.index('Gender_Male')
+    profile = random_profiles(1)[0]
+    for gender, expected in [('Male', 1.0), ('Female', 0.0), ('Other', 0.0)]:
+        feature_data, _ = build_features(dict(profile, Gender=gender))
+        assert encoder.transform([feature_data])[0, gender_index] == expected
+
+
+def test_missing_field_raises():
+    profile = random_profiles(1)[0]
+    del profile['Fat_Percentage']
+    with pytest.raises(KeyError):
+        build_features(profile)
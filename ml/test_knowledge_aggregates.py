@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+test_knowledge_aggregates.py
+Tests that running knowledge base aggregates match a full pandas rebuild.
+
+Usage:
+    python3 -m pytest test_knowledge_aggregates.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import data_checkpoint
+from knowledge_aggregates import KNOWLEDGE_COLUMNS, KnowledgeAggregates, build_knowledge_aggregates, knowledge_bases
+
+
+@pytest.fixture
+def rows():
+    rng = np.random.default_rng(0)
+    n = 3000
+    exercises = np.array(['Squats', 'Plank', 'Burpees', 'Deadlift'])
+    df = pd.DataFrame({
+        'Name of Exercise': exercises[rng.integers(0, 4, n)],
+        'Experience_Level': rng.choice([1.0, 2.0, 3.0, 1.02], n),
+        'Sets': rng.integers(2, 6, n),
+        'Reps': rng.integers(6, 20, n),
+        'Burns Calories (per 30 min)': rng.uniform(100, 500, n),
+        'Benefit': rng.choice(['Strength', 'Endurance'], n),
+        'Equipment Needed': rng.choice(['None', 'Dumbbells'], n),
+        'Target Muscle Group': rng.choice(['Legs', 'Core'], n),
+        'Difficulty Level': rng.choice(['Beginner', 'Advanced'], n),
+        'diet_type': rng.choice(['Keto', 'Vegan', 'Paleo'], n),
+        'meal_type': rng.choice(['Lunch', 'Dinner'], n),
+        'Calories': rng.uniform(1500, 2500, n),
+        'Carbs': rng.uniform(150, 350, n),
+        'Proteins': rng.uniform(60, 140, n),
+        'Fats': rng.uniform(40, 90, n)
+    })
+    # Missing values, a missing key and a key that only appears late
+    df.loc[:40, 'Benefit'] = np.nan
+    df.loc[::7, 'Calories'] = np.nan
+    df.loc[5, 'diet_type'] = np.nan
+    df.loc[2900:, 'Name of Exercise'] = 'Zottman Curls'
+    return df[KNOWLEDGE_COLUMNS]
+
+
+def offset_after(path, rows):
+    """Byte offset just past the first rows data rows of a CSV."""
+    with open(path, 'rb') as f:
+        for _ in range(rows + 1):
+            f.readline()
+        return f.tell()
+
+
+@pytest.mark.parametrize('batches', [1, 2, 7])
+def test_updates_match_a_full_groupby_exactly(rows, batches):
+    aggregates = KnowledgeAggregates()
+    for batch in np.array_split(np.arange(len(rows)), batches):
+        aggregates.update(rows.iloc[batch])
+    expected_kb, expected_diet_kb = knowledge_bases(rows)
+
+    # equals() is exact: same values bit for bit, same dtypes and row order
+    assert aggregates.exercise_kb().equals(expected_kb)
+    assert aggregates.diet_kb().equals(expected_diet_kb)
+    assert aggregates.rows == len(rows)
+
+
+def test_categorical_batches_match_plain_text(rows):
+    aggregates = KnowledgeAggregates()
+    for batch in np.array_split(np.arange(len(rows)), 3):
+        chunk = rows.iloc[batch]
+        aggregates.update(chunk.astype({'Name of Exercise': 'category', 'diet_type': 'category'}))
+    expected_kb, expected_diet_kb = knowledge_bases(rows)
+    assert aggregates.exercise_kb().equals(expected_kb)
+    assert aggregates.diet_kb().equals(expected_diet_kb)
+
+
+def test_first_values_skip_missing_and_keep_the_earliest(rows):
+    aggregates = KnowledgeAggregates()
+    aggregates.update(rows.iloc[:10])
+    aggregates.update(rows.iloc[10:])
+    kb = aggregates.exercise_kb()
+    expected = rows.dropna(subset=['Benefit']).groupby(['Name of Exercise', 'Experience_Level'])['Benefit'].first()
+    assert kb.set_index(['Name of Exercise', 'Experience_Level'])['Benefit'].equals(expected)
+
+
+def test_means_without_values_are_missing():
+    df = pd.DataFrame({'diet_type': ['Keto', 'Keto'], 'meal_type': ['Lunch', 'Lunch'], 'Calories': [np.nan, np.nan],
+                       'Carbs': [1.0, 2.0], 'Proteins': [1.0, 1.0], 'Fats': [0.5, np.nan]})
+    aggregates = KnowledgeAggregates()
+    aggregates.diet.update(df)
+    diet_kb = aggregates.diet_kb()
+    assert np.isnan(diet_kb.loc[0, 'Calories'])
+    assert diet_kb.loc[0, 'Carbs'] == 1.5 and diet_kb.loc[0, 'Fats'] == 0.5
+
+
+def test_streaming_build_matches_the_csv_groupby(rows, tmp_path):
+    path = tmp_path / 'data.csv'
+    rows.to_csv(path, index=False)
+    aggregates = build_knowledge_aggregates(path, chunk_size=450)
+    expected_kb, expected_diet_kb = knowledge_bases(pd.read_csv(path))
+    assert aggregates.exercise_kb().equals(expected_kb)
+    assert aggregates.diet_kb().equals(expected_diet_kb)
+    assert aggregates.rows == len(rows)
+
+
+def test_streaming_build_stops_at_the_checkpoint(rows, tmp_path):
+    path = tmp_path / 'data.csv'
+    rows.iloc[:2000].to_csv(path, index=False)
+    checkpoint = data_checkpoint(path)
+    # Rows appended later, the last one still being written
+    with open(path, 'a', encoding='utf-8') as f:
+        rows.iloc[2000:].to_csv(f, header=False, index=False)
+        f.write('Squats,1.0,3')
+
+    aggregates = build_knowledge_aggregates(path, chunk_size=300, end=checkpoint['offset'])
+    expected_kb, expected_diet_kb = knowledge_bases(pd.read_csv(path, nrows=2000))
+    assert aggregates.rows == 2000
+    assert aggregates.exercise_kb().equals(expected_kb)
+    assert aggregates.diet_kb().equals(expected_diet_kb)
+
+
+def test_key_columns_widen_when_a_later_chunk_has_fractions(rows, tmp_path):
+    # Whole experience levels (read as integers) first, fractional ones only later
+    rows = rows.copy()
+    levels = rows['Experience_Level'].round().astype(int).astype(object)
+    levels.iloc[2000:] = 1.01
+    rows['Experience_Level'] = levels
+    path = tmp_path / 'data.csv'
+    rows.to_csv(path, index=False)
+    assert pd.read_csv(path, nrows=300)['Experience_Level'].dtype == np.int64
+
+    aggregates = build_knowledge_aggregates(path, chunk_size=300)
+    expected_kb, expected_diet_kb = knowledge_bases(pd.read_csv(path))
+    assert aggregates.exercise_kb().equals(expected_kb)
+    assert aggregates.diet_kb().equals(expected_diet_kb)
+
+    # Appended rows (retrain_incremental.py) go through the same update
+    appended = build_knowledge_aggregates(path, chunk_size=300, end=offset_after(path, 2000))
+    appended.update(pd.read_csv(path, skiprows=range(1, 2001)))
+    assert appended.exercise_kb().equals(expected_kb)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+test_knowledge_index.py
+Parity tests for the knowledge base hash indexes.
+
+Every lookup must return the same record the original boolean-mask filtering
+of the knowledge base DataFrames returned.
+
+Usage:
+    python3 -m pytest test_knowledge_index.py
+"""
+
+import os
+
+import joblib
+import pytest
+
+from knowledge_index import DIET_FIELDS, EXERCISE_FIELDS, DietIndex, ExerciseIndex
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope='module')
+def exercise_kb():
+    return joblib.load(os.path.join(HERE, 'knowledge_base.joblib'))
+
+
+@pytest.fixture(scope='module')
+def diet_kb():
+    return joblib.load(os.path.join(HERE, 'diet_knowledge_base.joblib'))
+
+
+def mask_lookup(kb, exercise_name, experience_level):
+    """The DataFrame filtering app.py used before the index existed."""
+    match = kb[(kb['Name of Exercise'] == exercise_name) & (kb['Experience_Level'] == experience_level)]
+    if match.empty:
+        match = kb[kb['Name of Exercise'] == exercise_name].head(1)
+    if match.empty:
+        return None
+    row = match.iloc[0]
+    return {
+        field: (convert(row[column]) if convert else row[column])
+        for field, column, convert in EXERCISE_FIELDS
+    }
+
+
+def test_exercise_index_matches_mask_lookup(exercise_kb):
+    index = ExerciseIndex(exercise_kb)
+    assert len(index) == len(exercise_kb)
+    for name in exercise_kb['Name of Exercise'].unique():
+        # Integer levels as sent by the backend, plus one level never seen in the KB
+        for level in [1, 2, 3, 2.5]:
+            assert index.lookup(name, level) == mask_lookup(exercise_kb, name, level)
+
+
+def test_exercise_index_unknown_exercise(exercise_kb):
+    assert ExerciseIndex(exercise_kb).lookup('Not An Exercise', 2) is None
+
+
+def test_diet_index_matches_mask_lookup(diet_kb):
+    index = DietIndex(diet_kb)
+    for row in diet_kb.itertuples(index=False):
+        expected = {'diet_type': row.diet_type, 'meal_type': row.meal_type}
+        expected.update((field, float(getattr(row, column))) for field, column in DIET_FIELDS)
+        assert index.lookup(row.diet_type, row.meal_type) == expected
+    assert index.lookup('Standard', 'Lunch') is None
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+test_load_test.py
+Tests for the API load test: generated profiles, result summaries, the
+regression check, and a short run against the Flask test client with a
+small synthetic model bundled with the shipped knowledge bases (the
+artifact_dir fixture in conftest.py).
+
+Usage:
+    python3 -m pytest test_load_test.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from features import build_features
+from load_test import SCENARIOS, check_response, compare, realistic_profiles, summarize
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_realistic_profiles_are_valid_and_reproducible():
+    profiles = realistic_profiles(500, seed=3)
+    assert profiles == realistic_profiles(500, seed=3)
+    assert profiles != realistic_profiles(500, seed=4)
+    for profile in profiles:
+        assert 13 <= profile['Age'] <= 120
+        assert 30 <= profile['Weight (kg)'] <= 300
+        assert 0.5 <= profile['Height (m)'] <= 3.0
+        assert 3 <= profile['Fat_Percentage'] <= 60
+        assert profile['Experience_Level'] in (1, 2, 3)
+        assert 1 <= profile['Workout_Frequency (days/week)'] <= 7
+        # Accepted by the API's own validation
+        build_features(profile)
+    bmi = [p['Weight (kg)'] / p['Height (m)'] ** 2 for p in profiles]
+    assert 22 < np.median(bmi) < 29
+
+
+def test_summary_percentiles_and_throughput():
+    summary = summarize([i / 1000 for i in range(1, 101)], elapsed=2.0, profiles_per_request=10,
+                        errors=['HTTP 500'])
+    assert summary['requests'] == 100 and summary['profiles'] == 1000
+    assert summary['p50_ms'] == pytest.approx(50.5)
+    assert summary['p99_ms'] == pytest.approx(99.01)
+    assert summary['max_ms'] == 100
+    assert summary['requests_per_s'] == 50 and summary['profiles_per_s'] == 500
+    assert summary['errors'] == 1 and summary['first_error'] == 'HTTP 500'
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    before = {'targets': {'flask': {'single': {'p50_ms': 1.0, 'p95_ms': 2.0, 'p99_ms': 3.0, 'requests_per_s': 100}}}}
+    after = {'targets': {
+        'flask': {'single': {'p50_ms': 1.1, 'p95_ms': 2.5, 'p99_ms': 2.0, 'requests_per_s': 80},
+                  'batch': {'p50_ms': 9.0, 'p95_ms': 9.0, 'p99_ms': 9.0, 'requests_per_s': 1}}
+    }}
+    rows, regressions = compare(before, after, tolerance=0.15)
+    # Scenarios missing from the earlier run are not compared
+    assert len(rows) == 4
+    assert [row[2] for row in regressions] == ['p95_ms', 'requests_per_s']
+
+
+def test_response_check_allows_fewer_recommendations_than_asked():
+    def payload(*counts):
+        return json.dumps({'results': [{'success': True, 'exercise_recommendations': [{}] * count}
+                                       for count in counts]})
+
+    assert check_response(200, payload(5, 3), profiles=2, num_recommendations=5) is None
+    assert check_response(200, payload(5, 0), profiles=2, num_recommendations=5) == '0 recommendations, expected 1-5'
+    assert check_response(200, payload(6), profiles=1, num_recommendations=5) == '6 recommendations, expected 1-5'
+    assert check_response(200, payload(5), profiles=2, num_recommendations=5) == '1 results for 2 profiles'
+    assert check_response(503, 'busy', profiles=1, num_recommendations=5) == "HTTP 503: 'busy'"
+
+
+def test_flask_run_writes_results(artifact_dir, tmp_path):
+    output = tmp_path / 'results.json'
+    env = dict(os.environ, INFERENCE_ENGINE='compiled', MODEL_VARIANT='full')
+    subprocess.run(
+        [sys.executable, os.path.join(HERE, 'load_test.py'), '--requests', '12', '--warmup', '2',
+         '--batch-size', '5', '--artifact-dir', artifact_dir, '--output', str(output)],
+        cwd=HERE, env=env, capture_output=True, text=True, check=True
+    )
+    report = json.loads(output.read_text())
+    assert set(report['targets']['flask']) == set(SCENARIOS)
+    for result in report['targets']['flask'].values():
+        assert result['requests'] == 12 and result['errors'] == 0
+        assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms'] <= result['max_ms']
+    assert report['targets']['flask']['batch']['profiles'] == 60
+    assert report['servers']['flask']['artifact_format'] == 'bundle'
+
+    # A run compared with itself has no regressions
+    subprocess.run(
+        [sys.executable, os.path.join(HERE, 'load_test.py'), '--requests', '12', '--scenarios', 'cached',
+         '--artifact-dir', artifact_dir, '--output', str(tmp_path / 'again.json'),
+         '--compare', str(output), '--tolerance', '100'],
+        cwd=HERE, env=env, capture_output=True, text=True, check=True
+    )
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+test_metrics.py
+Tests for the request instrumentation and its Prometheus text output.
+
+Usage:
+    python3 -m pytest test_metrics.py
+"""
+
+from metrics import NULL_TIMER, Histogram, Metrics, server_timing
+
+
+def parse(text):
+    """{sample name with labels: value} for every non-comment line."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.001, 0.01))
+    for value in (0.0005, 0.001, 0.005, 0.5):
+        histogram.observe(value)
+
+    samples = parse('\n'.join(histogram.lines('h', 'stage="x"')))
+    assert samples['h_bucket{stage="x",le="0.001"}'] == 2
+    assert samples['h_bucket{stage="x",le="0.01"}'] == 3
+    assert samples['h_bucket{stage="x",le="+Inf"}'] == 4
+    assert samples['h_count{stage="x"}'] == 4
+    assert abs(samples['h_sum{stage="x"}'] - 0.5065) < 1e-12
+
+
+def test_timer_records_stages_and_request():
+    metrics = Metrics()
+    timer = metrics.start('predict')
+    timer.mark('parse')
+    timer.mark('predict')
+    stages = timer.finish(200)
+
+    assert [stage for stage, _ in stages] == ['parse', 'predict', 'total']
+    assert stages[-1][1] >= stages[0][1] + stages[1][1]
+
+    samples = parse(metrics.render())
+    assert samples['ml_stage_duration_seconds_count{endpoint="predict",stage="parse"}'] == 1
+    assert samples['ml_stage_duration_seconds_count{endpoint="predict",stage="predict"}'] == 1
+    assert samples['ml_request_duration_seconds_count{endpoint="predict"}'] == 1
+    assert samples['ml_requests_total{endpoint="predict",status="200"}'] == 1
+
+
+def test_counters_cache_stats_and_info():
+    metrics = Metrics()
+    metrics.count_error('predict_batch', 'missing_field', count=3)
+    metrics.count_error('predict_batch', 'missing_field')
+    cache_stats = {'hits': 5, 'misses': 2, 'evictions': 0, 'expirations': 1, 'size': 7}
+
+    text = metrics.render(cache_stats=cache_stats, info={'version': 'abc123', 'engine': 'compiled'})
+    samples = parse(text)
+    assert samples['ml_errors_total{endpoint="predict_batch",reason="missing_field"}'] == 4
+    assert samples['ml_cache_events_total{event="hits"}'] == 5
+    assert samples['ml_cache_entries'] == 7
+    assert samples['ml_artifact_info{version="abc123",engine="compiled"}'] == 1
+    assert '# TYPE ml_stage_duration_seconds histogram' in text
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    timer = metrics.start('predict')
+    assert timer is NULL_TIMER
+    timer.mark('parse')
+    assert timer.finish(200) is None
+    metrics.count_error('predict', 'internal')
+
+    assert 'endpoint=' not in metrics.render()
+
+
+def test_server_timing_header():
+    assert server_timing([('parse', 0.0001234), ('total', 0.002)]) == 'parse;dur=0.123, total;dur=2.000'
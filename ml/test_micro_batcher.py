@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+test_micro_batcher.py
+Tests for coalescing concurrent requests into micro-batches.
+
+Usage:
+    python3 -m pytest test_micro_batcher.py
+"""
+
+import asyncio
+
+import pytest
+
+from micro_batcher import MicroBatcher, Overloaded
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_submissions_share_a_batch_and_keep_their_results():
+    seen = []
+
+    def score_batch(items):
+        seen.append(list(items))
+        return [item * 10 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(score_batch, max_batch_size=64, max_wait=0.05)
+        return batcher, await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+
+    batcher, results = run(main())
+    assert results == [i * 10 for i in range(20)]
+    assert seen == [list(range(20))]
+    assert batcher.stats()['mean_batch_size'] == 20
+
+
+def test_batches_are_capped_at_max_batch_size():
+    sizes = []
+
+    def score_batch(items):
+        sizes.append(len(items))
+        return items
+
+    async def main():
+        batcher = MicroBatcher(score_batch, max_batch_size=8, max_wait=0.05)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+
+    assert run(main()) == list(range(20))
+    assert sizes == [8, 8, 4]
+
+
+def test_zero_window_scores_without_waiting():
+    async def main():
+        batcher = MicroBatcher(lambda items: items, max_wait=0)
+        results = [await batcher.submit(i) for i in range(3)]
+        return batcher, results
+
+    batcher, results = run(main())
+    assert results == [0, 1, 2]
+    assert batcher.stats()['batches'] == 3
+
+
+def test_batch_exception_reaches_every_caller_and_batcher_recovers():
+    def score_batch(items):
+        if 'bad' in items:
+            raise RuntimeError('model failed')
+        return items
+
+    async def main():
+        batcher = MicroBatcher(score_batch, max_wait=0.05)
+        failed = await asyncio.gather(batcher.submit('bad'), batcher.submit('ok'), return_exceptions=True)
+        return failed, await batcher.submit('ok')
+
+    failed, recovered = run(main())
+    assert all(isinstance(result, RuntimeError) for result in failed)
+    assert recovered == 'ok'
+
+
+def test_submit_rejects_when_too_many_are_waiting():
+    async def main():
+        batcher = MicroBatcher(lambda items: items, max_wait=0.05, max_pending=2)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(4)), return_exceptions=True)
+        return batcher, results
+
+    batcher, results = run(main())
+    assert results[:2] == [0, 1]
+    assert all(isinstance(result, Overloaded) for result in results[2:])
+    assert batcher.stats()['rejected'] == 2
+
+
+def test_invalid_batch_size():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda items: items, max_batch_size=0)
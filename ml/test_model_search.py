@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+test_model_search.py
+Tests for the cross-validated hyperparameter search.
+
+Usage:
+    python3 -m pytest test_model_search.py
+"""
+
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+from model_search import sample_candidates, search, select_candidate, usable_folds
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = np.array(['Plank', 'Squats', 'Burpees'])[(X[:, 0] > 0).astype(int) + (X[:, 1] > 1)]
+    return X, y
+
+
+def test_candidates_start_with_defaults_and_are_reproducible():
+    space = {'num_leaves': [7, 15, 31], 'learning_rate': [0.05, 0.1]}
+    candidates = sample_candidates(space, count=4, seed=1)
+    assert candidates[0] == {}
+    assert len(candidates) == 4 and len({str(c) for c in candidates}) == 4
+    assert candidates == sample_candidates(space, count=4, seed=1)
+    # Asking for more than the grid holds returns the whole grid
+    assert len(sample_candidates(space, count=50)) == 1 + 6
+
+
+def test_folds_shrink_to_the_rarest_class():
+    assert usable_folds(np.array(['a'] * 10 + ['b'] * 3), 5) == 3
+    assert usable_folds(np.array(['a'] * 10 + ['b'] * 10), 5) == 5
+
+
+def test_search_results_with_early_stopping(data):
+    X, y = data
+    candidates = [{}, {'num_leaves': 4, 'learning_rate': 0.3}]
+    results = search(X, y, candidates, folds=3, workers=1, early_stopping_rounds=5, max_estimators=300)
+
+    assert [r['index'] for r in results] == [0, 1]
+    for result in results:
+        assert result['accuracy'] > 0.85
+        assert len(result['fold_iterations']) == 3
+        # Early stopping ends well before max_estimators on this easy problem
+        assert result['n_estimators'] < 300
+        assert result['trees'] == result['fold_iterations'][-1] * 3
+        assert result['booster_us'] > 0 and result['compiled_us'] > 0
+        assert list(result['classes']) == ['Burpees', 'Plank', 'Squats']
+
+    # The saved last-fold model predicts the same classes the search scored
+    booster = lgb.Booster(model_str=results[1]['model'])
+    assert booster.num_trees() == results[1]['trees']
+    assert results[1]['leaves'] <= 4 * results[1]['trees']
+
+
+def test_process_pool_matches_serial_search(data):
+    X, y = data
+    candidates = sample_candidates({'num_leaves': [4, 8], 'min_child_samples': [5, 20]}, count=3)
+    settings = {'folds': 3, 'early_stopping_rounds': 5, 'max_estimators': 100, 'threads': 1, 'measure': False}
+    serial = search(X, y, candidates, workers=1, **settings)
+    pooled = search(X, y, candidates, workers=2, **settings)
+    assert [(r['accuracy'], r['fold_iterations'], r['model']) for r in pooled] == \
+        [(r['accuracy'], r['fold_iterations'], r['model']) for r in serial]
+
+
+def test_selection_trades_accuracy_for_latency():
+    results = [
+        {'index': 0, 'accuracy': 0.90, 'booster_us': 100.0},
+        {'index': 1, 'accuracy': 0.93, 'booster_us': 400.0},
+        {'index': 2, 'accuracy': 0.92, 'booster_us': 150.0}
+    ]
+    assert select_candidate(results)['index'] == 1
+    assert select_candidate(results, accuracy_tolerance=0.015)['index'] == 2
+    assert select_candidate(results, max_latency_us=200)['index'] == 2
+    # Nothing is fast enough: take the fastest
+    assert select_candidate(results, max_latency_us=50)['index'] == 0
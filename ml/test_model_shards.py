@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+test_model_shards.py
+Tests for per-Workout_Type model shards and their LRU registry.
+
+The registry is exercised with a fake loader and clock; the end-to-end tests
+add two shards to conftest.py's synthetic artifact directory (one knowing fewer exercises
+than the global model) and check that profiles are routed to, and scored
+exactly like, the shard of their Workout_Type, by score_profiles and by
+both the Flask and ASGI /predict.
+
+Usage:
+    python3 -m pytest test_model_shards.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+from artifacts import BoosterPredictor, load_artifacts
+from conftest import TRAINING_COLUMNS
+from metrics import Metrics
+from model_shards import ShardRegistry, write_shards
+from recommender import score_profiles, shard_for
+from tree_engine import CompiledForest
+
+
+PROFILE = {
+    'Age': 30,
+    'Gender': 'Male',
+    'Weight (kg)': 75,
+    'Height (m)': 1.75,
+    'Fat_Percentage': 18,
+    'Experience_Level': 2,
+    'Workout_Frequency (days/week)': 4,
+    'Workout_Type': 'Strength',
+    'diet_type': 'Keto',
+    'meal_type': 'Dinner'
+}
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Calls asgi_app.app directly, returning (status, JSON body)
+ASGI_CLIENT = '''
+import asyncio, json, sys, time
+import asgi_app
+from app import app
+
+async def asgi_call(method, path, body=b''):
+    sent = []
+    async def receive():
+        return {'type': 'http.request', 'body': body}
+    async def send(message):
+        sent.append(message)
+    await asgi_app.app({'type': 'http', 'method': method, 'path': path, 'headers': []}, receive, send)
+    return [sent[0]['status'], json.loads(sent[1]['body'])]
+'''
+
+# Posts each profile read from stdin to the Flask and ASGI /predict of one process
+PREDICT_BOTH = ASGI_CLIENT + '''
+async def asgi_predict(body):
+    return await asgi_call('POST', '/predict', body)
+
+client = app.test_client()
+for profile in json.load(sys.stdin):
+    body = json.dumps(profile).encode()
+    flask = client.post('/predict', data=body, content_type='application/json')
+    print(json.dumps({'flask': [flask.status_code, flask.get_json()], 'asgi': asyncio.run(asgi_predict(body))}))
+'''
+
+# Seconds until a /health sent 0.1 s after a /predict whose shard takes 1 s to load,
+# and until that /predict, are answered
+COLD_SHARD_HEALTH = ASGI_CLIENT + '''
+registry = asgi_app.api.reloader.current.shards
+load = registry._loader
+
+def slow_load(directory, info):
+    time.sleep(1.0)
+    return load(directory, info)
+
+registry._loader = slow_load
+
+async def timed(started, *request):
+    status, _ = await asgi_call(*request)
+    return status, time.perf_counter() - started
+
+async def main(body):
+    started = time.perf_counter()
+    predict = asyncio.ensure_future(timed(started, 'POST', '/predict', body))
+    await asyncio.sleep(0.1)
+    health = await timed(started, 'GET', '/health')
+    print(json.dumps({'health': health, 'predict': await predict}))
+
+asyncio.run(main(sys.stdin.read().encode()))
+'''
+
+
+def shard(model, rows=300):
+    return {'forest': CompiledForest.from_booster(model.booster_, model.classes_), 'booster': model.booster_,
+            'rows': rows}
+
+
+@pytest.fixture(scope='module')
+def artifact_dir(artifact_dir, fit_classifier, exercise_names):
+    """conftest.py's artifact directory plus two shards, the Cardio one knowing only three exercises."""
+    write_shards(os.path.join(artifact_dir, 'model_shards'),
+                 {'Strength': shard(fit_classifier(exercise_names, 1)),
+                  'Cardio': shard(fit_classifier(exercise_names[:3], 2))}, TRAINING_COLUMNS)
+    return artifact_dir
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fake_registry(tmp_path, fit_classifier, names, capacity, fail=()):
+    write_shards(str(tmp_path / 'model_shards'),
+                 {name: shard(fit_classifier(['a', 'b'], i), rows=100 + i) for i, name in enumerate(names)},
+                 TRAINING_COLUMNS)
+    clock = FakeClock()
+    loaded = []
+
+    def loader(directory, info):
+        clock.now += 0.02
+        if os.path.basename(directory) in fail:
+            raise OSError('corrupt shard')
+        loaded.append(os.path.basename(directory))
+        return {'directory': directory, 'rows': info['rows']}
+
+    return ShardRegistry(str(tmp_path / 'model_shards'), loader, capacity=capacity, clock=clock), loaded
+
+
+def test_registry_loads_on_first_use_and_evicts_least_recently_used(tmp_path, fit_classifier):
+    registry, loaded = fake_registry(tmp_path, fit_classifier, ['Cardio', 'HIIT', 'Strength'], capacity=2)
+    assert loaded == []
+
+    assert registry.get('Cardio')['rows'] == 100
+    registry.get('HIIT')
+    registry.get('Cardio')
+    registry.get('Strength')          # evicts HIIT, the least recently used
+    registry.get('HIIT')              # loaded again, evicting Cardio
+    assert loaded == ['cardio', 'hiit', 'strength', 'hiit']
+
+    stats = registry.stats()
+    assert stats['resident'] == ['Strength', 'HIIT']
+    assert (stats['hits'], stats['loads'], stats['evictions']) == (1, 4, 2)
+    assert registry.load_seconds.count == 4
+    assert stats['load_seconds_total'] == pytest.approx(0.08)
+
+
+def test_routing_ignores_case_and_counts_fallbacks(tmp_path, fit_classifier):
+    registry, _ = fake_registry(tmp_path, fit_classifier, ['Cardio', 'HIIT'], capacity=2)
+    assert registry.route(' cardio ') == 'Cardio'
+    assert registry.route('hiit') == 'HIIT'
+    assert registry.route('Flexibility') is None
+    assert registry.route(None) is None
+    assert registry.stats()['fallbacks'] == 2
+    assert registry.describe()['workout_types']['HIIT'] == {'rows': 101, 'classes': 2, 'trees': 10}
+
+
+def test_failed_shard_is_not_retried(tmp_path, fit_classifier, capsys):
+    registry, loaded = fake_registry(tmp_path, fit_classifier, ['Cardio', 'Yoga'], capacity=2, fail={'yoga'})
+    assert registry.get('Yoga') is None
+    assert registry.get('Yoga') is None
+    assert registry.get('Cardio') is not None
+    stats = registry.stats()
+    assert (stats['loads'], stats['load_errors'], stats['fallbacks']) == (1, 1, 2)
+    assert stats['failed'] == {'Yoga': 'corrupt shard'}
+    assert "Model shard 'Yoga' failed to load" in capsys.readouterr().out
+
+    text = Metrics().render(shards=registry)
+    assert 'ml_shard_events_total{event="load_errors"} 1' in text
+    assert 'ml_shards_resident 1' in text
+    assert 'ml_shard_load_duration_seconds_count 1' in text
+
+
+@pytest.mark.parametrize('engine', ['booster', 'compiled'])
+def test_profiles_are_scored_by_their_shard(artifact_dir, engine):
+    artifacts = load_artifacts(artifact_dir, engine=engine)
+    assert artifacts.version.endswith('+' + artifacts.shards.version)
+
+    scorer, name = shard_for(artifacts, dict(PROFILE, Workout_Type='strength'))
+    assert name == 'Strength' and scorer is not artifacts
+    X = np.random.default_rng(3).normal(size=(20, len(TRAINING_COLUMNS)))
+    booster = lgb.Booster(model_file=os.path.join(artifact_dir, 'model_shards', 'strength', 'booster.txt'))
+    expected = BoosterPredictor(booster, scorer.classes).predict_proba(X)
+    assert np.allclose(scorer.predictor.predict_proba(X), expected, atol=1e-9)
+
+    assert shard_for(artifacts, dict(PROFILE, Workout_Type='Flexibility')) == (artifacts, None)
+    assert shard_for(artifacts, {k: v for k, v in PROFILE.items() if k != 'Workout_Type'}) == (artifacts, None)
+
+
+def test_score_profiles_groups_by_shard_and_clamps_recommendations(artifact_dir):
+    artifacts = load_artifacts(artifact_dir, engine='compiled')
+    profiles = [dict(PROFILE, Workout_Type=workout_type) for workout_type in ['Strength', 'Cardio', 'Yoga']]
+    results = score_profiles(artifacts, profiles, num_recommendations=5)
+
+    # The Cardio shard only knows three exercises; Yoga has no shard and uses the global model
+    assert [len(result['exercise_recommendations']) for result in results] == [5, 3, 5]
+    for profile, result in zip(profiles, results):
+        scorer, _ = shard_for(artifacts, profile)
+        assert result == score_profiles(scorer, [profile], num_recommendations=5)[0]
+    assert artifacts.shards.stats()['loads'] == 2
+
+
+def test_shards_can_be_disabled_and_must_match_the_model_columns(artifact_dir, tmp_path, fit_classifier):
+    assert load_artifacts(artifact_dir, use_shards=False).shards is None
+
+    model = fit_classifier(['a', 'b'])
+    os.symlink(os.path.join(artifact_dir, 'model_bundle'), tmp_path / 'model_bundle')
+    write_shards(str(tmp_path / 'model_shards'), {'Cardio': shard(model)}, TRAINING_COLUMNS[:-1] + ['Gender_Other'])
+    with pytest.raises(ValueError, match='other columns'):
+        load_artifacts(str(tmp_path))
+
+
+def test_rewriting_shards_keeps_an_open_registry_on_its_version(tmp_path, fit_classifier):
+    registry, loaded = fake_registry(tmp_path, fit_classifier, ['Cardio', 'HIIT'], capacity=2)
+    fake_registry(tmp_path, fit_classifier, ['Strength'], capacity=2)
+
+    assert os.readlink(tmp_path / 'model_shards') == 'model_shards.v2'
+    assert registry.get('HIIT') is not None
+    assert loaded == ['hiit'] and 'model_shards.v1' in registry.directory
+
+
+def test_flask_and_asgi_predict_route_to_the_same_shard(artifact_dir):
+    profiles = [dict(PROFILE, Workout_Type=workout_type, num_recommendations=5, model_variant='full')
+                for workout_type in ['Strength', 'cardio', 'Yoga']]
+    env = dict(os.environ, ARTIFACT_DIR=artifact_dir, CACHE_SIZE='0', ARTIFACT_WATCH_INTERVAL='0')
+    run = subprocess.run([sys.executable, '-c', PREDICT_BOTH], input=json.dumps(profiles),
+                         cwd=HERE, env=env, capture_output=True, text=True, check=True)
+    answers = [json.loads(line) for line in run.stdout.splitlines() if line.startswith('{')]
+
+    assert [len(answer['asgi'][1]['exercise_recommendations']) for answer in answers] == [5, 3, 5]
+    for answer in answers:
+        assert answer['asgi'][0] == answer['flask'][0] == 200
+        assert answer['asgi'][1] == answer['flask'][1]
+
+
+def test_asgi_cold_shard_load_does_not_block_health(artifact_dir):
+    env = dict(os.environ, ARTIFACT_DIR=artifact_dir, CACHE_SIZE='0', ARTIFACT_WATCH_INTERVAL='0',
+               MICROBATCH_WINDOW_MS='0')
+    run = subprocess.run([sys.executable, '-c', COLD_SHARD_HEALTH], input=json.dumps(PROFILE),
+                         cwd=HERE, env=env, capture_output=True, text=True, check=True)
+    timings = json.loads([line for line in run.stdout.splitlines() if line.startswith('{')][-1])
+
+    assert timings['predict'][0] == timings['health'][0] == 200
+    assert timings['predict'][1] >= 1.0
+    assert timings['health'][1] < 0.6
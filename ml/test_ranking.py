@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+test_ranking.py
+Tests for argpartition-based top-k selection.
+
+Usage:
+    python3 -m pytest test_ranking.py
+"""
+
+import numpy as np
+import pytest
+
+from ranking import top_k_indices
+
+
+def sorted_top_k(row, k):
+    return [index for index, _ in sorted(enumerate(row), key=lambda x: x[1], reverse=True)[:k]]
+
+
+@pytest.mark.parametrize('k', [1, 4, 55])
+def test_matches_full_sort(k):
+    probabilities = np.random.default_rng(0).dirichlet(np.ones(55), size=20)
+    top = top_k_indices(probabilities, k)
+    assert top.shape == (20, k)
+    for row, indices in zip(probabilities, top):
+        assert indices.tolist() == sorted_top_k(row, k)
+    np.testing.assert_array_equal(top_k_indices(probabilities[0], k), top[0])
+
+
+def test_ties_keep_class_order():
+    assert top_k_indices(np.array([0.2, 0.5, 0.2, 0.1]), 3).tolist() == [1, 0, 2]
+
+
+@pytest.mark.parametrize('k', [0, 5])
+def test_rejects_k_outside_class_count(k):
+    with pytest.raises(ValueError):
+        top_k_indices(np.full(4, 0.25), k)
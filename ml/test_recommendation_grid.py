@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+test_recommendation_grid.py
+Tests for the precomputed top-k recommendation grid.
+
+A small synthetic model is scored over a small grid; every cell must hold
+exactly what live inference returns for the cell's representative profile,
+profiles outside the grid must fall back to live scoring, and the grid must
+survive a bundle round trip.
+
+Usage:
+    python3 -m pytest test_recommendation_grid.py
+"""
+
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from artifact_bundle import write_bundle
+from artifacts import BoosterPredictor, load_artifacts, warm_up
+from conftest import TRAINING_COLUMNS
+from fast_model import truncate
+from features import build_features
+from ranking import top_k_indices
+from recommendation_grid import RecommendationGrid, grid_agreement
+from recommender import grid_answer, score_profiles
+from tree_engine import CompiledForest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+AXES = {
+    'Age': (20, 60, 10),
+    'Weight (kg)': (50, 110, 20),
+    'Height (m)': (1.6, 1.9, 0.1),
+    'Fat_Percentage': (10, 30, 10),
+    'Experience_Level': (1, 3, 1),
+    'Workout_Frequency (days/week)': (1, 7, 2)
+}
+
+PROFILE = {
+    'Age': 30,
+    'Gender': 'Male',
+    'Weight (kg)': 70,
+    'Height (m)': 1.7,
+    'Fat_Percentage': 20,
+    'Experience_Level': 2,
+    'Workout_Frequency (days/week)': 3
+}
+
+
+@pytest.fixture(scope='module')
+def model(fit_model, exercise_names):
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.uniform(18, 65, 400), rng.uniform(45, 120, 400), rng.uniform(1.55, 1.95, 400),
+        rng.uniform(18, 40, 400), rng.uniform(8, 35, 400), rng.integers(1, 4, 400),
+        rng.integers(1, 8, 400), rng.integers(0, 2, 400)
+    ])
+    return fit_model(X, exercise_names[rng.integers(0, 6, 400)])
+
+
+@pytest.fixture(scope='module')
+def grid(model):
+    predictor = BoosterPredictor(model.booster_, model.classes_)
+    return RecommendationGrid.build(predictor, TRAINING_COLUMNS, axes=AXES, top_k=3, chunk_size=100)
+
+
+def live_top(model, feature_data, k):
+    probabilities = model.booster_.predict(
+        np.array([[feature_data[column] if column != 'Gender_Male' else feature_data['Gender'] == 'Male'
+                   for column in TRAINING_COLUMNS]], dtype=np.float64)
+    )[0]
+    return top_k_indices(probabilities, k), probabilities
+
+
+def test_grid_points_match_live_inference(model, grid):
+    assert grid.shape == (5, 4, 4, 3, 3, 4, 2)
+    assert len(grid) == 5 * 4 * 4 * 3 * 3 * 4 * 2
+    assert grid.top_indices.dtype == np.uint8
+    assert grid.nbytes == len(grid) * 3 * (1 + 2)
+
+    for age in (20, 40, 60):
+        for gender in ('Male', 'Female'):
+            feature_data, _ = build_features(dict(PROFILE, Age=age, Gender=gender))
+            top, probabilities = grid.lookup(feature_data, 3)
+            expected_top, expected = live_top(model, feature_data, 3)
+            assert top.tolist() == expected_top.tolist()
+            np.testing.assert_allclose(probabilities[top], expected[top], rtol=1e-3)
+
+
+def test_profiles_snap_to_the_nearest_cell(grid):
+    on_grid, _ = build_features(PROFILE)
+    nearby, _ = build_features(dict(PROFILE, Age=33, **{'Weight (kg)': 74.9, 'Height (m)': 1.74}))
+    assert grid.cell(nearby) == grid.cell(on_grid)
+
+    other, _ = build_features(dict(PROFILE, Gender='Other'))
+    female, _ = build_features(dict(PROFILE, Gender='Female'))
+    assert grid.cell(other) == grid.cell(female) != grid.cell(on_grid)
+
+
+def test_profiles_outside_the_grid_fall_back(grid):
+    for overrides in ({'Age': 80}, {'Height (m)': 1.4}, {'Experience_Level': 2.04},
+                      {'Workout_Frequency (days/week)': 2}):
+        feature_data, _ = build_features(dict(PROFILE, **overrides))
+        assert grid.lookup(feature_data, 3) is None
+
+    feature_data, _ = build_features(PROFILE)
+    assert grid.lookup(feature_data, 4) is None
+    assert len(grid.lookup(feature_data, 2)[0]) == 2
+
+
+def test_agreement_report(model, grid):
+    predictor = BoosterPredictor(model.booster_, model.classes_)
+    rows = [build_features(dict(PROFILE, Age=age))[0] for age in (20, 30, 40, 90)]
+    report = grid_agreement(grid, predictor, TRAINING_COLUMNS, rows)
+    assert report['coverage'] == 0.75
+    assert report['top1_agreement'] == 1.0
+    assert report['topk_exact'] == 1.0
+    assert report['confidence_mae'] < 1e-3
+
+
+def test_bundle_round_trip_and_scoring(model, grid, tmp_path):
+    exercise_kb = joblib.load(os.path.join(HERE, 'knowledge_base.joblib'))
+    diet_kb = joblib.load(os.path.join(HERE, 'diet_knowledge_base.joblib'))
+    forest = CompiledForest.from_booster(model.booster_, model.classes_)
+    write_bundle(str(tmp_path / 'model_bundle'), forest, TRAINING_COLUMNS, exercise_kb, diet_kb,
+                 model.booster_, grid=grid)
+
+    artifacts = load_artifacts(str(tmp_path), engine='compiled', artifact_format='bundle')
+    warm_up(artifacts)
+    assert artifacts.describe()['grid'] == grid.describe()
+    np.testing.assert_array_equal(artifacts.grid.top_indices, grid.top_indices)
+
+    live = load_artifacts(str(tmp_path), engine='compiled', artifact_format='bundle', use_grid=False)
+    assert live.grid is None
+
+    profiles = [PROFILE, dict(PROFILE, Age=90)]
+    from_grid = score_profiles(artifacts, profiles, 3)
+    scored_live = score_profiles(live, profiles, 3)
+    assert from_grid[1] == scored_live[1]
+    assert [r['exercise_name'] for r in from_grid[0]['exercise_recommendations']] == \
+        [r['exercise_name'] for r in scored_live[0]['exercise_recommendations']]
+
+
+def test_grid_only_answers_full_model_requests(model, grid, tmp_path):
+    exercise_kb = joblib.load(os.path.join(HERE, 'knowledge_base.joblib'))
+    diet_kb = joblib.load(os.path.join(HERE, 'diet_knowledge_base.joblib'))
+    fast_booster = truncate(model.booster_, 3)
+    write_bundle(str(tmp_path / 'model_bundle'), CompiledForest.from_booster(model.booster_, model.classes_),
+                 TRAINING_COLUMNS, exercise_kb, diet_kb, model.booster_, grid=grid,
+                 fast={'forest': CompiledForest.from_booster(fast_booster, model.classes_), 'booster': fast_booster})
+
+    artifacts = load_artifacts(str(tmp_path), engine='compiled', artifact_format='bundle', model_variant='fast')
+    feature_data, _ = build_features(PROFILE)
+    assert grid_answer(artifacts, feature_data, 3) is None
+    assert grid_answer(artifacts, feature_data, 3, 'fast') is None
+    assert grid_answer(artifacts, feature_data, 3, 'full') is not None
+
+    # Fast-variant requests get the fast model's answer, not the grid's
+    live = load_artifacts(str(tmp_path), engine='compiled', artifact_format='bundle', use_grid=False)
+    assert score_profiles(artifacts, [PROFILE], 3, 'fast') == score_profiles(live, [PROFILE], 3, 'fast')
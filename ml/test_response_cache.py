@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+test_response_cache.py
+Tests for the quantized-profile response cache.
+
+Usage:
+    python3 -m pytest test_response_cache.py
+"""
+
+from conftest import TRAINING_COLUMNS
+from response_cache import ProfileKeyBuilder, ResponseCache
+
+
+PROFILE = {
+    'Age': 30,
+    'Gender': 'Male',
+    'Weight (kg)': 75.04,
+    'Height (m)': 1.752,
+    'Fat_Percentage': 18.01,
+    'Experience_Level': 2,
+    'Workout_Frequency (days/week)': 4,
+    'diet_type': 'Keto',
+    'meal_type': 'Lunch'
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_nearby_profiles_share_a_key():
+    keys = ProfileKeyBuilder(TRAINING_COLUMNS)
+    key, profile = keys.canonicalize(PROFILE)
+    other_key, _ = keys.canonicalize(dict(PROFILE, **{'Weight (kg)': 74.96, 'Height (m)': 1.748}))
+    assert key == other_key
+    assert profile['Weight (kg)'] == 75.0
+    assert profile['Height (m)'] == 1.75
+    assert PROFILE['Weight (kg)'] == 75.04
+
+
+def test_key_tracks_model_inputs_and_diet():
+    keys = ProfileKeyBuilder(TRAINING_COLUMNS)
+    key, _ = keys.canonicalize(PROFILE)
+    assert keys.canonicalize(dict(PROFILE, Gender='Female'))[0] != key
+    assert keys.canonicalize(dict(PROFILE, meal_type='Dinner'))[0] != key
+    # Genders without a dummy column encode identically, so they share a key
+    assert keys.canonicalize(dict(PROFILE, Gender='Female'))[0] == keys.canonicalize(dict(PROFILE, Gender='Other'))[0]
+    # Fields the model never sees do not split the cache
+    assert keys.canonicalize(dict(PROFILE, Workout_Type='Cardio'))[0] == key
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_size=2, ttl=60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_expiry_and_counters():
+    clock = FakeClock()
+    cache = ResponseCache(max_size=10, ttl=5, clock=clock)
+    cache.put('a', 1)
+    clock.now = 4.9
+    assert cache.get('a') == 1
+    clock.now = 5.0
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations'], stats['size']) == (1, 1, 1, 0)
+
+
+def test_version_change_invalidates():
+    cache = ResponseCache(max_size=10, ttl=60)
+    cache.set_version('v1')
+    cache.put('a', 1)
+    cache.set_version('v1')
+    assert cache.get('a') == 1
+    cache.set_version('v2')
+    assert cache.get('a') is None
+
+
+def test_put_from_previous_version_is_dropped():
+    cache = ResponseCache(max_size=10)
+    cache.set_version('v2')
+    cache.put('a', 1, version='v1')
+    cache.put('b', 2, version='v2')
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+
+
+def test_zero_size_disables():
+    cache = ResponseCache(max_size=0)
+    cache.put('a', 1)
+    assert not cache.enabled
+    assert cache.get('a') is None
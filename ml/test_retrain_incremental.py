@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+test_retrain_incremental.py
+Tests for continuing the trained classifier on new rows.
+
+Usage:
+    python3 -m pytest test_retrain_incremental.py
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import log_loss
+
+from conftest import TRAINING_COLUMNS
+from retrain_incremental import continue_boosting, encode, probabilities
+from tree_engine import CompiledForest
+
+
+
+def rows(count, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Age': rng.integers(18, 65, count),
+        'Gender': rng.choice(['Male', 'Female'], count),
+        'Weight (kg)': rng.uniform(45, 120, count),
+        'Height (m)': rng.uniform(1.55, 1.95, count),
+        'BMI': rng.uniform(18, 40, count),
+        'Fat_Percentage': rng.uniform(8, 35, count),
+        'Experience_Level': rng.integers(1, 4, count).astype(float),
+        'Workout_Frequency (days/week)': rng.integers(1, 8, count)
+    })
+    labels = np.where(df['Age'] > 40, 'Plank', np.where(df['Gender'] == 'Male', 'Squats', 'Burpees'))
+    return df, labels
+
+
+def test_encode_matches_training_layout():
+    df, _ = rows(20, 0)
+    expected = pd.get_dummies(df, columns=['Gender'], drop_first=True)
+    np.testing.assert_array_equal(encode(df, TRAINING_COLUMNS), expected[TRAINING_COLUMNS].to_numpy(dtype=np.float64))
+    # One gender only: the missing dummy column is filled with zeros
+    assert encode(df[df['Gender'] == 'Female'], TRAINING_COLUMNS)[:, -1].sum() == 0
+
+
+def test_continued_model_keeps_classes_and_improves_on_new_rows(fit_model):
+    old, old_labels = rows(400, 1)
+    model = fit_model(pd.get_dummies(old, columns=['Gender'], drop_first=True)[TRAINING_COLUMNS], old_labels)
+    trees = model.booster_.num_trees()
+
+    # New rows where the rule has shifted, with only two of the three classes
+    new, _ = rows(300, 2)
+    new_labels = np.where(new['Age'] > 30, 'Plank', 'Squats')
+    X = encode(new, TRAINING_COLUMNS)
+    class_index = {name: i for i, name in enumerate(model.classes_)}
+    labels = np.array([class_index[name] for name in new_labels])
+    loss_before = log_loss(labels, probabilities(model, X), labels=range(3))
+    accuracy_before = np.mean(probabilities(model, X).argmax(axis=1) == labels)
+
+    model = continue_boosting(model, X, labels, rounds=50)
+    assert list(model.classes_) == ['Burpees', 'Plank', 'Squats'] and model.n_classes_ == 3
+    assert model.booster_.num_trees() == trees + 50 * 3
+    assert log_loss(labels, probabilities(model, X), labels=range(3)) < loss_before
+    assert np.mean(probabilities(model, X).argmax(axis=1) == labels) > accuracy_before
+    # The sklearn wrapper and the compiled engine see the continued booster
+    np.testing.assert_allclose(model.predict_proba(pd.DataFrame(X, columns=TRAINING_COLUMNS)), probabilities(model, X))
+    np.testing.assert_allclose(CompiledForest.from_booster(model.booster_, model.classes_).predict_proba(X),
+                               probabilities(model, X), atol=1e-12)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+test_score_bulk.py
+Tests for the offline bulk scorer.
+
+A small synthetic model bundled with the shipped knowledge bases (the
+artifact_dir fixture in conftest.py) is scored; the scorer's output must be in input order, identical with and without worker
+processes, and match score_profiles() for the same profiles and model variant.
+
+Usage:
+    python3 -m pytest test_score_bulk.py
+"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import joblib
+import lightgbm as lgb
+import pytest
+
+from artifact_bundle import write_bundle
+from artifacts import load_artifacts
+from conftest import TRAINING_COLUMNS
+from recommender import score_profiles
+from tree_engine import CompiledForest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROFILE = {
+    'Age': 30,
+    'Gender': 'Male',
+    'Weight (kg)': 75,
+    'Height (m)': 1.75,
+    'Fat_Percentage': 18,
+    'Experience_Level': 2,
+    'Workout_Frequency (days/week)': 4,
+    'diet_type': 'Keto',
+    'meal_type': 'Dinner'
+}
+
+
+def profiles(count):
+    rows = []
+    for i in range(count):
+        rows.append(dict(PROFILE, user_id=f'u{i}', Age=20 + i % 40, **{'Weight (kg)': 60 + i % 50}))
+    del rows[3]['Age']
+    rows[1]['Gender'] = 'Female'
+    return rows
+
+
+def run_scorer(artifact_dir, input_path, workers, *extra):
+    output = subprocess.run(
+        [sys.executable, os.path.join(HERE, 'score_bulk.py'), input_path, '-',
+         '--workers', str(workers), '--chunk-size', '7', '--artifact-dir', artifact_dir,
+         '--engine', 'compiled', *extra],
+        capture_output=True, text=True, check=True
+    )
+    return [json.loads(line) for line in output.stdout.splitlines()]
+
+
+def test_ndjson_output_is_ordered_and_matches_score_profiles(artifact_dir, tmp_path):
+    rows = profiles(40)
+    input_path = tmp_path / 'profiles.ndjson'
+    with open(input_path, 'w') as f:
+        for i, row in enumerate(rows):
+            f.write('{not json\n' if i == 10 else json.dumps(row) + '\n')
+
+    in_process = run_scorer(artifact_dir, str(input_path), 0)
+    pooled = run_scorer(artifact_dir, str(input_path), 2)
+    assert pooled == in_process
+    assert [line['row'] for line in pooled] == list(range(40))
+
+    artifacts = load_artifacts(artifact_dir, engine='compiled', artifact_format='bundle')
+    expected = score_profiles(artifacts, rows)
+    for i, line in enumerate(pooled):
+        if i == 10:
+            assert not line['success'] and line['error'].startswith('Invalid JSON')
+            continue
+        assert line.pop('row') == i
+        assert line.pop('user_id') == f'u{i}'
+        assert line == json.loads(json.dumps(expected[i]))
+    assert pooled[3]['error'] == "Missing required field: 'Age'"
+
+
+def test_csv_input_uses_defaults_for_empty_cells(artifact_dir, tmp_path):
+    rows = profiles(5)
+    input_path = tmp_path / 'profiles.csv'
+    fields = list(PROFILE) + ['user_id']
+    with open(input_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row, meal_type=''))
+
+    lines = run_scorer(artifact_dir, str(input_path), 1, '--num-recommendations', '2')
+    assert [line['user_id'] for line in lines] == [f'u{i}' for i in range(5)]
+    scored = [line for line in lines if line['success']]
+    assert len(scored) == 4
+    for line in scored:
+        assert len(line['exercise_recommendations']) == 2
+        assert line['diet_suggestion']['meal_type'] == 'Lunch'
+
+
+def test_model_variant_defaults_to_fast_like_the_api(tmp_path, fit_classifier, exercise_names):
+    model = fit_classifier(exercise_names)
+    fast_booster = lgb.Booster(model_str=model.booster_.model_to_string(num_iteration=2))
+    fast = {'forest': CompiledForest.from_booster(fast_booster, model.classes_), 'booster': fast_booster,
+            'report': {'method': 'truncated', 'iterations': 2}}
+    write_bundle(str(tmp_path / 'model_bundle'), CompiledForest.from_booster(model.booster_, model.classes_),
+                 TRAINING_COLUMNS, joblib.load(os.path.join(HERE, 'knowledge_base.joblib')),
+                 joblib.load(os.path.join(HERE, 'diet_knowledge_base.joblib')), booster=model.booster_, fast=fast)
+    rows = profiles(10)
+    input_path = tmp_path / 'profiles.ndjson'
+    input_path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+
+    env = {key: value for key, value in os.environ.items() if key != 'MODEL_VARIANT'}
+    for variant, extra in [('fast', ()), ('full', ('--model-variant', 'full'))]:
+        output = subprocess.run(
+            [sys.executable, os.path.join(HERE, 'score_bulk.py'), str(input_path), '-', '--workers', '0',
+             '--artifact-dir', str(tmp_path), '--engine', 'compiled', *extra],
+            capture_output=True, text=True, check=True, env=env
+        )
+        lines = [json.loads(line) for line in output.stdout.splitlines()]
+        artifacts = load_artifacts(str(tmp_path), engine='compiled', model_variant=variant)
+        assert artifacts.default_variant == variant
+        expected = json.loads(json.dumps(score_profiles(artifacts, rows)))
+        assert [{k: v for k, v in line.items() if k not in ('row', 'user_id')} for line in lines] == expected
+
+
+@pytest.mark.parametrize('workers', [0, 1])
+def test_too_many_recommendations_fail_before_writing_output(artifact_dir, tmp_path, workers):
+    input_path = tmp_path / 'profiles.ndjson'
+    input_path.write_text(''.join(json.dumps(row) + '\n' for row in profiles(5)))
+    output_path = tmp_path / 'recommendations.ndjson'
+    run = subprocess.run(
+        [sys.executable, os.path.join(HERE, 'score_bulk.py'), str(input_path), str(output_path),
+         '--workers', str(workers), '--artifact-dir', artifact_dir, '--num-recommendations', '7'],
+        capture_output=True, text=True
+    )
+    assert run.returncode == 2
+    assert '--num-recommendations must be between 1 and 6' in run.stderr
+    assert not output_path.exists()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+test_tree_engine.py
+Parity tests for the compiled (array-based) tree inference engine.
+
+Small LightGBM models are trained on synthetic data and the compiled forest
+must reproduce predict_proba within floating-point tolerance.
+
+Usage:
+    python3 -m pytest test_tree_engine.py
+"""
+
+import numpy as np
+import pytest
+
+from tree_engine import CompiledForest
+
+TOLERANCE = 1e-9
+
+
+def synthetic_data(n_classes, rows=600, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, 6))
+    X[:, 5] = rng.integers(0, 2, rows)
+    y = np.digitize(X[:, 0] + 0.5 * X[:, 1] * X[:, 5], np.linspace(-1, 1, n_classes - 1))
+    labels = np.array([f'Exercise {i}' for i in range(n_classes)])[y]
+    return X, labels
+
+
+@pytest.mark.parametrize('n_classes', [2, 5])
+def test_probabilities_match_lightgbm(n_classes, fit_model):
+    X, y = synthetic_data(n_classes)
+    model = fit_model(X, y, n_estimators=30)
+    forest = CompiledForest.from_booster(model.booster_, model.classes_)
+
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(forest.predict_proba(X[:1]), model.predict_proba(X[:1]), rtol=0, atol=TOLERANCE)
+    assert list(forest.classes_) == list(model.classes_)
+
+
+@pytest.mark.parametrize('zero_as_missing', [False, True])
+def test_missing_value_routing(zero_as_missing, fit_model):
+    X, y = synthetic_data(4, seed=1)
+    X[::7, 1] = np.nan
+    X[::5, 2] = 0.0
+    model = fit_model(X, y, n_estimators=30, zero_as_missing=zero_as_missing)
+    forest = CompiledForest.from_booster(model.booster_, model.classes_)
+
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=TOLERANCE)
+
+
+def test_save_and_load_round_trip(tmp_path, fit_model):
+    X, y = synthetic_data(3)
+    model = fit_model(X, y, n_estimators=30)
+    forest = CompiledForest.from_booster(model.booster_, model.classes_)
+
+    path = tmp_path / 'compiled.npz'
+    forest.save(path)
+    loaded = CompiledForest.load(path)
+
+    np.testing.assert_array_equal(loaded.predict_proba(X), forest.predict_proba(X))
+    assert list(loaded.classes_) == list(model.classes_)
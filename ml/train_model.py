@@ -4,135 +4,564 @@ train_model.py
 Comprehensive training script for exercise recommendation system.
 
 This script:
-1. Loads the Final_data.csv dataset
-2. Trains a LightGBM classifier to predict exercise names based on user characteristics
+1. Loads the model columns from Final_data.csv with compact dtypes (see
+   dataset.py); DATASET_CACHE_DIR keeps a columnar copy for later runs
+2. Trains a LightGBM classifier to predict exercise names based on user
+   characteristics; with MODEL_SEARCH=1 its parameters are first chosen by a
+   cross-validated search (see model_search.py)
 3. Creates a knowledge base lookup table for exercise details (sets, reps, calories, etc.)
 4. Creates a diet knowledge base lookup table for nutrition information
-5. Saves all artifacts needed for the prediction API
+   (both in one streaming pass over the CSV, see knowledge_aggregates.py)
+5. Saves all artifacts needed for the prediction API, including an array-based
+   export of the model for the compiled inference engine and the
+   memory-mapped model_bundle/ the API loads by default
+6. Saves training_state.joblib (data checkpoint and running knowledge base
+   aggregates) so retrain_incremental.py can later train on appended rows only
+7. Optionally (PRECOMPUTE_GRID=1) precomputes the top-k exercises over a
+   quantized grid of the input space into the bundle, and reports its size
+   and agreement with live inference
+8. Optionally (FAST_MODEL=1) adds a fast model variant to the bundle that fits
+   a per-row latency budget, and reports its top-4 agreement with the full
+   model (see fast_model.py)
+9. Optionally (WORKOUT_SHARDS=1) trains one more model per Workout_Type on
+   that type's rows into model_shards/, which the API loads on first use and
+   routes each request to (see model_shards.py); types with fewer than
+   SHARD_MIN_ROWS (default 200) rows are served by the global model
+
+Every artifact stage (model, training columns, exercise KB, diet KB, training
+state, bundle, shards) is skipped when the fingerprint of its inputs - a SHA-256 of
+the CSV, the columns it uses, its settings, library versions and the source
+of the modules it runs - matches the one recorded in build_manifest.json and
+its files are unchanged since (see build_cache.py). The dataset is not
+loaded if no stage needs it. --force rebuilds every stage. The run ends with
+the time spent and saved per stage.
+
+Grid settings: GRID_TOP_K (default 4), GRID_AXES, a JSON object of
+{field: [start, stop, step]} overriding DEFAULT_AXES in recommendation_grid.py,
+and GRID_MIN_AGREEMENT (default 0.95): a grid whose top-1 answers agree with
+live inference less often than this is not saved.
+
+Search settings: SEARCH_CANDIDATES (default 12, the first being LightGBM's
+defaults), SEARCH_SPACE, a JSON object of {parameter: [values]} replacing
+DEFAULT_SEARCH_SPACE, SEARCH_FOLDS (default 5), SEARCH_WORKERS (default: one
+per core), EARLY_STOPPING_ROUNDS (default 20), MAX_ESTIMATORS (default 500),
+SEARCH_MAX_LATENCY_US (skip candidates slower than this per row with
+INFERENCE_ENGINE) and SEARCH_ACCURACY_TOLERANCE (default 0: take the fastest
+candidate within this much CV accuracy of the best). Every candidate is
+logged and written to model_search.json.
+
+Fast variant settings: FAST_MODEL_BUDGET_US (default 200, single-row
+predict_proba time with INFERENCE_ENGINE), FAST_MODEL_LEAVES (default 7,15:
+student sizes to distill), FAST_MODEL_ITERATIONS (default 5,10,20,40:
+boosting rounds to keep) and FAST_MODEL_MIN_AGREEMENT (default 0.95: least
+top-1 agreement with the full model). All candidates are logged and written
+to fast_model.json; without one inside the budget and above the agreement
+floor only the full model is saved.
 
 Usage:
     python3 train_model.py
+    python3 train_model.py --force
+    MODEL_SEARCH=1 SEARCH_WORKERS=4 python3 train_model.py
+    FAST_MODEL=1 FAST_MODEL_BUDGET_US=100 python3 train_model.py
+    DATASET_CACHE_DIR=dataset_cache python3 train_model.py
+    PRECOMPUTE_GRID=1 GRID_AXES='{"Age": [15, 65, 2.5]}' python3 train_model.py
+    WORKOUT_SHARDS=1 SHARD_MIN_ROWS=500 python3 train_model.py
 """
 
 # 1. Imports
+import argparse
+import json
+import os
+import time
+
+import numpy as np
 import pandas as pd
 import joblib
 import lightgbm as lgb
-from sklearn.model_selection import train_test_split
-
-# 2. Data Loading and Definition
-print("Loading dataset from 'Final_data.csv'...")
-df = pd.read_csv('Final_data.csv')
-print(f"Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns")
-
-# Define input features - what a user would provide
-feature_columns = [
-    'Age',
-    'Gender',
-    'Weight (kg)',
-    'Height (m)',
-    'BMI',
-    'Fat_Percentage',
-    'Experience_Level',
-    'Workout_Frequency (days/week)'
-]
-
-# Define target variable - what we want to predict
-target_column = 'Name of Exercise'
-
-# 3. Preprocessing
-print("\nPreparing features and target...")
-X = df[feature_columns].copy()
-y = df[target_column].copy()
-
-# Handle categorical 'Gender' column using one-hot encoding
-# drop_first=True to avoid multicollinearity (dummy variable trap)
-X_encoded = pd.get_dummies(X, columns=['Gender'], drop_first=True)
-
-print(f"Features shape after encoding: {X_encoded.shape}")
-print(f"Target shape: {y.shape}")
-print(f"Unique exercises to predict: {y.nunique()}")
+
+from artifact_bundle import MANIFEST_FILE, remove_published, write_bundle
+from artifacts import (BUNDLE_DIR, COMPILED_MODEL_FILE, DIET_KNOWLEDGE_BASE_FILE, KNOWLEDGE_BASE_FILE, MODEL_FILE,
+                       TRAINING_COLUMNS_FILE, TRAINING_STATE_FILE, BoosterPredictor)
+from build_cache import BuildCache, environment, file_digest, library_versions, source_digest, stage_fingerprint
+from dataset import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, MODEL_COLUMNS, TARGET_COLUMN, data_checkpoint, \
+    load_training_data
+from fast_model import FAST_ITERATIONS, FAST_LEAVES, MIN_AGREEMENT, TOP_K, fast_candidates, select_fast
+from knowledge_aggregates import (DIET_KEYS, DIET_MEANS, EXERCISE_FIRSTS, EXERCISE_KEYS, EXERCISE_MEANS,
+                                  KNOWLEDGE_COLUMNS, build_knowledge_aggregates)
+from model_shards import SHARD_COLUMN, SHARDS_DIR, SHARDS_INDEX, write_shards
+from model_search import BASE_PARAMS, DEFAULT_SEARCH_SPACE, EARLY_STOPPING_ROUNDS, MAX_ESTIMATORS, \
+    booster_latency, sample_candidates, search, select_candidate
+from recommendation_grid import DEFAULT_AXES, RecommendationGrid, grid_agreement
+from tree_engine import CompiledForest
+
+parser = argparse.ArgumentParser(description='Train the exercise model and build the API artifacts')
+parser.add_argument('--force', action='store_true',
+                    help='Rebuild every stage even if its inputs match the last build (build_manifest.json)')
+args = parser.parse_args()
+
+# 2. Stage Fingerprints
+started = time.perf_counter()
+# Every read of the CSV below stops at this checkpoint, and retrain_incremental.py continues from it
+data_state = data_checkpoint('Final_data.csv')
+data_hash = file_digest('Final_data.csv', end=data_state['offset'])
+versions = library_versions(['lightgbm', 'numpy', 'pandas', 'scikit-learn', 'joblib'])
+model_params = {'n_estimators': 100}
+model_search = os.environ.get('MODEL_SEARCH', '0') == '1'
+precompute_grid = os.environ.get('PRECOMPUTE_GRID', '0') == '1'
+fast_model = os.environ.get('FAST_MODEL', '0') == '1'
+workout_shards = os.environ.get('WORKOUT_SHARDS', '0') == '1'
+shard_min_rows = int(os.environ.get('SHARD_MIN_ROWS', 200))
+
+fingerprints = {
+    'model': stage_fingerprint({
+        'data': data_hash, 'columns': MODEL_COLUMNS, 'params': model_params, 'random_state': 42,
+        # SEARCH_WORKERS only changes how fast the search runs
+        'search': environment(['SEARCH_SPACE', 'SEARCH_CANDIDATES', 'SEARCH_FOLDS', 'EARLY_STOPPING_ROUNDS',
+                               'MAX_ESTIMATORS', 'SEARCH_MAX_LATENCY_US', 'SEARCH_ACCURACY_TOLERANCE',
+                               'INFERENCE_ENGINE']) if model_search else None,
+        'versions': versions, 'code': source_digest(['dataset.py', 'model_search.py', 'tree_engine.py'])
+    }),
+    'training_columns': stage_fingerprint({
+        'data': data_hash, 'columns': FEATURE_COLUMNS, 'encoding': 'get_dummies(Gender, drop_first=True)',
+        'versions': versions, 'code': source_digest(['dataset.py'])
+    }),
+    'exercise_kb': stage_fingerprint({
+        'data': data_hash, 'columns': EXERCISE_KEYS + EXERCISE_MEANS + EXERCISE_FIRSTS,
+        'versions': versions, 'code': source_digest(['dataset.py', 'knowledge_aggregates.py'])
+    }),
+    'diet_kb': stage_fingerprint({
+        'data': data_hash, 'columns': DIET_KEYS + DIET_MEANS,
+        'versions': versions, 'code': source_digest(['dataset.py', 'knowledge_aggregates.py'])
+    }),
+    'training_state': stage_fingerprint({
+        'data': data_hash, 'checkpoint': data_state['offset'], 'columns': KNOWLEDGE_COLUMNS,
+        'versions': versions, 'code': source_digest(['dataset.py', 'knowledge_aggregates.py'])
+    }),
+}
+fingerprints['bundle'] = stage_fingerprint({
+    'stages': dict(fingerprints),
+    'grid': environment(['GRID_TOP_K', 'GRID_AXES', 'GRID_MIN_AGREEMENT']) if precompute_grid else None,
+    'fast': environment(['FAST_MODEL_BUDGET_US', 'FAST_MODEL_LEAVES', 'FAST_MODEL_ITERATIONS', 'FAST_MODEL_MIN_AGREEMENT',
+                         'INFERENCE_ENGINE']) if fast_model else None,
+    'versions': versions,
+    'code': source_digest(['artifact_bundle.py', 'recommendation_grid.py', 'fast_model.py', 'tree_engine.py'])
+})
+if workout_shards:
+    fingerprints['shards'] = stage_fingerprint({
+        # Shards reuse the global model's parameters, searched or not
+        'data': data_hash, 'columns': MODEL_COLUMNS + [SHARD_COLUMN], 'model': fingerprints['model'],
+        'min_rows': shard_min_rows,
+        'versions': versions, 'code': source_digest(['dataset.py', 'model_shards.py', 'tree_engine.py'])
+    })
+stage_outputs = {
+    'model': [MODEL_FILE, COMPILED_MODEL_FILE] + (['model_search.json'] if model_search else []),
+    'training_columns': [TRAINING_COLUMNS_FILE],
+    'exercise_kb': [KNOWLEDGE_BASE_FILE],
+    'diet_kb': [DIET_KNOWLEDGE_BASE_FILE],
+    'training_state': [TRAINING_STATE_FILE],
+    'bundle': [os.path.join(BUNDLE_DIR, MANIFEST_FILE)],
+    'shards': [os.path.join(SHARDS_DIR, SHARDS_INDEX)],
+}
+build = BuildCache(force=args.force)
+fresh = {stage: build.fresh(stage, fingerprint, stage_outputs[stage]) for stage, fingerprint in fingerprints.items()}
+# The bundle holds the other artifacts (not the shards), so it is rebuilt whenever one of them is
+fresh['bundle'] = all(ok for stage, ok in fresh.items() if stage != 'shards')
+print(f"Fingerprinted {data_state['offset'] / 1e6:.1f} MB of Final_data.csv in {time.perf_counter() - started:.2f}s; "
+      + (f"rebuilding: {', '.join(stage for stage, ok in fresh.items() if not ok)}"
+         if not all(fresh.values()) else "every stage is up to date"))
+
+# The dataset is only needed to fit the model, list its columns, or build a grid, fast variant or shards
+need_data = not (fresh['model'] and fresh['training_columns']) or \
+    (not fresh['bundle'] and (precompute_grid or fast_model)) or (workout_shards and not fresh['shards'])
+
+# 3. Data Loading and Preprocessing
+if need_data:
+    print("\nLoading dataset from 'Final_data.csv'...")
+    started = time.perf_counter()
+    # Shards are split by Workout_Type, which the global model does not use
+    df, data_source = load_training_data('Final_data.csv',
+                                         columns=MODEL_COLUMNS + ([SHARD_COLUMN] if workout_shards else []),
+                                         categorical=CATEGORICAL_COLUMNS + [SHARD_COLUMN], end=data_state['offset'],
+                                         cache_dir=os.environ.get('DATASET_CACHE_DIR') or None)
+    data_state['rows'] = len(df)
+    print(f"Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns from {data_source} "
+          f"in {time.perf_counter() - started:.2f}s ({df.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory)")
+
+    # Define input features - what a user would provide
+    feature_columns = FEATURE_COLUMNS
+
+    # Define target variable - what we want to predict
+    target_column = TARGET_COLUMN
+
+    print("\nPreparing features and target...")
+    X = df[feature_columns].copy()
+    y = df[target_column].copy()
+
+    # Handle categorical 'Gender' column using one-hot encoding
+    # drop_first=True to avoid multicollinearity (dummy variable trap)
+    X_encoded = pd.get_dummies(X, columns=['Gender'], drop_first=True)
+
+    print(f"Features shape after encoding: {X_encoded.shape}")
+    print(f"Target shape: {y.shape}")
+    print(f"Unique exercises to predict: {y.nunique()}")
+else:
+    print("\nDataset not loaded: the model and training columns are up to date")
 
 # 4. Model Training
 print("\n" + "="*60)
 print("Training LightGBM Classification Model...")
 print("="*60)
 
-# Instantiate LightGBM Classifier
-model = lgb.LGBMClassifier(
-    random_state=42,
-    n_estimators=100,
-    verbose=-1  # Suppress training output for cleaner logs
-)
+if fresh['model']:
+    model = joblib.load(MODEL_FILE)
+    compiled_model = CompiledForest.load(COMPILED_MODEL_FILE)
+    print(f"✓ Model unchanged since the last build: loaded {MODEL_FILE} and {COMPILED_MODEL_FILE}")
+else:
+    model_started = time.perf_counter()
+
+# Optionally choose the parameters with a cross-validated search
+if model_search and not fresh['model']:
+    search_space = json.loads(os.environ['SEARCH_SPACE']) if os.environ.get('SEARCH_SPACE') else DEFAULT_SEARCH_SPACE
+    candidates = sample_candidates(search_space, count=int(os.environ.get('SEARCH_CANDIDATES', 12)))
+    latency_engine = os.environ.get('INFERENCE_ENGINE', 'booster')
+    print(f"Searching {len(candidates)} candidates with stratified "
+          f"{os.environ.get('SEARCH_FOLDS', 5)}-fold cross-validation...")
+
+    started = time.perf_counter()
+    search_results = search(
+        X_encoded, y.to_numpy(), candidates,
+        folds=int(os.environ.get('SEARCH_FOLDS', 5)),
+        workers=int(os.environ.get('SEARCH_WORKERS', 0)) or None,
+        early_stopping_rounds=int(os.environ.get('EARLY_STOPPING_ROUNDS', EARLY_STOPPING_ROUNDS)),
+        max_estimators=int(os.environ.get('MAX_ESTIMATORS', MAX_ESTIMATORS))
+    )
+    max_latency = os.environ.get('SEARCH_MAX_LATENCY_US')
+    selected = select_candidate(
+        search_results,
+        max_latency_us=float(max_latency) if max_latency else None,
+        accuracy_tolerance=float(os.environ.get('SEARCH_ACCURACY_TOLERANCE', 0.0)),
+        engine=latency_engine
+    )
+    print(f"✓ Search completed in {time.perf_counter() - started:.1f}s")
+
+    # Latency/accuracy trade-off of every candidate
+    print(f"\n  {'#':>2} {'accuracy':>15} {'log loss':>8} {'rounds':>6} {'trees':>6} {'leaves':>7} "
+          f"{'booster µs':>10} {'compiled µs':>11}  params")
+    for result in search_results:
+        marker = '*' if result is selected else ' '
+        print(f"{marker} {result['index']:>2} {result['accuracy']:>8.4f} ±{result['accuracy_std']:.4f} "
+              f"{result['log_loss']:>8.4f} {result['n_estimators']:>6} {result['trees']:>6} "
+              f"{result['leaves']:>7} {result['booster_us']:>10.0f} {result['compiled_us']:>11.0f}  "
+              f"{json.dumps(result['params']) if result['params'] else 'defaults'}")
 
-# Train the model
-model.fit(X_encoded, y)
-print("✓ Model training completed successfully!")
+    with open('model_search.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'selected': selected['index'],
+            'latency_engine': latency_engine,
+            'candidates': [{key: value for key, value in result.items() if key not in ('model', 'classes')}
+                           for result in search_results]
+        }, f, indent=2)
+    print("✓ Saved: model_search.json")
+
+    # Refit on all rows for the median number of rounds early stopping kept
+    model_params = {'subsample_freq': BASE_PARAMS['subsample_freq'], **selected['params'],
+                    'n_estimators': selected['n_estimators']}
+    print(f"Selected candidate {selected['index']}: {model_params}")
+
+if not fresh['model']:
+    # Instantiate LightGBM Classifier
+    model = lgb.LGBMClassifier(
+        random_state=42,
+        verbose=-1,  # Suppress training output for cleaner logs
+        **model_params
+    )
+
+    # Train the model
+    model.fit(X_encoded, y)
+    print("✓ Model training completed successfully!")
 
 # 5. Knowledge Base Creation
 print("\n" + "="*60)
 print("Creating Knowledge Bases...")
 print("="*60)
 
-# Part A: Exercise Knowledge Base
-print("\nPart A: Exercise Knowledge Base (Exercise Details Lookup)")
-# Group by exercise name and experience level to get personalized prescriptions
-knowledge_base = df.groupby(['Name of Exercise', 'Experience_Level']).agg({
-    'Sets': 'mean',
-    'Reps': 'mean',
-    'Burns Calories (per 30 min)': 'mean',
-    'Benefit': 'first',
-    'Equipment Needed': 'first',
-    'Target Muscle Group': 'first',
-    'Difficulty Level': 'first'
-}).reset_index()
-
-print(f"✓ Exercise knowledge base created with {len(knowledge_base)} exercise-level combinations")
-print(f"  - {knowledge_base['Name of Exercise'].nunique()} unique exercises")
-print(f"  - {knowledge_base['Experience_Level'].nunique()} experience levels")
-
-# Part B: Diet Knowledge Base
-print("\nPart B: Diet Knowledge Base (Nutrition Lookup)")
-# Group by diet type and meal type to get nutritional averages
-diet_knowledge_base = df.groupby(['diet_type', 'meal_type']).agg({
-    'Calories': 'mean',
-    'Carbs': 'mean',
-    'Proteins': 'mean',
-    'Fats': 'mean'
-}).reset_index()
-
-print(f"✓ Diet knowledge base created with {len(diet_knowledge_base)} diet-meal combinations")
-print(f"  - {diet_knowledge_base['diet_type'].nunique()} unique diet types")
-print(f"  - {diet_knowledge_base['meal_type'].nunique()} unique meal types")
+knowledge_stages = ['exercise_kb', 'diet_kb', 'training_state']
+if all(fresh[stage] for stage in knowledge_stages):
+    knowledge_base = joblib.load(KNOWLEDGE_BASE_FILE)
+    diet_knowledge_base = joblib.load(DIET_KNOWLEDGE_BASE_FILE)
+    print(f"✓ Knowledge bases unchanged since the last build: loaded {KNOWLEDGE_BASE_FILE} "
+          f"and {DIET_KNOWLEDGE_BASE_FILE}")
+else:
+    # Both knowledge bases come from one chunked pass over the CSV's knowledge base
+    # columns, so this step's memory does not grow with the dataset (see knowledge_aggregates.py)
+    started = time.perf_counter()
+    aggregates = build_knowledge_aggregates('Final_data.csv', end=data_state['offset'])
+    data_state['rows'] = aggregates.rows
+    if need_data and aggregates.rows != len(df):
+        raise RuntimeError(f"Knowledge base pass read {aggregates.rows} rows, model data has {len(df)}")
+    knowledge_seconds = time.perf_counter() - started
+    print(f"✓ Aggregated {aggregates.rows} rows in one streaming pass in {knowledge_seconds:.2f}s")
+
+    # Part A: Exercise Knowledge Base
+    print("\nPart A: Exercise Knowledge Base (Exercise Details Lookup)")
+    # Grouped by exercise name and experience level to get personalized prescriptions
+    knowledge_base = aggregates.exercise_kb()
+
+    print(f"✓ Exercise knowledge base created with {len(knowledge_base)} exercise-level combinations")
+    print(f"  - {knowledge_base['Name of Exercise'].nunique()} unique exercises")
+    print(f"  - {knowledge_base['Experience_Level'].nunique()} experience levels")
+
+    # Part B: Diet Knowledge Base
+    print("\nPart B: Diet Knowledge Base (Nutrition Lookup)")
+    # Grouped by diet type and meal type to get nutritional averages
+    diet_knowledge_base = aggregates.diet_kb()
+
+    print(f"✓ Diet knowledge base created with {len(diet_knowledge_base)} diet-meal combinations")
+    print(f"  - {diet_knowledge_base['diet_type'].nunique()} unique diet types")
+    print(f"  - {diet_knowledge_base['meal_type'].nunique()} unique meal types")
 
 # 6. Saving Artifacts
 print("\n" + "="*60)
 print("Saving Model Artifacts...")
 print("="*60)
 
-# Save the trained model
-joblib.dump(model, 'exercise_model.joblib')
-print("✓ Saved: exercise_model.joblib")
+if fresh['model']:
+    build.skipped('model')
+else:
+    # Save the trained model
+    joblib.dump(model, MODEL_FILE)
+    print(f"✓ Saved: {MODEL_FILE}")
+
+    # Export the trees as flat arrays for the compiled inference engine and
+    # check it reproduces the LightGBM probabilities
+    compiled_model = CompiledForest.from_booster(model.booster_, model.classes_)
+    X_check = X_encoded.head(1000)
+    max_diff = np.abs(
+        compiled_model.predict_proba(X_check.to_numpy(dtype=np.float64)) - model.predict_proba(X_check)
+    ).max()
+    if max_diff > 1e-9:
+        raise RuntimeError(f"Compiled model differs from LightGBM (max probability difference {max_diff:.2e})")
+    compiled_model.save(COMPILED_MODEL_FILE)
+    print(f"✓ Saved: {COMPILED_MODEL_FILE} ({compiled_model.n_trees} trees, "
+          f"max probability difference {max_diff:.2e})")
+    build.built('model', fingerprints['model'], stage_outputs['model'], time.perf_counter() - model_started)
 
 # Save the training columns (critical for API preprocessing)
-training_columns = X_encoded.columns.tolist()
-joblib.dump(training_columns, 'training_columns.joblib')
-print(f"✓ Saved: training_columns.joblib ({len(training_columns)} columns)")
+if fresh['training_columns']:
+    training_columns = joblib.load(TRAINING_COLUMNS_FILE)
+    build.skipped('training_columns')
+else:
+    started = time.perf_counter()
+    training_columns = X_encoded.columns.tolist()
+    joblib.dump(training_columns, TRAINING_COLUMNS_FILE)
+    print(f"✓ Saved: {TRAINING_COLUMNS_FILE} ({len(training_columns)} columns)")
+    build.built('training_columns', fingerprints['training_columns'], stage_outputs['training_columns'],
+                time.perf_counter() - started)
+
+# One pass builds all three; its time is split between the stages it rebuilt
+rebuilt = [stage for stage in knowledge_stages if not fresh[stage]]
+for stage in knowledge_stages:
+    if fresh[stage]:
+        build.skipped(stage)
+        continue
+    started = time.perf_counter()
+    if stage == 'exercise_kb':
+        # Save the knowledge base
+        joblib.dump(knowledge_base, KNOWLEDGE_BASE_FILE)
+        print(f"✓ Saved: {KNOWLEDGE_BASE_FILE}")
+    elif stage == 'diet_kb':
+        # Save the diet knowledge base
+        joblib.dump(diet_knowledge_base, DIET_KNOWLEDGE_BASE_FILE)
+        print(f"✓ Saved: {DIET_KNOWLEDGE_BASE_FILE}")
+    else:
+        # Running knowledge base aggregates and the data checkpoint for retrain_incremental.py
+        joblib.dump({'data': data_state, 'aggregates': aggregates}, TRAINING_STATE_FILE)
+        print(f"✓ Saved: {TRAINING_STATE_FILE} (checkpoint at row {data_state['rows']})")
+    build.built(stage, fingerprints[stage], stage_outputs[stage],
+                knowledge_seconds / len(rebuilt) + time.perf_counter() - started)
+
+if fresh['bundle']:
+    bundle_started = None
+    print(f"✓ {BUNDLE_DIR}/ unchanged since the last build")
+else:
+    bundle_started = time.perf_counter()
+
+# Optionally precompute the top-k exercises for every cell of a profile grid
+recommendation_grid = None
+if precompute_grid and not fresh['bundle']:
+    grid_axes = dict(DEFAULT_AXES)
+    grid_axes.update(json.loads(os.environ.get('GRID_AXES', '{}')))
+    predictor = BoosterPredictor(model.booster_, model.classes_)
+    started = time.perf_counter()
+    recommendation_grid = RecommendationGrid.build(
+        predictor, training_columns, axes=grid_axes, top_k=int(os.environ.get('GRID_TOP_K', 4))
+    )
+    print(f"✓ Precomputed recommendation grid: {len(recommendation_grid):,} cells "
+          f"{recommendation_grid.shape}, top {recommendation_grid.top_k}, "
+          f"{recommendation_grid.nbytes / 1e6:.2f} MB in {time.perf_counter() - started:.1f}s")
+
+    # Agreement with live inference on training profiles
+    sample = df[feature_columns].sample(min(len(df), 2000), random_state=42)
+    report = grid_agreement(recommendation_grid, predictor, training_columns, sample.to_dict('records'))
+    print(f"  - {report['coverage']:.1%} of {report['rows']} training profiles fall inside the grid")
+    if 'top1_agreement' in report:
+        print(f"  - Top-1 agreement with live inference: {report['top1_agreement']:.1%}")
+        print(f"  - Top-{recommendation_grid.top_k} overlap: {report['topk_overlap']:.1%} "
+              f"(identical lists {report['topk_exact']:.1%}), "
+              f"confidence MAE {report['confidence_mae']:.4f}")
+
+        # A coarse grid would silently change recommendations; keep serving live instead
+        min_agreement = float(os.environ.get('GRID_MIN_AGREEMENT', 0.95))
+        if report['top1_agreement'] < min_agreement:
+            print(f"❌ Grid not saved: top-1 agreement below GRID_MIN_AGREEMENT ({min_agreement:.0%}); "
+                  f"use finer GRID_AXES steps")
+            recommendation_grid = None
+
+# Optionally derive a smaller model variant that fits a per-row latency budget
+fast_variant = None
+if fast_model and not fresh['bundle']:
+    budget_us = float(os.environ.get('FAST_MODEL_BUDGET_US', 200))
+    fast_engine = os.environ.get('INFERENCE_ENGINE', 'booster')
+    fast_leaves = [int(value) for value in os.environ.get('FAST_MODEL_LEAVES', ','.join(map(str, FAST_LEAVES))).split(',')]
+    fast_iterations = [int(value) for value in
+                       os.environ.get('FAST_MODEL_ITERATIONS', ','.join(map(str, FAST_ITERATIONS))).split(',')]
+    X_all = X_encoded.to_numpy(dtype=np.float64)
+    print(f"\nBuilding fast model candidates for a {budget_us:.0f} µs/row budget ({fast_engine} engine)...")
+    started = time.perf_counter()
+    fast_results = fast_candidates(model.booster_, model.classes_, X_all, leaves=fast_leaves, iterations=fast_iterations)
+    full_latency = booster_latency(model.booster_, model.classes_, X_all)
+    fast_min_agreement = float(os.environ.get('FAST_MODEL_MIN_AGREEMENT', MIN_AGREEMENT))
+    selected_fast = select_fast(fast_results, budget_us, engine=fast_engine, min_agreement=fast_min_agreement)
+    print(f"✓ {len(fast_results)} candidates built and measured in {time.perf_counter() - started:.1f}s "
+          f"(agreement on {fast_results[0]['rows']} held-out rows)")
+
+    # Latency/agreement trade-off of every candidate against the full model
+    print(f"\n  {'method':<10} {'leaves':>6} {'rounds':>6} {'trees':>6} {'top-1':>7} {f'top-{TOP_K}':>7} "
+          f"{'exact':>7} {'booster µs':>10} {'compiled µs':>11}")
+    print(f"  {'full':<10} {model.booster_.params.get('num_leaves', 31):>6} {model.booster_.current_iteration():>6} "
+          f"{model.booster_.num_trees():>6} {1:>7.1%} {1:>7.1%} {1:>7.1%} "
+          f"{full_latency['booster_us']:>10.0f} {full_latency['compiled_us']:>11.0f}")
+    for result in fast_results:
+        marker = '*' if result is selected_fast else ' '
+        print(f"{marker} {result['method']:<10} {result['num_leaves']:>6} {result['iterations']:>6} "
+              f"{result['trees']:>6} {result['top1_agreement']:>7.1%} {result['topk_overlap']:>7.1%} "
+              f"{result['topk_exact']:>7.1%} {result['booster_us']:>10.0f} {result['compiled_us']:>11.0f}")
+
+    with open('fast_model.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'budget_us': budget_us,
+            'latency_engine': fast_engine,
+            'min_agreement': fast_min_agreement,
+            'full': full_latency,
+            'selected': fast_results.index(selected_fast) if selected_fast is not None else None,
+            'candidates': [{key: value for key, value in result.items() if key != 'booster'}
+                           for result in fast_results]
+        }, f, indent=2)
+    print("✓ Saved: fast_model.json")
+
+    if selected_fast is None and select_fast(fast_results, budget_us, engine=fast_engine) is not None:
+        # A fast variant is served by default and would silently change recommendations
+        print(f"❌ Fast model not saved: top-1 agreement below FAST_MODEL_MIN_AGREEMENT "
+              f"({fast_min_agreement:.0%}) within {budget_us:.0f} µs/row; raise FAST_MODEL_BUDGET_US "
+              f"or try more FAST_MODEL_ITERATIONS")
+    elif selected_fast is None:
+        print(f"❌ No fast model saved: no candidate within {budget_us:.0f} µs/row; "
+              f"raise FAST_MODEL_BUDGET_US or try fewer FAST_MODEL_ITERATIONS")
+    else:
+        fast_forest = CompiledForest.from_booster(selected_fast['booster'], model.classes_)
+        max_diff = np.abs(
+            fast_forest.predict_proba(X_all[:1000]) -
+            BoosterPredictor(selected_fast['booster'], model.classes_).predict_proba(X_all[:1000])
+        ).max()
+        if max_diff > 1e-9:
+            raise RuntimeError(f"Compiled fast model differs from LightGBM (max probability difference {max_diff:.2e})")
+        fast_variant = {
+            'forest': fast_forest,
+            'booster': selected_fast['booster'],
+            'report': {
+                'method': selected_fast['method'],
+                'num_leaves': selected_fast['num_leaves'],
+                'iterations': selected_fast['iterations'],
+                'budget_us': budget_us,
+                'latency_engine': fast_engine,
+                'latency_us': round(selected_fast[f'{fast_engine}_us'], 1),
+                'full_latency_us': round(full_latency[f'{fast_engine}_us'], 1),
+                'top1_agreement': round(selected_fast['top1_agreement'], 4),
+                'top4_agreement': round(selected_fast['topk_overlap'], 4),
+                'top4_exact': round(selected_fast['topk_exact'], 4)
+            }
+        }
+        print(f"✓ Fast model: {selected_fast['method']}, {selected_fast['trees']} trees, "
+              f"{selected_fast[f'{fast_engine}_us']:.0f} µs/row vs {full_latency[f'{fast_engine}_us']:.0f} µs/row, "
+              f"top-{TOP_K} agreement {selected_fast['topk_overlap']:.1%} "
+              f"(top-1 {selected_fast['top1_agreement']:.1%})")
+
+# Write the same artifacts as one versioned, memory-mappable bundle
+if fresh['bundle']:
+    build.skipped('bundle')
+else:
+    bundle_version = write_bundle(BUNDLE_DIR, compiled_model, training_columns,
+                                  knowledge_base, diet_knowledge_base, booster=model.booster_,
+                                  grid=recommendation_grid, fast=fast_variant)
+    print(f"✓ Saved: {BUNDLE_DIR}/ (version {bundle_version}"
+          f"{', with a fast model variant' if fast_variant is not None else ''})")
+    build.built('bundle', fingerprints['bundle'], stage_outputs['bundle'], time.perf_counter() - bundle_started)
+
+# Optionally train one model per Workout_Type for the API's shard registry
+if workout_shards and fresh['shards']:
+    build.skipped('shards')
+    print(f"✓ {SHARDS_DIR}/ unchanged since the last build")
+elif workout_shards:
+    print("\n" + "="*60)
+    print(f"Training Per-{SHARD_COLUMN} Model Shards...")
+    print("="*60)
 
-# Save the knowledge base
-joblib.dump(knowledge_base, 'knowledge_base.joblib')
-print("✓ Saved: knowledge_base.joblib")
+    shards_started = time.perf_counter()
+    X_shards = X_encoded[training_columns]
+    shards = {}
+    for workout_type, rows in df.groupby(SHARD_COLUMN, observed=True).groups.items():
+        X_shard = X_shards.loc[rows]
+        y_shard = y.loc[rows]
+        if len(rows) < shard_min_rows or y_shard.nunique() < 2:
+            print(f"  - {workout_type}: {len(rows)} rows, {y_shard.nunique()} exercises; "
+                  f"served by the global model (SHARD_MIN_ROWS={shard_min_rows})")
+            continue
+        started = time.perf_counter()
+        shard_model = lgb.LGBMClassifier(**model.get_params())
+        shard_model.fit(X_shard, y_shard)
+        shard_forest = CompiledForest.from_booster(shard_model.booster_, shard_model.classes_)
+        X_check = X_shard.head(1000)
+        max_diff = np.abs(
+            shard_forest.predict_proba(X_check.to_numpy(dtype=np.float64)) - shard_model.predict_proba(X_check)
+        ).max()
+        if max_diff > 1e-9:
+            raise RuntimeError(f"Compiled {workout_type} shard differs from LightGBM "
+                               f"(max probability difference {max_diff:.2e})")
+        shards[workout_type] = {'forest': shard_forest, 'booster': shard_model.booster_, 'rows': len(rows)}
+        print(f"✓ {workout_type}: {len(rows)} rows, {len(shard_model.classes_)} exercises, "
+              f"{shard_forest.n_trees} trees in {time.perf_counter() - started:.2f}s")
 
-# Save the diet knowledge base
-joblib.dump(diet_knowledge_base, 'diet_knowledge_base.joblib')
-print("✓ Saved: diet_knowledge_base.joblib")
+    shards_version = write_shards(SHARDS_DIR, shards, training_columns)
+    print(f"✓ Saved: {SHARDS_DIR}/ ({len(shards)} shards, version {shards_version})")
+    build.built('shards', fingerprints['shards'], stage_outputs['shards'], time.perf_counter() - shards_started)
+elif os.path.lexists(SHARDS_DIR):
+    # Shards left from an earlier WORKOUT_SHARDS=1 build would no longer match the global model
+    remove_published(SHARDS_DIR)
+    print(f"✓ Removed {SHARDS_DIR}/ (built without WORKOUT_SHARDS=1)")
 
 print("\n" + "="*60)
 print("Training Pipeline Complete!")
 print("="*60)
 print("\nArtifacts ready for deployment:")
 print("  1. exercise_model.joblib       - Trained LightGBM classifier")
+print("     exercise_model_compiled.npz - Same model as flat tree arrays")
 print("  2. training_columns.joblib     - Feature column names")
 print("  3. knowledge_base.joblib       - Exercise details lookup table")
 print("  4. diet_knowledge_base.joblib  - Diet nutrition lookup table")
+print("  model_bundle/                  - All of the above, memory-mapped by the API")
+print("  training_state.joblib          - Checkpoint for retrain_incremental.py")
+if workout_shards:
+    print("  model_shards/                  - Per-Workout_Type models, loaded by the API on first use")
+print("\nBuild stages (saved = last build time of skipped stages, see build_manifest.json):")
+print("\n".join(build.summary()))
 print("\nYou can now use these artifacts in your prediction API.")
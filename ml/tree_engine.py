@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+tree_engine.py
+Array-based inference engine for the trained LightGBM exercise classifier.
+
+train_model.py exports the booster into flat NumPy arrays (one entry per
+node across all trees) so the API can score rows without LightGBM or the
+sklearn wrapper:
+- feature / threshold       split feature index and '<=' threshold (+inf at leaves)
+- children                  left/right child of node i at 2*i and 2*i + 1
+                            (a leaf is its own child, so walking past it is a no-op)
+- default_left / missing    LightGBM missing-value routing per split
+- value                     leaf output
+- is_leaf                   leaf flag per node
+- roots                     root node of every tree
+
+Trees are stored iteration-major as LightGBM emits them, so tree t adds its
+leaf value to class t % num_class. Prediction walks all trees for all rows at
+once, a few depth levels per step, then drops finished (row, tree) pairs
+before continuing. Leaf values are summed per class and passed through
+softmax (or sigmoid for binary).
+
+Usage:
+    forest = CompiledForest.from_booster(model.booster_, model.classes_)
+    forest.save('exercise_model_compiled.npz')
+    probabilities = CompiledForest.load('exercise_model_compiled.npz').predict_proba(X)
+"""
+
+import numpy as np
+
+# LightGBM missing_type codes
+MISSING_NONE = 0
+MISSING_ZERO = 1
+MISSING_NAN = 2
+MISSING_TYPES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+
+# Values this close to 0 count as zero for MISSING_ZERO splits (kZeroThreshold)
+ZERO_THRESHOLD = 1e-35
+
+# Depth levels walked between compactions of the active (row, tree) set
+COMPACT_EVERY = 4
+
+ARRAY_FIELDS = [
+    'feature', 'threshold', 'children', 'default_left', 'missing',
+    'value', 'is_leaf', 'roots', 'classes'
+]
+
+SCALAR_FIELDS = ['num_class', 'max_depth', 'sigmoid', 'average_output', 'has_zero_missing']
+
+
+class CompiledForest:
+    """A LightGBM multiclass or binary tree ensemble flattened into NumPy arrays."""
+
+    def __init__(self, feature, threshold, children, default_left, missing,
+                 value, roots, classes, num_class, max_depth,
+                 sigmoid=1.0, average_output=False, is_leaf=None, has_zero_missing=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.default_left = default_left
+        self.missing = missing
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.num_class = int(num_class)
+        self.max_depth = int(max_depth)
+        self.sigmoid = float(sigmoid)
+        self.average_output = bool(average_output)
+        # Derived arrays are passed in when loading so memory-mapped files are not scanned
+        if is_leaf is None:
+            is_leaf = children[0::2] == np.arange(len(feature))
+        if has_zero_missing is None:
+            has_zero_missing = np.any(missing == MISSING_ZERO)
+        self.is_leaf = is_leaf
+        self.has_zero_missing = bool(has_zero_missing)
+
+    @classmethod
+    def from_booster(cls, booster, classes):
+        """Flatten a trained lightgbm.Booster (numerical splits only)."""
+        dump = booster.dump_model()
+        objective = dump['objective'].split()
+        if objective[0] not in ('multiclass', 'softmax', 'binary'):
+            raise ValueError(f"Unsupported objective for compiled inference: {dump['objective']}")
+        sigmoid = 1.0
+        for option in objective[1:]:
+            if option.startswith('sigmoid:'):
+                sigmoid = float(option.split(':', 1)[1])
+
+        nodes = {name: [] for name in ('feature', 'threshold', 'left', 'right', 'default_left', 'missing', 'value')}
+        roots = []
+        max_depth = 0
+
+        def add_node(structure, depth):
+            nonlocal max_depth
+            index = len(nodes['feature'])
+            for name in nodes:
+                nodes[name].append(0)
+
+            if 'leaf_value' in structure:
+                if 'leaf_coeff' in structure:
+                    raise ValueError('Linear trees are not supported by compiled inference')
+                nodes['threshold'][index] = np.inf
+                nodes['left'][index] = index
+                nodes['right'][index] = index
+                nodes['value'][index] = structure['leaf_value']
+                max_depth = max(max_depth, depth)
+                return index
+
+            if structure['decision_type'] != '<=':
+                raise ValueError('Categorical splits are not supported by compiled inference')
+            nodes['feature'][index] = structure['split_feature']
+            nodes['threshold'][index] = structure['threshold']
+            nodes['default_left'][index] = structure['default_left']
+            nodes['missing'][index] = MISSING_TYPES[structure['missing_type']]
+            nodes['left'][index] = add_node(structure['left_child'], depth + 1)
+            nodes['right'][index] = add_node(structure['right_child'], depth + 1)
+            return index
+
+        for tree in dump['tree_info']:
+            roots.append(add_node(tree['tree_structure'], 0))
+
+        # Index arrays are stored as intp so fancy indexing never has to cast them
+        children = np.empty(2 * len(nodes['left']), dtype=np.intp)
+        children[0::2] = nodes['left']
+        children[1::2] = nodes['right']
+
+        return cls(
+            feature=np.asarray(nodes['feature'], dtype=np.intp),
+            threshold=np.asarray(nodes['threshold'], dtype=np.float64),
+            children=children,
+            default_left=np.asarray(nodes['default_left'], dtype=bool),
+            missing=np.asarray(nodes['missing'], dtype=np.int8),
+            value=np.asarray(nodes['value'], dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            # Plain (non-object) array so the file loads without pickle
+            classes=np.asarray(list(classes)),
+            num_class=dump['num_class'],
+            max_depth=max_depth,
+            sigmoid=sigmoid,
+            average_output=dump.get('average_output', False)
+        )
+
+    def arrays(self):
+        """The NumPy arrays that make up the forest, keyed by ARRAY_FIELDS name."""
+        return {name: getattr(self, 'classes_' if name == 'classes' else name) for name in ARRAY_FIELDS}
+
+    def settings(self):
+        """The scalar settings, keyed by SCALAR_FIELDS name."""
+        return {name: getattr(self, name) for name in SCALAR_FIELDS}
+
+    def save(self, path):
+        """Write the arrays and scalar settings to an uncompressed .npz file."""
+        np.savez(path, **self.settings(), **self.arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            # Files written before is_leaf/has_zero_missing were stored recompute them
+            return cls(**{name: data[name].item() for name in SCALAR_FIELDS if name in data.files},
+                       **{name: data[name] for name in ARRAY_FIELDS if name in data.files})
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _step(self, X_flat, offset, node, exact):
+        """Advance every node one level towards its leaf."""
+        x = X_flat[offset + self.feature[node]]
+        threshold = self.threshold[node]
+        if exact:
+            go_right = x > threshold
+        else:
+            # Same routing as LightGBM's NumericalDecision
+            missing = self.missing[node]
+            is_nan = np.isnan(x)
+            x = np.where(is_nan & (missing != MISSING_NAN), 0.0, x)
+            is_missing = (
+                ((missing == MISSING_ZERO) & (np.abs(x) <= ZERO_THRESHOLD)) |
+                ((missing == MISSING_NAN) & is_nan)
+            )
+            go_right = np.where(is_missing, ~self.default_left[node], x > threshold)
+        return self.children[2 * node + go_right]
+
+    def _leaf_values(self, X):
+        """Leaf value reached by every (row, tree) pair, shape (n_rows * n_trees,)."""
+        n_rows, n_features = X.shape
+        X_flat = X.ravel()
+        exact = not self.has_zero_missing and not np.isnan(X).any()
+
+        node = np.tile(self.roots, n_rows)
+        offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        position = np.arange(node.size)
+        values = np.empty(node.size, dtype=np.float64)
+
+        for depth in range(0, self.max_depth, COMPACT_EVERY):
+            for _ in range(min(COMPACT_EVERY, self.max_depth - depth)):
+                node = self._step(X_flat, offset, node, exact)
+
+            # Record finished pairs and keep walking only the unfinished ones
+            values[position] = self.value[node]
+            active = ~self.is_leaf[node]
+            if not active.any():
+                break
+            node, offset, position = node[active], offset[active], position[active]
+        else:
+            values[position] = self.value[node]
+        return values
+
+    def raw_score(self, X):
+        """Summed leaf values per class, shape (n_rows, num_class)."""
+        X = np.asarray(X, dtype=np.float64)
+        leaf_values = self._leaf_values(X)
+        n_iterations = self.n_trees // self.num_class
+        scores = leaf_values.reshape(X.shape[0], n_iterations, self.num_class).sum(axis=1)
+        if self.average_output:
+            scores /= n_iterations
+        return scores
+
+    def predict_proba(self, X):
+        """Class probabilities, matching LGBMClassifier.predict_proba."""
+        scores = self.raw_score(X)
+        if self.num_class == 1:
+            positive = 1.0 / (1.0 + np.exp(-self.sigmoid * scores[:, 0]))
+            return np.column_stack((1.0 - positive, positive))
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores